@@ -4,16 +4,22 @@ import {
   DEFAULT_VISIBLE_PREFECTURES,
   DEPOTS,
   DEPOT_SITES,
+  FINE_POLYGONS_GEOJSON,
+  FINE_POLYGONS_SLIM_GEOJSON,
   FULL_ADMIN_BOUNDARY_GEOJSON,
+  FULL_ADMIN_BOUNDARY_SLIM_GEOJSON,
   MOBILE_BREAKPOINT_PX,
   OPERATIONAL_ADMIN_BOUNDARY_GEOJSON,
+  SEARCH_INDEX_JSON,
   ZIP_KEYS,
 } from "./src/config.js";
+import { createSearchIndex } from "./src/search.js";
 import {
   canonicalAreaName,
   canonicalMunicipality,
   canonicalTownName,
   collectPostalCodes,
+  decodePropertyDictionary,
   escapeHtml,
   extractDepot,
   extractTownName,
@@ -43,6 +49,9 @@ const DETAIL_SMOOTH_FACTOR = 1.2;
 const LITE_SMOOTH_FACTOR = 1.7;
 const BORDER_STYLE_DASH = Object.freeze({ solid: "", dashed: "8 6", dotted: "2 6" });
 const BORDER_REFRESH_THROTTLE_MS = 120;
+const SEARCH_RESULT_LIMIT = 20;
+const SEARCH_FLY_MAX_ZOOM = 16;
+const SEARCH_LEVEL_LABELS = Object.freeze({ prefecture: "都県", municipality: "市区町村", town: "町域" });
 const LITE_STYLE = Object.freeze({
   selected: Object.freeze({ weight: 1.45, opacity: 0.72, fillOpacity: 0.2 }),
   default: Object.freeze({ weight: 0.95, opacity: 0.46, fillOpacity: 0.075 }),
@@ -113,7 +122,10 @@ const state = {
   asisDefaultAreaLabelByMunicipality: new Map(),
   asisAreaLabelByPostal: new Map(),
   asisPostalCodesByTown: new Map(),
+  asisLabelsRequested: false,
   depotMarkerLayer: null,
+  searchIndex: null,
+  searchSourceFeatures: 0,
   brushSelection: {
     mode: "",
     pointerDown: false,
@@ -186,6 +198,8 @@ const el = {
   blockColor: document.getElementById("block-color"),
   fillInScope: document.getElementById("fill-inscope"),
   fillInScopeValue: document.getElementById("fill-inscope-value"),
+  areaSearchInput: document.getElementById("area-search-input"),
+  areaSearchResults: document.getElementById("area-search-results"),
 };
 
 init();
@@ -205,7 +219,7 @@ async function init() {
   initResponsiveSidebarMode();
 
   void loadInScopeMunicipalities();
-  void loadAsisAreaLabels();
+  void loadSearchIndex();
   await loadDefaultGeoJson(initialFlowToken);
 
   renderSelected();
@@ -266,6 +280,9 @@ function setupEventHandlers() {
     input.addEventListener("change", handlePrefectureVisibilityChange);
   });
 
+  el.areaSearchInput?.addEventListener("input", renderAreaSearchResults);
+  el.areaSearchInput?.addEventListener("keydown", handleAreaSearchKeydown);
+
   document.querySelectorAll(".depot-btn").forEach((btn) => {
     btn.addEventListener("click", () => assignSelected(btn.dataset.depot));
   });
@@ -471,13 +488,26 @@ function rebuildGeoLayerForVisibility(flowToken = "") {
   }
 }
 
-async function loadDefaultGeoJson(flowToken = "") {
+async function fetchFinePolygons() {
+  // The slim copy (build_fine_polygons_from_asis.py --slim-out) is optional.
   try {
-    const res = await fetch("./data/asis_fine_polygons.geojson");
-    if (!res.ok) {
-      throw new Error(`status ${res.status}`);
+    const res = await fetch(FINE_POLYGONS_SLIM_GEOJSON);
+    if (res.ok) {
+      return decodePropertyDictionary(await res.json());
     }
-    const data = await res.json();
+  } catch (_err) {
+    // Fall back to the full file.
+  }
+  const res = await fetch(FINE_POLYGONS_GEOJSON);
+  if (!res.ok) {
+    throw new Error(`status ${res.status}`);
+  }
+  return decodePropertyDictionary(await res.json());
+}
+
+async function loadDefaultGeoJson(flowToken = "") {
+  try {
+    const data = await fetchFinePolygons();
     initializeAllAssignmentsFromData(data);
     loadGeoJson(data);
     scheduleLayerPrewarm();
@@ -930,7 +960,119 @@ async function loadInScopeMunicipalities() {
   }
 }
 
+async function loadSearchIndex() {
+  // data/asis_search_index.json (build_search_index.py) is optional; without it the search box stays disabled.
+  try {
+    const res = await fetch(SEARCH_INDEX_JSON);
+    if (!res.ok) {
+      return;
+    }
+    const data = await res.json();
+    state.searchIndex = createSearchIndex(data);
+    state.searchSourceFeatures = Number(data.source_features) || 0;
+    if (el.areaSearchInput) {
+      el.areaSearchInput.disabled = false;
+    }
+    renderAreaSearchResults();
+  } catch (_err) {
+    state.searchIndex = null;
+  }
+}
+
+function renderAreaSearchResults() {
+  const container = el.areaSearchResults;
+  if (!container || !state.searchIndex) {
+    return;
+  }
+  container.innerHTML = "";
+  const query = String(el.areaSearchInput?.value || "");
+  if (!query.trim()) {
+    return;
+  }
+
+  const nodes = state.searchIndex.search(query, SEARCH_RESULT_LIMIT);
+  if (nodes.length === 0) {
+    const span = document.createElement("span");
+    span.className = "hint";
+    span.textContent = "No matching areas.";
+    container.append(span);
+    return;
+  }
+
+  nodes.forEach((node) => {
+    const path = state.searchIndex.path(node);
+    const chip = document.createElement("button");
+    chip.type = "button";
+    chip.className = "chip";
+    const title = document.createElement("span");
+    title.className = "chip-title";
+    title.textContent = state.searchIndex.name(node);
+
+    const parents = document.createElement("span");
+    parents.className = "chip-sub";
+    parents.textContent = path.slice(0, -1).join(" ") || "-";
+
+    const meta = document.createElement("span");
+    meta.className = "chip-meta";
+    const level = SEARCH_LEVEL_LABELS[state.searchIndex.level(node)] || "";
+    meta.textContent = `${level} / ${state.searchIndex.features(node).length} polygons`;
+
+    chip.append(title, parents, meta);
+    chip.addEventListener("click", () => flyToSearchResult(node));
+    container.append(chip);
+  });
+}
+
+function handleAreaSearchKeydown(event) {
+  if (event.key === "Enter") {
+    event.preventDefault();
+    el.areaSearchResults?.querySelector("button.chip")?.click();
+  } else if (event.key === "Escape") {
+    el.areaSearchInput.value = "";
+    renderAreaSearchResults();
+  }
+}
+
+function flyToSearchResult(node) {
+  const features = state.loadedGeoData?.features;
+  if (!state.searchIndex || !state.map || !Array.isArray(features)) {
+    return;
+  }
+  // Offsets point into the fine polygons the index was built from.
+  if (features.length !== state.searchSourceFeatures) {
+    alert("The search index does not match the loaded polygons. Rebuild data/asis_search_index.json.");
+    return;
+  }
+  const picked = state.searchIndex
+    .features(node)
+    .map((offset) => features[offset])
+    .filter(Boolean);
+  const bounds = L.geoJSON({ type: "FeatureCollection", features: picked }).getBounds();
+  if (!bounds.isValid()) {
+    return;
+  }
+
+  showPrefecture(state.searchIndex.path(node)[0]);
+  state.map.flyToBounds(bounds.pad(0.1), { maxZoom: SEARCH_FLY_MAX_ZOOM });
+  if (isMobileViewport()) {
+    setSidebarCollapsed(true);
+  }
+}
+
+function showPrefecture(prefName) {
+  const input = el.prefectureVisibilityInputs.find((node) => node.value === prefName);
+  if (!input || input.checked) {
+    return;
+  }
+  input.checked = true;
+  handlePrefectureVisibilityChange();
+}
+
 async function loadAsisAreaLabels() {
+  if (state.asisLabelsRequested) {
+    return;
+  }
+  state.asisLabelsRequested = true;
   try {
     const res = await fetch("./asis.csv");
     if (!res.ok) {
@@ -1109,6 +1251,10 @@ function loadGeoJson(data, options = {}) {
       : getRenderModeForZoom(state.map?.getZoom?.() ?? DETAIL_ENTER_ZOOM, state.renderMode);
 
   state.loadedGeoData = data;
+  if (!hasEmbeddedZipStats(data)) {
+    // ZIP統計を持たない旧形式のデータは asis.csv から対応エリア / 郵便番号を補完する。
+    void loadAsisAreaLabels();
+  }
   state.lastZoomForModeSwitch = state.map?.getZoom?.() ?? state.lastZoomForModeSwitch;
   clearBorderRefreshQueue(true);
 
@@ -1761,6 +1907,22 @@ function getDispatchAreaLabel(props, municipality, townName, postalCodes = []) {
   return inline || "";
 }
 
+function hasEmbeddedZipStats(data) {
+  return data.features.some((feature) => feature?.properties?.zip_count !== undefined);
+}
+
+function formatZipStats(props) {
+  const count = Number(props?.zip_count);
+  if (!Number.isFinite(count) || count <= 0) {
+    return "";
+  }
+  const depotCounts = Object.entries(props.zip_depot_counts || {});
+  if (depotCounts.length <= 1) {
+    return `${count}件`;
+  }
+  return `${count}件 (${depotCounts.map(([code, rows]) => `${code} ${rows}`).join(" / ")})`;
+}
+
 function getPostalCodes(props, municipality, townName, areaId) {
   const fromProps = ZIP_KEYS.flatMap((key) => collectPostalCodes(props[key]));
   if (fromProps.length > 0) {
@@ -1840,12 +2002,14 @@ function buildPopupHtml(areaId) {
     lookupDispatchAreaLabel(meta.municipality, meta.townName, meta.postalCodes || []) ||
     meta.municipality ||
     "-";
+  const zipStats = formatZipStats(meta.raw);
 
   return [
     '<dl class="popup-grid">',
     `<dt>Town</dt><dd>${escapeHtml(meta.name || "-")}</dd>`,
     `<dt>Area</dt><dd>${escapeHtml(areaLabel)}</dd>`,
     `<dt>Depot</dt><dd>${escapeHtml(depotName)}</dd>`,
+    zipStats ? `<dt>ZIP</dt><dd>${escapeHtml(zipStats)}</dd>` : "",
     "</dl>",
   ].join("");
 }
@@ -1964,14 +2128,14 @@ async function getMunicipalityBoundarySource() {
   }
 
   try {
-    const paths = [FULL_ADMIN_BOUNDARY_GEOJSON, OPERATIONAL_ADMIN_BOUNDARY_GEOJSON];
+    const paths = [FULL_ADMIN_BOUNDARY_SLIM_GEOJSON, FULL_ADMIN_BOUNDARY_GEOJSON, OPERATIONAL_ADMIN_BOUNDARY_GEOJSON];
     for (const path of paths) {
       try {
         const res = await fetch(path);
         if (!res.ok) {
           continue;
         }
-        const data = await res.json();
+        const data = decodePropertyDictionary(await res.json());
         if (!Array.isArray(data?.features)) {
           continue;
         }
@@ -8,6 +8,10 @@ Typical usage:
     --baseline data/asis_admin_assignments.csv \
     --updated out/area_assignments_after_edit.csv \
     --out-dir out
+
+The updated CSV may also be a town-level export (fine polygons: area_id, area_name,
+municipality, ...), e.g. from rebalance_depots.py. Town rows are matched to asis.csv
+rows by municipality + town name (丁目 ignored) and move only the rows of that town.
 """
 
 from __future__ import annotations
@@ -17,7 +21,10 @@ import csv
 import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Set
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from build_common import normalize_zip
+from build_fine_polygons_from_asis import canonical_town_name
 
 
 DEPOT_NAMES = {
@@ -32,15 +39,21 @@ class AreaAssignment:
     area_id: str
     area_name: str
     depot_code: str
+    municipality: str = ""
 
 
 def normalize_header(value: str) -> str:
     return str(value or "").replace("\ufeff", "").strip().lower()
 
 
-def normalize_zip(value: str) -> str:
-    digits = re.sub(r"[^\d]", "", str(value or ""))
-    return digits[:7] if len(digits) >= 7 else digits
+def find_column(header: List[str], name: str, candidates: Iterable[str]) -> Optional[int]:
+    """Index of the column called name (or else of the first present candidate) in a raw CSV header."""
+    normalized = [normalize_header(h) for h in header]
+    for candidate in [name] if name else candidates:
+        key = normalize_header(candidate)
+        if key in normalized:
+            return normalized.index(key)
+    return None
 
 
 def normalize_depot_code(value: str) -> str:
@@ -94,18 +107,52 @@ def pick_value(row: dict, headers: Iterable[str]) -> str:
 
 
 def load_area_assignments(path: Path) -> Dict[str, AreaAssignment]:
-    rows = read_csv(path)
+    return parse_area_assignments(read_csv(path))
+
+
+def parse_area_assignments(rows: Iterable[dict]) -> Dict[str, AreaAssignment]:
     out: Dict[str, AreaAssignment] = {}
     for row in rows:
         area_id = pick_value(row, ["area_id", "area_code", "id", "code", "N03_007"])
         area_name = pick_value(row, ["area_name", "municipality", "name", "名称", "市区", "市区町村"])
         depot = normalize_depot_code(pick_value(row, ["depot_code", "depot", "管轄デポ", "担当デポ"]))
+        municipality = pick_value(row, ["municipality", "市区町村"])
         if not area_id:
             continue
-        out[area_id] = AreaAssignment(area_id=area_id, area_name=area_name, depot_code=depot)
+        out[area_id] = AreaAssignment(area_id=area_id, area_name=area_name, depot_code=depot, municipality=municipality)
     return out
 
 
+def build_town_index(assignments: Dict[str, AreaAssignment]) -> Dict[Tuple[str, str], Set[str]]:
+    """(municipality, town) -> area_ids for town-level rows (area_name is municipality + town name)."""
+    index: Dict[Tuple[str, str], Set[str]] = {}
+    for area_id, rec in assignments.items():
+        muni = rec.municipality
+        if not muni or len(rec.area_name) <= len(muni) or not rec.area_name.startswith(muni):
+            continue
+        key = (canonical_area_name(muni), canonical_town_name(rec.area_name[len(muni) :]))
+        if key not in index:
+            index[key] = set()
+        index[key].add(area_id)
+    return index
+
+
+def resolve_town_area_ids(
+    city_value: str,
+    area_value: str,
+    town_value: str,
+    town_index: Dict[Tuple[str, str], Set[str]],
+) -> Set[str]:
+    town = canonical_town_name(town_value)
+    if not town:
+        return set()
+    for raw in [city_value, area_value]:
+        ids = town_index.get((canonical_area_name(raw), town))
+        if ids:
+            return ids
+    return set()
+
+
 def build_name_index(assignments: Dict[str, AreaAssignment]) -> Dict[str, Set[str]]:
     index: Dict[str, Set[str]] = {}
     for area_id, rec in assignments.items():
@@ -154,28 +201,42 @@ def write_csv(path: Path, headers: List[str], rows: List[List[str]]) -> None:
         writer.writerows(rows)
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Convert admin-area assignment changes into ZIP-level changes.")
-    parser.add_argument("--asis", default="asis.csv", help="Path to as-is ZIP assignment CSV.")
-    parser.add_argument("--baseline", default="data/asis_admin_assignments.csv", help="Baseline admin assignment CSV.")
-    parser.add_argument("--updated", required=True, help="Updated admin assignment CSV exported from the map tool.")
-    parser.add_argument("--out-dir", default="out", help="Output directory.")
-    parser.add_argument(
-        "--include-clear",
-        action="store_true",
-        help="Treat blank depot in updated CSV as an intentional clear and include it as a change.",
-    )
-    args = parser.parse_args()
+AREA_CHANGE_HEADERS = ["area_id", "area_name", "before_depot_code", "before_depot_name", "after_depot_code", "after_depot_name"]
+ZIP_REASSIGNMENT_HEADERS = [
+    "zip_code",
+    "city",
+    "town",
+    "area_label",
+    "area_id",
+    "area_name",
+    "match_status",
+    "before_depot_code",
+    "before_depot_name",
+    "after_depot_code",
+    "after_depot_name",
+    "changed",
+]
+
+
+@dataclass
+class ZipChanges:
+    area_change_rows: List[List[str]]
+    zip_all_rows: List[List[str]]
+    zip_changes_rows: List[List[str]]
 
-    asis_path = Path(args.asis)
-    baseline_path = Path(args.baseline)
-    updated_path = Path(args.updated)
-    out_dir = Path(args.out_dir)
 
-    baseline = load_area_assignments(baseline_path)
-    updated = load_area_assignments(updated_path)
-    changed_areas = detect_area_changes(baseline, updated, include_clear=args.include_clear)
-    name_index = build_name_index(updated or baseline)
+def compute_zip_changes(
+    asis_rows: Iterable[dict],
+    baseline: Dict[str, AreaAssignment],
+    updated: Dict[str, AreaAssignment],
+    include_clear: bool = False,
+) -> ZipChanges:
+    """Area-level and ZIP-level changes of an updated assignment against the baseline."""
+    town_index = build_town_index(updated)
+    town_area_ids = {area_id for ids in town_index.values() for area_id in ids}
+    admin_updated = {area_id: rec for area_id, rec in updated.items() if area_id not in town_area_ids}
+    changed_areas = detect_area_changes(baseline, admin_updated, include_clear=include_clear)
+    name_index = build_name_index(admin_updated or baseline)
 
     area_change_rows: List[List[str]] = []
     for area_id in sorted(changed_areas):
@@ -194,10 +255,10 @@ def main() -> None:
             ]
         )
 
-    asis_rows = read_csv(asis_path)
-
     zip_all_rows: List[List[str]] = []
     zip_changes_rows: List[List[str]] = []
+    # Town-level changes: area_id -> (after depot, before depot row counts).
+    town_changes: Dict[str, Tuple[str, Dict[str, int]]] = {}
 
     for row in asis_rows:
         zip_code = normalize_zip(pick_value(row, ["郵便番号", "zip_code", "zipcode", "zip", "postal_code"]))
@@ -207,20 +268,33 @@ def main() -> None:
         before_code = normalize_depot_code(pick_value(row, ["管轄デポ", "担当デポ", "depot_code", "depot"]))
         before_name = DEPOT_NAMES.get(before_code, "")
 
-        matched_area_ids = resolve_area_ids(city, area_label, name_index)
-        area_id = ""
-        area_name = ""
-        match_status = "NO_MATCH"
-        if len(matched_area_ids) == 1:
-            area_id = next(iter(matched_area_ids))
-            area_name = (updated.get(area_id) or baseline.get(area_id) or AreaAssignment(area_id, "", "")).area_name
-            match_status = "OK"
-        elif len(matched_area_ids) > 1:
-            match_status = "AMBIGUOUS"
-
         after_code = before_code
-        if area_id and area_id in changed_areas:
-            after_code = changed_areas[area_id].depot_code
+        town_area_ids = resolve_town_area_ids(city, area_label, town, town_index) if town_index else set()
+        if town_area_ids:
+            # All 丁目 polygons of the town must agree; blank means "unchanged" unless --include-clear.
+            codes = {updated[i].depot_code for i in town_area_ids if updated[i].depot_code or include_clear}
+            area_id = sorted(town_area_ids)[0]
+            area_name = updated[area_id].area_name
+            match_status = "OK" if len(codes) <= 1 else "AMBIGUOUS"
+            if len(codes) == 1:
+                after_code = next(iter(codes))
+                if after_code != before_code:
+                    before_counts = town_changes.setdefault(area_id, (after_code, {}))[1]
+                    before_counts[before_code] = before_counts.get(before_code, 0) + 1
+        else:
+            matched_area_ids = resolve_area_ids(city, area_label, name_index)
+            area_id = ""
+            area_name = ""
+            match_status = "NO_MATCH"
+            if len(matched_area_ids) == 1:
+                area_id = next(iter(matched_area_ids))
+                area_name = (updated.get(area_id) or baseline.get(area_id) or AreaAssignment(area_id, "", "")).area_name
+                match_status = "OK"
+            elif len(matched_area_ids) > 1:
+                match_status = "AMBIGUOUS"
+
+            if area_id and area_id in changed_areas:
+                after_code = changed_areas[area_id].depot_code
         after_name = DEPOT_NAMES.get(after_code, "")
         changed = "1" if after_code != before_code else "0"
 
@@ -242,55 +316,59 @@ def main() -> None:
         if changed == "1":
             zip_changes_rows.append(all_row)
 
-    write_csv(
-        out_dir / "area_changes.csv",
-        ["area_id", "area_name", "before_depot_code", "before_depot_name", "after_depot_code", "after_depot_name"],
-        area_change_rows,
-    )
-    write_csv(
-        out_dir / "zip_reassignment_all.csv",
-        [
-            "zip_code",
-            "city",
-            "town",
-            "area_label",
-            "area_id",
-            "area_name",
-            "match_status",
-            "before_depot_code",
-            "before_depot_name",
-            "after_depot_code",
-            "after_depot_name",
-            "changed",
-        ],
-        zip_all_rows,
+    for area_id in sorted(town_changes):
+        new_code, before_counts = town_changes[area_id]
+        old_code = max(sorted(before_counts), key=lambda code: before_counts[code])
+        area_change_rows.append(
+            [
+                area_id,
+                updated[area_id].area_name,
+                old_code,
+                DEPOT_NAMES.get(old_code, ""),
+                new_code,
+                DEPOT_NAMES.get(new_code, ""),
+            ]
+        )
+
+    return ZipChanges(area_change_rows, zip_all_rows, zip_changes_rows)
+
+
+def write_zip_changes(out_dir: Path, changes: ZipChanges) -> List[Path]:
+    paths = [out_dir / "area_changes.csv", out_dir / "zip_reassignment_all.csv", out_dir / "zip_changes_only.csv"]
+    write_csv(paths[0], AREA_CHANGE_HEADERS, changes.area_change_rows)
+    write_csv(paths[1], ZIP_REASSIGNMENT_HEADERS, changes.zip_all_rows)
+    write_csv(paths[2], ZIP_REASSIGNMENT_HEADERS, changes.zip_changes_rows)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert admin-area assignment changes into ZIP-level changes.")
+    parser.add_argument("--asis", default="asis.csv", help="Path to as-is ZIP assignment CSV.")
+    parser.add_argument("--baseline", default="data/asis_admin_assignments.csv", help="Baseline admin assignment CSV.")
+    parser.add_argument("--updated", required=True, help="Updated admin assignment CSV exported from the map tool.")
+    parser.add_argument("--out-dir", default="out", help="Output directory.")
+    parser.add_argument(
+        "--include-clear",
+        action="store_true",
+        help="Treat blank depot in updated CSV as an intentional clear and include it as a change.",
     )
-    write_csv(
-        out_dir / "zip_changes_only.csv",
-        [
-            "zip_code",
-            "city",
-            "town",
-            "area_label",
-            "area_id",
-            "area_name",
-            "match_status",
-            "before_depot_code",
-            "before_depot_name",
-            "after_depot_code",
-            "after_depot_name",
-            "changed",
-        ],
-        zip_changes_rows,
+    args = parser.parse_args()
+
+    updated = load_area_assignments(Path(args.updated))
+    changes = compute_zip_changes(
+        read_csv(Path(args.asis)),
+        load_area_assignments(Path(args.baseline)),
+        updated,
+        include_clear=args.include_clear,
     )
+    paths = write_zip_changes(Path(args.out_dir), changes)
 
     print(f"updated admin areas loaded: {len(updated)}")
-    print(f"changed admin areas: {len(area_change_rows)}")
-    print(f"zip rows processed: {len(zip_all_rows)}")
-    print(f"zip rows changed: {len(zip_changes_rows)}")
-    print(f"wrote: {out_dir / 'area_changes.csv'}")
-    print(f"wrote: {out_dir / 'zip_reassignment_all.csv'}")
-    print(f"wrote: {out_dir / 'zip_changes_only.csv'}")
+    print(f"changed admin areas: {len(changes.area_change_rows)}")
+    print(f"zip rows processed: {len(changes.zip_all_rows)}")
+    print(f"zip rows changed: {len(changes.zip_changes_rows)}")
+    for path in paths:
+        print(f"wrote: {path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Score depot assignment candidates: per-depot ZIP count, ZIP rows, town count and area,
+before and after, without writing the ZIP-level CSVs.
+
+The ZIP semantics are those of admin_to_zip_changes.py: an asis.csv row resolved to an
+admin area moves to the area's new depot when the area changed, otherwise it keeps its
+own depot; unresolved rows never move. Every area therefore has 1 + len(DEPOT_ORDER)
+options (keep, or move to a depot), and each option's contribution to the per-depot
+totals is precomputed once. Evaluating a candidate is a gather + sum over areas, done
+for a whole batch of candidates at once when NumPy is available.
+
+ZIP codes are counted once per depot. A ZIP whose rows all resolve to one area is
+folded into that area's contributions; the few ZIPs shared by several areas are kept
+as a sparse ZIP -> rows incidence (CSR) and OR-reduced per candidate.
+
+Town count and area (km²) come from the fine polygons: a town keeps its own depot_code
+when its municipality is unchanged and follows the municipality otherwise.
+
+Typical usage:
+  python3 scripts/assignment_workload.py \
+    --asis asis.csv \
+    --baseline data/asis_admin_assignments.csv \
+    --fine-polygons data/asis_fine_polygons.geojson \
+    --updated out/area_assignments_after_edit.csv out/area_assignments_alt.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from admin_to_zip_changes import (
+    build_name_index,
+    canonical_area_name,
+    load_area_assignments,
+    normalize_depot_code,
+    normalize_zip,
+    pick_value,
+    read_csv,
+    resolve_area_ids,
+)
+from build_admin_boundary_geojson import np, load_features, normalize_polygons
+from build_common import EARTH_RADIUS_M
+from build_depot_territories import DEPOT_ORDER, UNASSIGNED_NAME
+
+
+METERS_PER_DEGREE = math.radians(1) * EARTH_RADIUS_M
+METRICS = ("zip_count", "zip_rows", "town_count", "area_km2")
+KEEP = 0  # option 0 keeps the current depots; option k moves the area to DEPOT_ORDER[k - 1]
+BATCH_SIZE = 512
+
+
+def geometry_area_km2(geometry: dict) -> float:
+    """Polygon area with a local equirectangular projection per ring (holes subtracted)."""
+    total = 0.0
+    for poly in normalize_polygons(geometry or {}):
+        for ring_index, ring in enumerate(poly):
+            if len(ring) < 4:
+                continue
+            kx = math.cos(math.radians(sum(pt[1] for pt in ring) / len(ring)))
+            twice = sum(p[0] * q[1] - q[0] * p[1] for p, q in zip(ring, ring[1:]))
+            area = abs(twice) / 2 * kx * METERS_PER_DEGREE * METERS_PER_DEGREE / 1e6
+            total += area if ring_index == 0 else -area
+    return total
+
+
+@dataclass
+class WorkloadModel:
+    """
+    Precomputed what-if model.
+
+    contributions[area][option][depot][metric] is what the area adds to the depot totals
+    under that option. The last area is a pinned pseudo-area holding the asis rows that
+    resolve to no admin area (always KEEP). Shared ZIPs are stored as CSR over their rows:
+    rows shared_offsets[z]:shared_offsets[z + 1] belong to ZIP z, each with its area and
+    the depot index it keeps.
+    """
+
+    area_ids: List[str]
+    baseline_codes: List[str]
+    contributions: List[List[List[List[float]]]]
+    shared_offsets: List[int]
+    shared_areas: List[int]
+    shared_keep: List[int]
+
+    def __post_init__(self) -> None:
+        self.area_index = {area_id: i for i, area_id in enumerate(self.area_ids)}
+        if np is not None:
+            self._contributions = np.asarray(self.contributions, dtype=np.float64)
+            self._shared_offsets = np.asarray(self.shared_offsets[:-1], dtype=np.int64)
+            self._shared_areas = np.asarray(self.shared_areas, dtype=np.int64)
+            self._shared_keep = np.asarray(self.shared_keep, dtype=np.int64)
+
+    @property
+    def area_count(self) -> int:
+        return len(self.area_ids)
+
+    def choices(self, assignment: Dict[str, str], include_clear: bool = False) -> List[int]:
+        """Option per area for an area_id -> depot_code mapping (same change rule as admin_to_zip_changes)."""
+        out = [KEEP] * self.area_count
+        for area_id, code in assignment.items():
+            index = self.area_index.get(area_id)
+            if index is None or index == self.area_count - 1:
+                continue
+            new_code = normalize_depot_code(code)
+            if not include_clear and not new_code:
+                continue
+            if new_code != self.baseline_codes[index]:
+                out[index] = DEPOT_ORDER.index(new_code) + 1
+        return out
+
+    def evaluate(self, choices: Sequence[Sequence[int]]) -> List[List[List[float]]]:
+        """Per-depot metric totals [candidate][depot][metric] for a batch of option vectors."""
+        if not choices:
+            return []
+        if np is not None:
+            out: List[List[List[float]]] = []
+            for start in range(0, len(choices), BATCH_SIZE):
+                batch = np.asarray(choices[start : start + BATCH_SIZE], dtype=np.int64)
+                out.extend(self._evaluate_numpy(batch).tolist())
+            return out
+        return [self._evaluate_py(list(row)) for row in choices]
+
+    def _evaluate_numpy(self, batch: "np.ndarray") -> "np.ndarray":
+        # (B, areas, depots, metrics) gathered by option, summed over areas.
+        totals = self._contributions[np.arange(self.area_count), batch].sum(axis=1)
+        if len(self._shared_areas):
+            options = batch[:, self._shared_areas]
+            depots = np.where(options == KEEP, self._shared_keep, options - 1)
+            hits = np.zeros(depots.shape + (len(DEPOT_ORDER),), dtype=bool)
+            np.put_along_axis(hits, depots[..., None], True, axis=2)
+            per_zip = np.logical_or.reduceat(hits, self._shared_offsets, axis=1)
+            totals[:, :, 0] += per_zip.sum(axis=1)
+        return totals
+
+    def _evaluate_py(self, choices: List[int]) -> List[List[float]]:
+        totals = [[0.0] * len(METRICS) for _ in DEPOT_ORDER]
+        for area, option in enumerate(choices):
+            for depot, values in enumerate(self.contributions[area][option]):
+                row = totals[depot]
+                for metric, value in enumerate(values):
+                    row[metric] += value
+        for z in range(len(self.shared_offsets) - 1):
+            depots = set()
+            for r in range(self.shared_offsets[z], self.shared_offsets[z + 1]):
+                option = choices[self.shared_areas[r]]
+                depots.add(self.shared_keep[r] if option == KEEP else option - 1)
+            for depot in depots:
+                totals[depot][0] += 1
+        return totals
+
+
+def build_workload_model(asis_path: Path, baseline_path: Path, fine_path: Optional[Path]) -> WorkloadModel:
+    baseline = load_area_assignments(baseline_path)
+    name_index = build_name_index(baseline)
+    area_ids = sorted(baseline) + [""]  # "" = pinned pseudo-area for unresolved rows
+    area_index = {area_id: i for i, area_id in enumerate(area_ids)}
+    pinned = len(area_ids) - 1
+    depot_count = len(DEPOT_ORDER)
+
+    # Distinct (area, zip, keep depot) rows and row counts per (area, keep depot).
+    zip_rows: List[Dict[Tuple[str, int], int]] = [dict() for _ in area_ids]
+    zip_areas: Dict[str, set] = {}
+    for row in read_csv(asis_path):
+        zip_code = normalize_zip(pick_value(row, ["郵便番号", "zip_code", "zipcode", "zip", "postal_code"]))
+        city = pick_value(row, ["市区", "city", "municipality"])
+        area_label = pick_value(row, ["対応エリア", "area_name", "municipality"])
+        keep = DEPOT_ORDER.index(normalize_depot_code(pick_value(row, ["管轄デポ", "担当デポ", "depot_code", "depot"])))
+        matched = resolve_area_ids(city, area_label, name_index)
+        area = area_index[next(iter(matched))] if len(matched) == 1 else pinned
+        key = (zip_code, keep)
+        zip_rows[area][key] = zip_rows[area].get(key, 0) + 1
+        zip_areas.setdefault(zip_code, set()).add(area)
+
+    # Towns: (keep depot, km²) per area.
+    towns: List[List[Tuple[int, float]]] = [[] for _ in area_ids]
+    if fine_path is not None and fine_path.exists():
+        for ft in load_features(fine_path):
+            props = ft.get("properties") or {}
+            matched = name_index.get(canonical_area_name(props.get("municipality") or ""), set())
+            if len(matched) != 1:
+                continue
+            keep = DEPOT_ORDER.index(normalize_depot_code(props.get("depot_code") or ""))
+            towns[area_index[next(iter(matched))]].append((keep, geometry_area_km2(ft.get("geometry") or {})))
+
+    contributions: List[List[List[List[float]]]] = []
+    for area in range(len(area_ids)):
+        options = [[[0.0] * len(METRICS) for _ in DEPOT_ORDER] for _ in range(depot_count + 1)]
+        keep_option = options[KEEP]
+        single_zips_keep = set()
+        single_zips = set()
+        for (zip_code, keep), count in zip_rows[area].items():
+            keep_option[keep][1] += count
+            for depot in range(depot_count):
+                options[depot + 1][depot][1] += count
+            if len(zip_areas[zip_code]) == 1:
+                single_zips_keep.add((zip_code, keep))
+                single_zips.add(zip_code)
+        for _, keep in single_zips_keep:
+            keep_option[keep][0] += 1
+        for keep, km2 in towns[area]:
+            keep_option[keep][2] += 1
+            keep_option[keep][3] += km2
+        for depot in range(depot_count):
+            moved = options[depot + 1][depot]
+            moved[0] += len(single_zips)
+            moved[2] += len(towns[area])
+            moved[3] += sum(km2 for _, km2 in towns[area])
+        if area == pinned:
+            # Unresolved rows never move.
+            options = [keep_option] * (depot_count + 1)
+        contributions.append(options)
+
+    shared_offsets = [0]
+    shared_areas: List[int] = []
+    shared_keep: List[int] = []
+    for zip_code in sorted(code for code, areas in zip_areas.items() if len(areas) > 1):
+        for area in sorted(zip_areas[zip_code]):
+            for row_zip, keep in sorted(zip_rows[area]):
+                if row_zip == zip_code:
+                    shared_areas.append(area)
+                    shared_keep.append(keep)
+        shared_offsets.append(len(shared_areas))
+
+    return WorkloadModel(
+        area_ids=area_ids,
+        baseline_codes=[baseline[area_id].depot_code if area_id else "" for area_id in area_ids],
+        contributions=contributions,
+        shared_offsets=shared_offsets,
+        shared_areas=shared_areas,
+        shared_keep=shared_keep,
+    )
+
+
+def depot_label(code: str) -> str:
+    return code or UNASSIGNED_NAME
+
+
+def totals_dict(totals: List[List[float]]) -> Dict[str, Dict[str, float]]:
+    return {
+        depot_label(code): {
+            metric: round(value, 3) if metric == "area_km2" else int(value) for metric, value in zip(METRICS, row)
+        }
+        for code, row in zip(DEPOT_ORDER, totals)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-depot ZIP / town / area totals for assignment candidates.")
+    parser.add_argument("--asis", default="asis.csv", help="Path to as-is ZIP assignment CSV.")
+    parser.add_argument("--baseline", default="data/asis_admin_assignments.csv", help="Baseline admin assignment CSV.")
+    parser.add_argument(
+        "--fine-polygons",
+        default="data/asis_fine_polygons.geojson",
+        help="Fine polygons GeoJSON for town count and area (skipped when missing).",
+    )
+    parser.add_argument("--updated", nargs="+", required=True, help="Candidate admin assignment CSVs from the map tool.")
+    parser.add_argument(
+        "--include-clear",
+        action="store_true",
+        help="Treat blank depot in updated CSV as an intentional clear (same as admin_to_zip_changes.py).",
+    )
+    parser.add_argument("--out", default="", help="Optional JSON output path.")
+    args = parser.parse_args()
+
+    fine_path = Path(args.fine_polygons)
+    if not fine_path.exists():
+        print(f"warn: {fine_path} not found; town_count / area_km2 are 0")
+    model = build_workload_model(Path(args.asis), Path(args.baseline), fine_path)
+
+    candidates = []
+    for path in args.updated:
+        assignment = {area_id: rec.depot_code for area_id, rec in load_area_assignments(Path(path)).items()}
+        candidates.append(model.choices(assignment, include_clear=args.include_clear))
+    before, *after = model.evaluate([[KEEP] * model.area_count] + candidates)
+
+    result = {"before": totals_dict(before), "candidates": []}
+    for path, choices, totals in zip(args.updated, candidates, after):
+        delta = [[a - b for a, b in zip(row_after, row_before)] for row_after, row_before in zip(totals, before)]
+        result["candidates"].append(
+            {
+                "file": path,
+                "changed_areas": sum(1 for option in choices if option != KEEP),
+                "after": totals_dict(totals),
+                "delta": totals_dict(delta),
+            }
+        )
+
+    for candidate in result["candidates"]:
+        print(f"candidate: {candidate['file']} (changed areas: {candidate['changed_areas']})")
+        for code in DEPOT_ORDER:
+            label = depot_label(code)
+            cells = []
+            for metric in METRICS:
+                b = result["before"][label][metric]
+                a = candidate["after"][label][metric]
+                d = candidate["delta"][label][metric]
+                cells.append(f"{metric}={b}->{a} ({d:+})" if metric != "area_km2" else f"{metric}={b:.1f}->{a:.1f} ({d:+.1f})")
+            print(f"  {label}: " + ", ".join(cells))
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with out_path.open("w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"wrote: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark fine-polygon boundary derivation (edge classification + chain merging).
+
+Runs the Saitama / Chiba full-coverage set by default and checks that the
+parallel merge returns exactly the serial result.
+
+Typical usage:
+  python3 scripts/benchmark_boundary_merge.py \
+    --fine-polygons data/asis_fine_polygons.geojson \
+    --pref-names 埼玉県,千葉県 \
+    --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Set
+
+from build_admin_boundary_geojson import (
+    Edge,
+    classify_boundary_edges,
+    collect_fine_edge_table,
+    load_features,
+    merge_edge_groups,
+    np,
+)
+
+
+def timed(label: str, timings: Dict[str, float], func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    timings[label] = time.perf_counter() - started
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark boundary edge classification and chain merging.")
+    parser.add_argument("--fine-polygons", default="data/asis_fine_polygons.geojson", help="Fine polygons GeoJSON path.")
+    parser.add_argument("--pref-names", default="埼玉県,千葉県", help="Comma separated prefecture names to include.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes for the parallel merge.")
+    args = parser.parse_args()
+
+    pref_names = {name.strip() for name in str(args.pref_names or "").split(",") if name.strip()}
+    timings: Dict[str, float] = {}
+
+    features = timed("load", timings, load_features, Path(args.fine_polygons))
+    table, municipality_names, _ = timed("edge_table", timings, collect_fine_edge_table, features, pref_names, set())
+    edges_by_id = timed("classify", timings, classify_boundary_edges, table)
+    groups: List[Set[Edge]] = [edges_by_id[muni_id] for muni_id in sorted(edges_by_id)]
+
+    serial = timed("merge_serial", timings, merge_edge_groups, groups, workers=1)
+    parallel = timed("merge_parallel", timings, merge_edge_groups, groups, workers=args.workers)
+    if serial != parallel:
+        raise SystemExit("error: parallel merge output differs from serial output")
+
+    print(f"features: {len(features)}")
+    print(f"municipalities: {len(municipality_names)}")
+    print(f"edge occurrences: {len(table)}")
+    print(f"boundary edges: {sum(len(edges) for edges in groups)}")
+    print(f"lines: {sum(len(lines) for lines in serial)}")
+    print(f"numpy: {'yes' if np is not None else 'no'}")
+    print(f"workers: {args.workers}")
+    for label, seconds in timings.items():
+        print(f"{label}: {seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,20 +5,44 @@ Build merged municipality boundary GeoJSON.
 - Tokyo / Kanagawa: grouped from N03 prefecture files (Polygon / MultiPolygon).
 - Optional extra prefectures: derived from fine town polygons by extracting only
   municipality boundary lines (MultiLineString).
+- --geometry-mode dissolved: every prefecture is dissolved from fine town polygons
+  into municipality Polygon / MultiPolygon features (no N03 input needed).
+
+Edges are collected into a columnar table of packed 64-bit point keys and
+classified with a single sort pass (vectorized when NumPy is installed).
 """
 
 from __future__ import annotations
 
 import argparse
 import json
-from collections import Counter, defaultdict
+import math
+import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from collections import defaultdict
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import DefaultDict, Dict, Iterable, List, Set, Tuple
+from typing import DefaultDict, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from build_common import point_in_ring
+from property_dictionary import BOUNDARY_COLUMNS, BOUNDARY_ENCODED, write_slim_feature_collection
+from shapefile_reader import iter_shapefile_features
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional acceleration
+    np = None
 
 
 SCALE = 1_000_000
+# Quantized coordinates are shifted into unsigned 32-bit range and packed as (x << 32) | y.
+POINT_OFFSET = 1 << 31
+POINT_MASK = (1 << 32) - 1
 Point = Tuple[int, int]
 Edge = Tuple[Point, Point]
+SHARED_BOUNDARY_MODES = ("per-side", "once")
 
 
 def canonical_municipality(source: object) -> str:
@@ -61,6 +85,14 @@ def canonical_edge(a: Point, b: Point) -> Edge:
     return (b, a)
 
 
+def pack_point(point: Point) -> int:
+    return ((point[0] + POINT_OFFSET) << 32) | (point[1] + POINT_OFFSET)
+
+
+def unpack_point(key: int) -> Point:
+    return ((key >> 32) - POINT_OFFSET, (key & POINT_MASK) - POINT_OFFSET)
+
+
 def iter_edges(polygons: List[list]) -> Iterable[Edge]:
     for poly in polygons:
         if not isinstance(poly, list):
@@ -80,64 +112,418 @@ def iter_edges(polygons: List[list]) -> Iterable[Edge]:
                 yield canonical_edge(a, b)
 
 
+@dataclass
+class EdgeTable:
+    """
+    Columnar edge occurrences.
+
+    Each row holds the canonical packed endpoints (a < b), the owning municipality id,
+    and whether that municipality's interior lies on the left of a -> b.
+    """
+
+    a: array = field(default_factory=lambda: array("Q"))
+    b: array = field(default_factory=lambda: array("Q"))
+    muni: array = field(default_factory=lambda: array("I"))
+    left: array = field(default_factory=lambda: array("B"))
+
+    def __len__(self) -> int:
+        return len(self.muni)
+
+    def add_polygons(self, polygons: List[list], muni_id: int) -> None:
+        a_col, b_col, muni_col, left_col = self.a, self.b, self.muni, self.left
+        for poly in polygons:
+            if not isinstance(poly, list):
+                continue
+            for ring_index, ring in enumerate(poly):
+                if not isinstance(ring, list) or len(ring) < 2:
+                    continue
+                points = [
+                    (int(round(float(coord[0]) * SCALE)), int(round(float(coord[1]) * SCALE)))
+                    if len(coord) >= 2
+                    else None
+                    for coord in ring
+                ]
+                valid = [pt for pt in points if pt is not None]
+                twice_area = sum(p[0] * q[1] - q[0] * p[1] for p, q in zip(valid, valid[1:]))
+                # Exterior rings enclose the area on their left when CCW; holes when CW.
+                interior_left = (twice_area > 0) == (ring_index == 0)
+
+                prev = None
+                for pt in points:
+                    if pt is None:
+                        prev = None
+                        continue
+                    key = ((pt[0] + POINT_OFFSET) << 32) | (pt[1] + POINT_OFFSET)
+                    if prev is not None and prev != key:
+                        if prev < key:
+                            a_col.append(prev)
+                            b_col.append(key)
+                            left_col.append(interior_left)
+                        else:
+                            a_col.append(key)
+                            b_col.append(prev)
+                            left_col.append(not interior_left)
+                        muni_col.append(muni_id)
+                    prev = key
+
+
+# (muni_id, a_key, b_key, interior_left, shared)
+BoundaryRow = Tuple[int, int, int, bool, bool]
+
+
+def classify_boundary_edges(table: EdgeTable) -> Dict[int, Set[Edge]]:
+    """
+    Return boundary edges per municipality id.
+
+    An edge is kept for a municipality when it is shared with another municipality,
+    or when it is used exactly once and only by that municipality (outer edge).
+    """
+    out: Dict[int, Set[Edge]] = defaultdict(set)
+    for muni_id, a_key, b_key, _, _ in boundary_edge_rows(table):
+        out[muni_id].add((unpack_point(a_key), unpack_point(b_key)))
+    return out
+
+
+def classify_shared_boundary_edges(
+    table: EdgeTable,
+) -> Tuple[Dict[int, Set[Edge]], Dict[Tuple[int, int], Dict[Edge, bool]]]:
+    """
+    Split boundary edges into outer edges per municipality id and shared edges per
+    municipality pair (low_id, high_id). Shared edges map to True when the low id
+    lies on the left of the canonical edge direction.
+    """
+    outer: Dict[int, Set[Edge]] = defaultdict(set)
+    sides: Dict[int, Dict[int, bool]] = defaultdict(dict)
+    for muni_id, a_key, b_key, interior_left, shared in boundary_edge_rows(table):
+        if shared:
+            sides[(a_key << 64) | b_key][muni_id] = interior_left
+        else:
+            outer[muni_id].add((unpack_point(a_key), unpack_point(b_key)))
+
+    shared_edges: Dict[Tuple[int, int], Dict[Edge, bool]] = defaultdict(dict)
+    for edge_key, muni_sides in sides.items():
+        # Edges touched by more than two municipalities (overlapping input) go to the lowest pair.
+        low, high = sorted(muni_sides)[:2]
+        edge = (unpack_point(edge_key >> 64), unpack_point(edge_key & ((1 << 64) - 1)))
+        shared_edges[(low, high)][edge] = muni_sides[low]
+    return outer, shared_edges
+
+
+def boundary_edge_rows(table: EdgeTable) -> List[BoundaryRow]:
+    if not len(table):
+        return []
+    if np is not None:
+        return _boundary_edge_rows_numpy(table)
+    return _boundary_edge_rows_py(table)
+
+
+def _boundary_edge_rows_numpy(table: EdgeTable) -> List[BoundaryRow]:
+    count = len(table)
+    a_keys = np.frombuffer(table.a, dtype=np.uint64)
+    b_keys = np.frombuffer(table.b, dtype=np.uint64)
+    munis = np.frombuffer(table.muni, dtype=np.uint32)
+    lefts = np.frombuffer(table.left, dtype=np.uint8)
+
+    # Dense point ids make a single int64 key per edge.
+    points, inverse = np.unique(np.concatenate([a_keys, b_keys]), return_inverse=True)
+    inverse = inverse.reshape(-1).astype(np.int64)
+    edge_ids = inverse[:count] * len(points) + inverse[count:]
+
+    order = np.lexsort((munis, edge_ids))
+    edge_ids = edge_ids[order]
+    munis = munis[order]
+    lefts = lefts[order]
+
+    pair_start = np.ones(count, dtype=bool)
+    pair_start[1:] = (edge_ids[1:] != edge_ids[:-1]) | (munis[1:] != munis[:-1])
+    pair_index = np.flatnonzero(pair_start)
+    pair_edges = edge_ids[pair_index]
+    pair_counts = np.diff(np.append(pair_index, count))
+
+    edge_start = np.ones(len(pair_index), dtype=bool)
+    edge_start[1:] = pair_edges[1:] != pair_edges[:-1]
+    edge_group = np.cumsum(edge_start) - 1
+    shared = np.bincount(edge_group)[edge_group] > 1
+
+    keep = shared | (pair_counts == 1)
+    kept_edges = pair_edges[keep]
+    return list(
+        zip(
+            munis[pair_index][keep].tolist(),
+            points[kept_edges // len(points)].tolist(),
+            points[kept_edges % len(points)].tolist(),
+            lefts[pair_index][keep].astype(bool).tolist(),
+            shared[keep].tolist(),
+        )
+    )
+
+
+def _boundary_edge_rows_py(table: EdgeTable) -> List[BoundaryRow]:
+    # Sort (edge, municipality, side) occurrences as single ints, then scan runs.
+    occurrences = sorted(
+        (a_key << 97) | (b_key << 33) | (muni_id << 1) | left
+        for a_key, b_key, muni_id, left in zip(table.a, table.b, table.muni, table.left)
+    )
+    out: List[BoundaryRow] = []
+    index = 0
+    total = len(occurrences)
+    while index < total:
+        edge_key = occurrences[index] >> 33
+        end = index
+        muni_counts: List[List[int]] = []
+        while end < total and occurrences[end] >> 33 == edge_key:
+            occurrence = occurrences[end]
+            muni_id = (occurrence >> 1) & POINT_MASK
+            if muni_counts and muni_counts[-1][0] == muni_id:
+                muni_counts[-1][1] += 1
+            else:
+                muni_counts.append([muni_id, 1, occurrence & 1])
+            end += 1
+        a_key = edge_key >> 64
+        b_key = edge_key & ((1 << 64) - 1)
+        if len(muni_counts) > 1:
+            for muni_id, _, left in muni_counts:
+                out.append((muni_id, a_key, b_key, bool(left), True))
+        elif muni_counts[0][1] == 1:
+            muni_id, _, left = muni_counts[0]
+            out.append((muni_id, a_key, b_key, bool(left), False))
+        index = end
+    return out
+
+
+def dissolved_edge_rows(table: EdgeTable) -> List[Tuple[int, int, int]]:
+    """
+    Cancel edges shared inside a municipality and return its outline as directed
+    (muni_id, from_key, to_key) rows with the interior on the left.
+
+    Each occurrence votes +1 when the interior lies on the left of the canonical
+    direction and -1 otherwise, so edges between two polygons of the same
+    municipality sum to zero.
+    """
+    if not len(table):
+        return []
+    if np is not None:
+        return _dissolved_edge_rows_numpy(table)
+    return _dissolved_edge_rows_py(table)
+
+
+def _dissolved_edge_rows_numpy(table: EdgeTable) -> List[Tuple[int, int, int]]:
+    count = len(table)
+    a_keys = np.frombuffer(table.a, dtype=np.uint64)
+    b_keys = np.frombuffer(table.b, dtype=np.uint64)
+    munis = np.frombuffer(table.muni, dtype=np.uint32)
+    votes = np.frombuffer(table.left, dtype=np.uint8).astype(np.int64) * 2 - 1
+
+    points, inverse = np.unique(np.concatenate([a_keys, b_keys]), return_inverse=True)
+    inverse = inverse.reshape(-1).astype(np.int64)
+    edge_ids = inverse[:count] * len(points) + inverse[count:]
+
+    order = np.lexsort((munis, edge_ids))
+    edge_ids = edge_ids[order]
+    munis = munis[order]
+    votes = votes[order]
+
+    pair_start = np.ones(count, dtype=bool)
+    pair_start[1:] = (edge_ids[1:] != edge_ids[:-1]) | (munis[1:] != munis[:-1])
+    pair_index = np.flatnonzero(pair_start)
+    net = np.add.reduceat(votes, pair_index)
+
+    keep = net != 0
+    kept_edges = edge_ids[pair_index][keep]
+    low = points[kept_edges // len(points)]
+    high = points[kept_edges % len(points)]
+    forward = net[keep] > 0
+    return list(
+        zip(
+            munis[pair_index][keep].tolist(),
+            np.where(forward, low, high).tolist(),
+            np.where(forward, high, low).tolist(),
+        )
+    )
+
+
+def _dissolved_edge_rows_py(table: EdgeTable) -> List[Tuple[int, int, int]]:
+    net: Dict[Tuple[int, int, int], int] = defaultdict(int)
+    for a_key, b_key, muni_id, left in zip(table.a, table.b, table.muni, table.left):
+        net[(muni_id, a_key, b_key)] += 1 if left else -1
+
+    out: List[Tuple[int, int, int]] = []
+    for (muni_id, a_key, b_key), vote in sorted(net.items()):
+        if vote > 0:
+            out.append((muni_id, a_key, b_key))
+        elif vote < 0:
+            out.append((muni_id, b_key, a_key))
+    return out
+
+
+def trace_rings(directed_edges: List[Tuple[int, int]]) -> List[List[Point]]:
+    """
+    Link directed outline edges (interior on the left) into closed rings.
+
+    At pinch vertices the sharpest left turn is taken so that polygons touching
+    at a single point stay separate rings.
+    """
+    outgoing: DefaultDict[int, List[int]] = defaultdict(list)
+    for from_key, to_key in directed_edges:
+        outgoing[from_key].append(to_key)
+
+    rings: List[List[Point]] = []
+    for start_key, _ in directed_edges:
+        if not outgoing.get(start_key):
+            continue
+        ring = [start_key]
+        prev_key, current = start_key, outgoing[start_key].pop()
+        while current != start_key:
+            ring.append(current)
+            candidates = outgoing.get(current)
+            if not candidates:
+                break
+            if len(candidates) == 1:
+                next_key = candidates.pop()
+            else:
+                next_key = _pop_leftmost_turn(prev_key, current, candidates)
+            prev_key, current = current, next_key
+        if current != start_key or len(ring) < 3:
+            continue
+        points = [unpack_point(key) for key in ring]
+        points.append(points[0])
+        rings.append(points)
+    return rings
+
+
+def _pop_leftmost_turn(prev_key: int, current: int, candidates: List[int]) -> int:
+    px, py = unpack_point(prev_key)
+    cx, cy = unpack_point(current)
+    in_x, in_y = cx - px, cy - py
+    best_index = 0
+    best_angle = -math.inf
+    for index, key in enumerate(candidates):
+        nx, ny = unpack_point(key)
+        out_x, out_y = nx - cx, ny - cy
+        angle = math.atan2(in_x * out_y - in_y * out_x, in_x * out_x + in_y * out_y)
+        if angle > best_angle:
+            best_angle = angle
+            best_index = index
+    return candidates.pop(best_index)
+
+
+def ring_twice_area(ring: List[Point]) -> int:
+    return sum(p[0] * q[1] - q[0] * p[1] for p, q in zip(ring, ring[1:]))
+
+
+def assemble_polygons(rings: List[List[Point]]) -> List[List[List[List[float]]]]:
+    """Group CCW shells with the CW holes they contain into GeoJSON polygon coordinates."""
+    shells: List[Tuple[int, List[Point], List[List[Point]]]] = []
+    holes: List[List[Point]] = []
+    for ring in rings:
+        area = ring_twice_area(ring)
+        if area > 0:
+            shells.append((area, ring, []))
+        elif area < 0:
+            holes.append(ring)
+    shells.sort(key=lambda item: (-item[0], item[1][0]))
+
+    bboxes = [
+        (min(x for x, _ in ring), min(y for _, y in ring), max(x for x, _ in ring), max(y for _, y in ring))
+        for _, ring, _ in shells
+    ]
+    for hole in holes:
+        # Edge midpoints never sit on another ring, unlike shared pinch vertices.
+        x = (hole[0][0] + hole[1][0]) / 2
+        y = (hole[0][1] + hole[1][1]) / 2
+        owner = None
+        for index in range(len(shells) - 1, -1, -1):
+            min_x, min_y, max_x, max_y = bboxes[index]
+            if min_x <= x <= max_x and min_y <= y <= max_y and point_in_ring(x, y, shells[index][1]):
+                owner = index
+                break
+        if owner is None:
+            # Unowned hole (broken input): keep its area visible as a shell.
+            shells.append((-ring_twice_area(hole), hole[::-1], []))
+            bboxes.append(
+                (min(x for x, _ in hole), min(y for _, y in hole), max(x for x, _ in hole), max(y for _, y in hole))
+            )
+            continue
+        shells[owner][2].append(hole)
+
+    return [
+        [[dequantize_point(pt) for pt in shell]] + [[dequantize_point(pt) for pt in hole] for hole in shell_holes]
+        for _, shell, shell_holes in shells
+    ]
+
+
 def load_features(path: Path) -> List[dict]:
     with path.open(encoding="utf-8") as f:
         data = json.load(f)
     return list(data.get("features") or [])
 
 
-def merge_edges_to_lines(edges: Set[Edge]) -> List[List[List[float]]]:
-    if not edges:
-        return []
+def iter_n03_features(path: Path) -> Iterator[dict]:
+    """Yield N03 features from a GeoJSON file or lazily from the official .shp distribution."""
+    if path.suffix.lower() == ".shp":
+        yield from iter_shapefile_features(path)
+    else:
+        yield from load_features(path)
 
-    adjacency: DefaultDict[Point, Set[Point]] = defaultdict(set)
-    for a, b in edges:
-        adjacency[a].add(b)
-        adjacency[b].add(a)
 
-    visited: Set[Edge] = set()
-    lines: List[List[Point]] = []
+def merge_edges_to_lines(edges: Iterable[Edge]) -> List[List[List[float]]]:
+    """
+    Chain undirected edges into polylines that break at junctions (degree != 2).
+
+    Edges are consumed from the adjacency lists as they are walked, so each step is
+    O(1) and the output depends only on the edge set, not on its iteration order.
+    """
+    ordered = sorted(edges)
+    if not ordered:
+        return []
+
+    adjacency: DefaultDict[Point, List[Point]] = defaultdict(list)
+    for a, b in ordered:
+        adjacency[a].append(b)
+        adjacency[b].append(a)
+    degree = {point: len(neighbors) for point, neighbors in adjacency.items()}
 
     def walk(start: Point, nxt: Point) -> List[Point]:
+        adjacency[start].remove(nxt)
+        adjacency[nxt].remove(start)
         path: List[Point] = [start, nxt]
-        visited.add(canonical_edge(start, nxt))
-        prev, current = start, nxt
-
-        while True:
-            candidates = [pt for pt in adjacency[current] if pt != prev and canonical_edge(current, pt) not in visited]
-            if not candidates:
-                break
-            if len(adjacency[current]) != 2:
+        current = nxt
+        while current != start and degree[current] == 2:
+            remaining = adjacency[current]
+            if not remaining:
                 break
-            next_point = candidates[0]
+            next_point = remaining.pop()
+            adjacency[next_point].remove(current)
             path.append(next_point)
-            visited.add(canonical_edge(current, next_point))
-            prev, current = current, next_point
-            if current == start:
-                break
+            current = next_point
         return path
 
+    lines: List[List[Point]] = []
     # Open chains: start from nodes that are not degree-2.
-    for node, neighbors in adjacency.items():
-        if len(neighbors) == 2:
+    for node in sorted(adjacency):
+        if degree[node] == 2:
             continue
-        for neighbor in neighbors:
-            edge = canonical_edge(node, neighbor)
-            if edge in visited:
-                continue
-            lines.append(walk(node, neighbor))
+        while adjacency[node]:
+            lines.append(walk(node, adjacency[node][0]))
 
     # Remaining edges are closed loops.
-    for edge in edges:
-        if edge in visited:
-            continue
-        a, b = edge
-        lines.append(walk(a, b))
+    for a, b in ordered:
+        if b in adjacency[a]:
+            lines.append(walk(a, b))
 
-    return [[dequantize_point(pt) for pt in line if len(line) >= 2] for line in lines if len(line) >= 2]
+    return [[dequantize_point(pt) for pt in line] for line in lines if len(line) >= 2]
 
 
-def build_grouped_features(features: List[dict]) -> List[dict]:
+def merge_edge_groups(groups: List[Set[Edge]], workers: int = 1) -> List[List[List[List[float]]]]:
+    """Run merge_edges_to_lines per group, optionally across a process pool; results keep input order."""
+    if workers <= 1 or len(groups) <= 1:
+        return [merge_edges_to_lines(edges) for edges in groups]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(groups) // (workers * 4))
+        return list(pool.map(merge_edges_to_lines, groups, chunksize=chunksize))
+
+
+def build_grouped_features(features: Iterable[dict]) -> List[dict]:
     grouped: Dict[str, dict] = {}
     for ft in features:
         props = dict(ft.get("properties") or {})
@@ -192,12 +578,14 @@ def build_grouped_features(features: List[dict]) -> List[dict]:
     return out
 
 
-def build_extra_pref_boundary_features(
+def collect_fine_edge_table(
     fine_features: List[dict],
     target_pref_names: Set[str],
     excluded_municipalities: Set[str],
-) -> List[dict]:
-    edge_muni_counts: Dict[Edge, Counter] = {}
+) -> Tuple[EdgeTable, List[str], Dict[str, str]]:
+    """Load fine polygon edges into one table; returns (table, names by muni id, pref by name)."""
+    table = EdgeTable()
+    municipality_ids: Dict[str, int] = {}
     municipality_pref: Dict[str, str] = {}
 
     for ft in fine_features:
@@ -215,31 +603,127 @@ def build_extra_pref_boundary_features(
             continue
 
         municipality_pref[municipality] = pref_name
-        for edge in iter_edges(polygons):
-            if edge not in edge_muni_counts:
-                edge_muni_counts[edge] = Counter()
-            edge_muni_counts[edge][municipality] += 1
-
-    municipality_edges: DefaultDict[str, Set[Edge]] = defaultdict(set)
-    for edge, muni_counter in edge_muni_counts.items():
-        municipalities = list(muni_counter.keys())
-        if len(municipalities) == 1:
-            muni = municipalities[0]
-            # count == 1 -> outer municipal edge
-            if muni_counter[muni] == 1:
-                municipality_edges[muni].add(edge)
-        else:
-            # shared by different municipalities -> boundary edge for each side
-            for muni in municipalities:
-                municipality_edges[muni].add(edge)
+        muni_id = municipality_ids.setdefault(municipality, len(municipality_ids))
+        table.add_polygons(polygons, muni_id)
+
+    municipality_names = sorted(municipality_ids, key=municipality_ids.__getitem__)
+    return table, municipality_names, municipality_pref
+
+
+def fine_municipality_area_ids(municipality_names: List[str]) -> Dict[str, str]:
+    return {municipality: f"FINE-{index:05d}" for index, municipality in enumerate(sorted(municipality_names), start=1)}
+
+
+def build_extra_pref_boundary_features(
+    fine_features: List[dict],
+    target_pref_names: Set[str],
+    excluded_municipalities: Set[str],
+    shared_boundary_mode: str = "per-side",
+    workers: int = 1,
+) -> List[dict]:
+    """
+    Derive municipality boundary lines from fine polygons.
+
+    workers > 1 merges chains for municipalities / shared borders in a process pool.
+
+    shared_boundary_mode:
+    - per-side: every municipality feature carries its full outline (shared borders twice).
+    - once: each shared border is drawn by one of its two municipalities only (the
+      first by name), so a municipality feature carries its outer edges plus the
+      shared borders it owns. part_neighbors / part_neighbor_area_ids run parallel to
+      the geometry parts: "" for an outer chain, otherwise the municipality on the
+      right of the chain (the owner is always on its left).
+    """
+    table, municipality_names, municipality_pref = collect_fine_edge_table(
+        fine_features, target_pref_names, excluded_municipalities
+    )
+    area_ids = fine_municipality_area_ids(municipality_names)
+
+    if shared_boundary_mode == "once":
+        outer_by_id, shared_by_pair = classify_shared_boundary_edges(table)
+        municipality_edges = {municipality_names[muni_id]: edges for muni_id, edges in outer_by_id.items()}
+    else:
+        shared_by_pair = {}
+        municipality_edges = {
+            municipality_names[muni_id]: edges for muni_id, edges in classify_boundary_edges(table).items()
+        }
+
+    # (owner, neighbor, edges with a flag for "owner lies on the left") per shared border.
+    shared_borders: List[Tuple[str, str, Dict[Edge, bool]]] = []
+    for (low_id, high_id), low_left in shared_by_pair.items():
+        owner, neighbor = sorted((municipality_names[low_id], municipality_names[high_id]))
+        if owner != municipality_names[low_id]:
+            low_left = {edge: not flag for edge, flag in low_left.items()}
+        shared_borders.append((owner, neighbor, low_left))
+    shared_borders.sort(key=lambda item: (item[0], item[1]))
+
+    municipalities = sorted(set(municipality_edges) | {owner for owner, _, _ in shared_borders})
+    merged = merge_edge_groups(
+        [municipality_edges.get(municipality, set()) for municipality in municipalities]
+        + [set(owner_left) for _, _, owner_left in shared_borders],
+        workers=workers,
+    )
+
+    parts_by_municipality: Dict[str, List[Tuple[str, List[List[float]]]]] = {
+        municipality: [("", line) for line in lines] for municipality, lines in zip(municipalities, merged)
+    }
+    for (owner, neighbor, owner_left), lines in zip(shared_borders, merged[len(municipalities) :]):
+        # Orient every chain so that the owner really lies on its left-hand side.
+        parts_by_municipality[owner].extend(
+            (neighbor, line if chain_has_left_side(line, owner_left) else line[::-1]) for line in lines
+        )
 
     out: List[dict] = []
-    for index, municipality in enumerate(sorted(municipality_edges.keys()), start=1):
-        lines = merge_edges_to_lines(municipality_edges[municipality])
-        if not lines:
+    for municipality in municipalities:
+        parts = parts_by_municipality[municipality]
+        if not parts:
             continue
-        geometry = {"type": "LineString", "coordinates": lines[0]} if len(lines) == 1 else {"type": "MultiLineString", "coordinates": lines}
         pref_name = municipality_pref.get(municipality, "")
+        area_id = area_ids[municipality]
+        props = {
+            "N03_001": pref_name,
+            "N03_002": "",
+            "N03_003": "",
+            "N03_004": municipality,
+            "N03_005": "",
+            "N03_007": area_id,
+            "area_id": area_id,
+            "area_name": municipality,
+            "municipality": municipality,
+            "pref_name": pref_name,
+            "source": "fine-polygon-derived",
+        }
+        if shared_boundary_mode == "once":
+            props["part_neighbors"] = [neighbor for neighbor, _ in parts]
+            props["part_neighbor_area_ids"] = [area_ids[neighbor] if neighbor else "" for neighbor, _ in parts]
+        out.append({"type": "Feature", "properties": props, "geometry": lines_geometry([line for _, line in parts])})
+    return out
+
+
+def build_dissolved_municipality_features(
+    fine_features: List[dict],
+    target_pref_names: Set[str],
+) -> List[dict]:
+    """Dissolve fine polygons into Polygon / MultiPolygon municipality features."""
+    table, municipality_names, municipality_pref = collect_fine_edge_table(fine_features, target_pref_names, set())
+    area_ids = fine_municipality_area_ids(municipality_names)
+
+    edges_by_muni: DefaultDict[int, List[Tuple[int, int]]] = defaultdict(list)
+    for muni_id, from_key, to_key in dissolved_edge_rows(table):
+        edges_by_muni[muni_id].append((from_key, to_key))
+
+    out: List[dict] = []
+    for muni_id, municipality in sorted(enumerate(municipality_names), key=lambda item: item[1]):
+        polygons = assemble_polygons(trace_rings(edges_by_muni.get(muni_id, [])))
+        if not polygons:
+            continue
+        geometry = (
+            {"type": "Polygon", "coordinates": polygons[0]}
+            if len(polygons) == 1
+            else {"type": "MultiPolygon", "coordinates": polygons}
+        )
+        pref_name = municipality_pref.get(municipality, "")
+        area_id = area_ids[municipality]
         out.append(
             {
                 "type": "Feature",
@@ -249,12 +733,12 @@ def build_extra_pref_boundary_features(
                     "N03_003": "",
                     "N03_004": municipality,
                     "N03_005": "",
-                    "N03_007": f"FINE-{index:05d}",
-                    "area_id": f"FINE-{index:05d}",
+                    "N03_007": area_id,
+                    "area_id": area_id,
                     "area_name": municipality,
                     "municipality": municipality,
                     "pref_name": pref_name,
-                    "source": "fine-polygon-derived",
+                    "source": "fine-polygon-dissolved",
                 },
                 "geometry": geometry,
             }
@@ -262,17 +746,94 @@ def build_extra_pref_boundary_features(
     return out
 
 
+def lines_geometry(lines: List[List[List[float]]]) -> dict:
+    if len(lines) == 1:
+        return {"type": "LineString", "coordinates": lines[0]}
+    return {"type": "MultiLineString", "coordinates": lines}
+
+
+def chain_has_left_side(line: List[List[float]], left_of_edge: Dict[Edge, bool]) -> bool:
+    """Whether the side flagged in `left_of_edge` lies on the left of the chain's first segment."""
+    a = quantize_point(line[0])
+    b = quantize_point(line[1])
+    flag = left_of_edge.get(canonical_edge(a, b), True)
+    return flag if a < b else not flag
+
+
+def parse_pref_names(value: Optional[str]) -> Set[str]:
+    return {name.strip() for name in str(value or "").split(",") if name.strip()}
+
+
+def build_admin_boundary_features(
+    fine_features: Optional[List[dict]],
+    n03_paths: List[Path],
+    extra_pref_names: Set[str],
+    shared_boundary_mode: str = "per-side",
+    workers: int = 1,
+    geometry_mode: str = "split",
+    dissolve_pref_names: Optional[Set[str]] = None,
+    allow_missing_n03: bool = False,
+) -> List[dict]:
+    """
+    Municipality features in output order. fine_features may be None when no fine
+    polygons are available (split mode then only emits the N03 prefectures).
+    A missing N03 input is an error unless allow_missing_n03 is set, in which case
+    that prefecture is left out of the output with a warning.
+    """
+    if geometry_mode == "dissolved":
+        grouped = build_dissolved_municipality_features(fine_features or [], dissolve_pref_names or set())
+    else:
+        present_paths = []
+        for path in n03_paths:
+            if path.exists():
+                present_paths.append(path)
+            elif allow_missing_n03:
+                print(f"warning: N03 input not found, skipped: {path}", file=sys.stderr)
+            else:
+                raise SystemExit(
+                    f"error: N03 input not found: {path} "
+                    "(pass --allow-missing-prefecture to build the boundaries without it)"
+                )
+        grouped = build_grouped_features(feature for path in present_paths for feature in iter_n03_features(path))
+        excluded_municipalities = {str(ft.get("properties", {}).get("municipality") or "").strip() for ft in grouped}
+        if extra_pref_names and fine_features is not None:
+            grouped.extend(
+                build_extra_pref_boundary_features(
+                    fine_features,
+                    extra_pref_names,
+                    excluded_municipalities,
+                    shared_boundary_mode=shared_boundary_mode,
+                    workers=workers,
+                )
+            )
+
+    grouped.sort(
+        key=lambda ft: (
+            str(ft.get("properties", {}).get("pref_name") or ""),
+            str(ft.get("properties", {}).get("municipality") or ""),
+            str(ft.get("properties", {}).get("area_id") or ""),
+        )
+    )
+    return grouped
+
+
+def write_boundary_geojson(path: Path, features: List[dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f, ensure_ascii=False)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Build merged municipality boundary GeoJSON from N03 sources.")
     parser.add_argument(
         "--tokyo",
-        default="data/n03_tokyo_kanagawa/tokyo/N03-20250101_13.geojson",
-        help="Tokyo N03 GeoJSON path.",
+        default="data/n03_tokyo_kanagawa/tokyo/N03-20250101_13.shp",
+        help="Tokyo N03 GeoJSON or Shapefile (.shp) path.",
     )
     parser.add_argument(
         "--kanagawa",
-        default="data/n03_tokyo_kanagawa/kanagawa/N03-20250101_14.geojson",
-        help="Kanagawa N03 GeoJSON path.",
+        default="data/n03_tokyo_kanagawa/kanagawa/N03-20250101_14.shp",
+        help="Kanagawa N03 GeoJSON or Shapefile (.shp) path.",
     )
     parser.add_argument(
         "--out",
@@ -289,37 +850,66 @@ def main() -> None:
         default="埼玉県,千葉県",
         help="Comma separated prefecture names to supplement from fine polygons.",
     )
+    parser.add_argument(
+        "--shared-boundary-mode",
+        choices=SHARED_BOUNDARY_MODES,
+        default="per-side",
+        help="per-side: emit shared borders for both municipalities. once: emit each shared border a single time.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used to merge boundary chains (1 = serial, 0 = one per CPU).",
+    )
+    parser.add_argument(
+        "--geometry-mode",
+        choices=("split", "dissolved"),
+        default="split",
+        help=(
+            "split: N03 polygons for Tokyo/Kanagawa + fine-derived lines for extra prefectures. "
+            "dissolved: every prefecture dissolved from fine polygons into municipality polygons (no N03 input)."
+        ),
+    )
+    parser.add_argument(
+        "--dissolve-pref-names",
+        default="東京都,神奈川県,埼玉県,千葉県",
+        help="Comma separated prefecture names to dissolve in --geometry-mode dissolved (empty = all).",
+    )
+    parser.add_argument(
+        "--allow-missing-prefecture",
+        action="store_true",
+        help="split: warn and leave out a prefecture whose --tokyo / --kanagawa input is missing instead of failing.",
+    )
+    parser.add_argument(
+        "--slim-out",
+        default="",
+        help="Also write the browser copy with slim, dictionary-encoded properties (see property_dictionary.py).",
+    )
     args = parser.parse_args()
 
-    in_paths = [Path(args.tokyo), Path(args.kanagawa)]
-    features: List[dict] = []
-    for path in in_paths:
-        features.extend(load_features(path))
-
-    grouped = build_grouped_features(features)
-    excluded_municipalities = {str(ft.get("properties", {}).get("municipality") or "").strip() for ft in grouped}
-
-    extra_pref_names = {name.strip() for name in str(args.extra_pref_names or "").split(",") if name.strip()}
     fine_polygons_path = Path(args.fine_polygons)
-    if extra_pref_names and fine_polygons_path.exists():
+    extra_pref_names = parse_pref_names(args.extra_pref_names)
+    fine_features: Optional[List[dict]] = None
+    if args.geometry_mode == "dissolved" or (extra_pref_names and fine_polygons_path.exists()):
         fine_features = load_features(fine_polygons_path)
-        grouped.extend(build_extra_pref_boundary_features(fine_features, extra_pref_names, excluded_municipalities))
-
-    grouped.sort(
-        key=lambda ft: (
-            str(ft.get("properties", {}).get("pref_name") or ""),
-            str(ft.get("properties", {}).get("municipality") or ""),
-            str(ft.get("properties", {}).get("area_id") or ""),
-        )
+    grouped = build_admin_boundary_features(
+        fine_features,
+        n03_paths=[Path(args.tokyo), Path(args.kanagawa)],
+        extra_pref_names=extra_pref_names,
+        shared_boundary_mode=args.shared_boundary_mode,
+        workers=args.workers or os.cpu_count() or 1,
+        geometry_mode=args.geometry_mode,
+        dissolve_pref_names=parse_pref_names(args.dissolve_pref_names),
+        allow_missing_n03=args.allow_missing_prefecture,
     )
-    out_obj = {"type": "FeatureCollection", "features": grouped}
-
     out_path = Path(args.out)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    with out_path.open("w", encoding="utf-8") as f:
-        json.dump(out_obj, f, ensure_ascii=False)
+    write_boundary_geojson(out_path, grouped)
 
     print(f"wrote: {out_path}")
+    if args.slim_out:
+        size = write_slim_feature_collection(Path(args.slim_out), grouped, BOUNDARY_COLUMNS, BOUNDARY_ENCODED)
+        print(f"wrote: {args.slim_out} ({size} bytes)")
     print(f"features: {len(grouped)}")
 
 
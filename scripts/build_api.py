@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+In-process build API: the pipeline stages as function calls that hand features and
+rows to each other in memory.
+
+Each build script keeps its CLI, but its stage logic is an importable function
+(build_fine_features, build_admin_boundary_features, compute_zip_changes, ...) that
+takes and returns features / rows. InProcessBuild chains them for one configuration:
+
+- asis.csv is parsed once and shared by fine_polygons, zip_index, zip_polygons and
+  zip_changes.
+- The fine polygons built by fine_polygons (or, when that stage did not run, loaded
+  once from its output) are passed to every consumer instead of being parsed again
+  by each stage; label anchors flow into depot_distances the same way.
+- Every stage still writes its output file, with the same bytes as the script.
+
+Usage (with scripts/ on sys.path):
+  from build_api import STAGE_NAMES, BuildConfig, InProcessBuild
+
+  build = InProcessBuild(BuildConfig(asis="asis.csv", coverage_mode="full"))
+  for name in STAGE_NAMES:
+      print(build.run_stage(name))
+  features = build.fine_features()  # reuse the in-memory result
+
+build_pipeline.py --in-process runs its stages through InProcessBuild.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from admin_to_zip_changes import compute_zip_changes, load_area_assignments, write_zip_changes
+from build_admin_boundary_geojson import (
+    build_admin_boundary_features,
+    load_features,
+    parse_pref_names,
+    write_boundary_geojson,
+)
+from build_common import file_sha256
+from build_depot_distances import anchor_points, area_points, build_depot_distances, load_anchor_points, write_distances
+from build_depot_territories import build_territories, write_territories
+from build_feature_delta import update_delta
+from build_fine_polygons_from_asis import build_fine_features, read_csv, summarize, write_feature_collection
+from build_label_anchors import build_label_anchors, write_anchors
+from build_search_index import build_search_index, write_search_index
+from build_town_adjacency import build_town_adjacency, write_adjacency
+from build_zip_depot_index import build_zip_index, write_zip_index
+from build_zip_polygons import build_zip_polygons
+from property_dictionary import (
+    BOUNDARY_COLUMNS,
+    BOUNDARY_ENCODED,
+    FINE_COLUMNS,
+    FINE_ENCODED,
+    write_slim_feature_collection,
+)
+from validate_fine_polygons import validate_features, write_report
+
+
+STAGE_NAMES = (
+    "fine_polygons",
+    "admin_boundaries",
+    "validate_fine",
+    "town_adjacency",
+    "depot_territories",
+    "label_anchors",
+    "depot_distances",
+    "zip_index",
+    "zip_polygons",
+    "search_index",
+    "feature_delta",
+    "zip_changes",
+)
+
+
+@dataclass
+class BuildConfig:
+    """Inputs and outputs of one build; field names and defaults follow build_pipeline.py."""
+
+    asis: str = "asis.csv"
+    baseline: str = "data/asis_admin_assignments.csv"
+    kanagawa_kmz_zip: str = "/Users/tomoki/Downloads/A002005212020DDKWC14.zip"
+    saitama_kmz_zip: str = "/Users/tomoki/Downloads/A002005212020DDKWC11.zip"
+    chiba_kmz_zip: str = "/Users/tomoki/Downloads/A002005212020DDKWC12.zip"
+    tokyo_town_geojson: str = "data/tokyo/machida_towns.geojson"
+    n03_fallback: str = "data/n03_target_admin_areas.geojson"
+    coverage_mode: str = "operational"
+    fine_out: str = "data/asis_fine_polygons.geojson"
+    fine_slim_out: str = ""
+    tokyo_n03: str = "data/n03_tokyo_kanagawa/tokyo/N03-20250101_13.shp"
+    kanagawa_n03: str = "data/n03_tokyo_kanagawa/kanagawa/N03-20250101_14.shp"
+    extra_pref_names: str = "埼玉県,千葉県"
+    boundary_out: str = "data/n03_tokyo_kanagawa_admin_areas.geojson"
+    boundary_geometry_mode: str = "auto"
+    dissolve_pref_names: str = "東京都,神奈川県,埼玉県,千葉県"
+    allow_missing_prefecture: bool = False
+    boundary_slim_out: str = ""
+    validation_report: str = "out/fine_polygons_validation.json"
+    adjacency_out: str = "data/asis_fine_adjacency.json"
+    territories_out: str = "data/asis_depot_territories.geojson"
+    territories_cache_dir: str = ".build_cache/depot_territories"
+    anchors_out: str = "data/asis_label_anchors.json"
+    anchor_precision_m: float = 10.0
+    distances_out: str = "data/asis_depot_distances.json"
+    zip_index_out: str = "data/zip_depot_index.bin"
+    zip_polygons_out: str = "data/asis_zip_polygons.geojson"
+    search_index_out: str = "data/asis_search_index.json"
+    delta_dir: str = "data/asis_fine_polygons.delta"
+    keep_patches: int = 20
+    updated: str = ""
+    zip_out_dir: str = "out"
+
+
+def resolve_boundary_geometry_mode(mode: str, coverage_mode: str) -> str:
+    """
+    "auto" dissolves the municipality boundaries from the fine polygons when they
+    cover whole prefectures (coverage_mode full). Operational fine polygons cover only
+    the target municipalities, so the rest of Tokyo / Kanagawa still comes from N03
+    (split mode).
+    """
+    if mode == "auto":
+        return "dissolved" if coverage_mode == "full" else "split"
+    return mode
+
+
+class InProcessBuild:
+    """Runs stages in this process; intermediate results are computed once and shared."""
+
+    def __init__(self, config: BuildConfig) -> None:
+        self.config = config
+        self._lock = threading.RLock()
+        self._asis_rows: Optional[List[dict]] = None
+        self._fine_features: Optional[List[dict]] = None
+        self._anchors: Optional[dict] = None
+        self._runners: Dict[str, Callable[[], str]] = {
+            "fine_polygons": self._run_fine_polygons,
+            "admin_boundaries": self._run_admin_boundaries,
+            "validate_fine": self._run_validate_fine,
+            "town_adjacency": self._run_town_adjacency,
+            "depot_territories": self._run_depot_territories,
+            "label_anchors": self._run_label_anchors,
+            "depot_distances": self._run_depot_distances,
+            "zip_index": self._run_zip_index,
+            "zip_polygons": self._run_zip_polygons,
+            "search_index": self._run_search_index,
+            "feature_delta": self._run_feature_delta,
+            "zip_changes": self._run_zip_changes,
+        }
+
+    def asis_rows(self) -> List[dict]:
+        with self._lock:
+            if self._asis_rows is None:
+                self._asis_rows = read_csv(Path(self.config.asis))
+            return self._asis_rows
+
+    def fine_features(self) -> List[dict]:
+        """Fine polygons of this build, or of the previous one when fine_polygons did not run."""
+        with self._lock:
+            if self._fine_features is None:
+                self._fine_features = load_features(Path(self.config.fine_out))
+            return self._fine_features
+
+    def run_stage(self, name: str) -> str:
+        """Run one stage and write its outputs; returns a short summary ("wrote: ..." lines)."""
+        runner = self._runners.get(name)
+        if runner is None:
+            raise SystemExit(f"error: unknown stage: {name}")
+        return runner()
+
+    def _run_fine_polygons(self) -> str:
+        c = self.config
+        features = build_fine_features(
+            self.asis_rows(),
+            baseline_path=Path(c.baseline),
+            kanagawa_kmz_zip_path=Path(c.kanagawa_kmz_zip),
+            saitama_kmz_zip_path=Path(c.saitama_kmz_zip),
+            chiba_kmz_zip_path=Path(c.chiba_kmz_zip),
+            tokyo_town_geojson_path=Path(c.tokyo_town_geojson),
+            n03_fallback_path=Path(c.n03_fallback),
+            coverage_mode=c.coverage_mode,
+        )
+        write_feature_collection(Path(c.fine_out), features)
+        with self._lock:
+            self._fine_features = features
+        stats = summarize(features)
+        lines = [f"wrote: {c.fine_out}"]
+        if c.fine_slim_out:
+            size = write_slim_feature_collection(Path(c.fine_slim_out), features, FINE_COLUMNS, FINE_ENCODED)
+            lines.append(f"wrote: {c.fine_slim_out} ({size} bytes)")
+        return "\n".join(lines + [f"features: {stats['total']}", f"assigned: {stats['assigned']}"])
+
+    def _run_admin_boundaries(self) -> str:
+        c = self.config
+        if resolve_boundary_geometry_mode(c.boundary_geometry_mode, c.coverage_mode) == "dissolved":
+            features = build_admin_boundary_features(
+                self.fine_features(),
+                n03_paths=[],
+                extra_pref_names=set(),
+                geometry_mode="dissolved",
+                dissolve_pref_names=parse_pref_names(c.dissolve_pref_names),
+            )
+        else:
+            extra_pref_names = parse_pref_names(c.extra_pref_names)
+            fine_features = self.fine_features() if extra_pref_names and Path(c.fine_out).exists() else None
+            features = build_admin_boundary_features(
+                fine_features,
+                n03_paths=[Path(c.tokyo_n03), Path(c.kanagawa_n03)],
+                extra_pref_names=extra_pref_names,
+                allow_missing_n03=c.allow_missing_prefecture,
+            )
+        write_boundary_geojson(Path(c.boundary_out), features)
+        lines = [f"wrote: {c.boundary_out}"]
+        if c.boundary_slim_out:
+            size = write_slim_feature_collection(Path(c.boundary_slim_out), features, BOUNDARY_COLUMNS, BOUNDARY_ENCODED)
+            lines.append(f"wrote: {c.boundary_slim_out} ({size} bytes)")
+        return "\n".join(lines + [f"features: {len(features)}"])
+
+    def _run_validate_fine(self) -> str:
+        c = self.config
+        report = validate_features(self.fine_features(), c.fine_out)
+        write_report(Path(c.validation_report), report)
+        return f"wrote: {c.validation_report}\nfeatures: {report['features']}\nissues: {len(report['issues'])}"
+
+    def _run_town_adjacency(self) -> str:
+        c = self.config
+        adjacency = build_town_adjacency(self.fine_features())
+        write_adjacency(Path(c.adjacency_out), adjacency)
+        return f"wrote: {c.adjacency_out}\nareas: {len(adjacency['area_ids'])}"
+
+    def _run_depot_territories(self) -> str:
+        c = self.config
+        result = build_territories(Path(c.fine_out), self.fine_features, Path(c.territories_cache_dir))
+        write_territories(Path(c.territories_out), result.features)
+        return f"wrote: {c.territories_out}\nedge cache: {'hit' if result.cache_hit else 'miss'}\nareas: {result.areas}"
+
+    def _run_label_anchors(self) -> str:
+        c = self.config
+        anchors = build_label_anchors(self.fine_features(), c.anchor_precision_m)
+        write_anchors(Path(c.anchors_out), anchors)
+        with self._lock:
+            self._anchors = anchors
+        return f"wrote: {c.anchors_out}\nareas: {len(anchors['areas'])}"
+
+    def _run_depot_distances(self) -> str:
+        c = self.config
+        with self._lock:
+            anchors = anchor_points(self._anchors) if self._anchors is not None else load_anchor_points(Path(c.anchors_out))
+        props_list, points = area_points(self.fine_features(), anchors, c.anchor_precision_m)
+        result = build_depot_distances(props_list, points)
+        write_distances(Path(c.distances_out), result)
+        return f"wrote: {c.distances_out}\nareas: {len(result['areas'])}"
+
+    def _run_zip_index(self) -> str:
+        c = self.config
+        sections, tables = build_zip_index(self.asis_rows())
+        size = write_zip_index(Path(c.zip_index_out), sections, tables, file_sha256(Path(c.asis)))
+        return f"wrote: {c.zip_index_out} ({size} bytes)\nzip codes: {len(sections['zips'])}"
+
+    def _run_zip_polygons(self) -> str:
+        c = self.config
+        features, _ = build_zip_polygons(self.asis_rows(), self.fine_features())
+        write_feature_collection(Path(c.zip_polygons_out), features)
+        return f"wrote: {c.zip_polygons_out}\nzip codes: {len(features)}"
+
+    def _run_search_index(self) -> str:
+        c = self.config
+        index = build_search_index(self.fine_features(), file_sha256(Path(c.fine_out)))
+        size = write_search_index(Path(c.search_index_out), index)
+        return f"wrote: {c.search_index_out} ({size} bytes)\nkeys: {len(index['keys'])}"
+
+    def _run_feature_delta(self) -> str:
+        c = self.config
+        version, entry = update_delta(self.fine_features(), Path(c.delta_dir), max(0, c.keep_patches))
+        patch = f"wrote: {Path(c.delta_dir) / entry['file']}" if entry else "patch: none (no previous build or unchanged)"
+        return f"wrote: {Path(c.delta_dir) / 'manifest.json'}\nversion: {version}\n{patch}"
+
+    def _run_zip_changes(self) -> str:
+        c = self.config
+        if not c.updated:
+            raise SystemExit("error: zip_changes needs an updated assignment CSV")
+        changes = compute_zip_changes(
+            self.asis_rows(),
+            load_area_assignments(Path(c.baseline)),
+            load_area_assignments(Path(c.updated)),
+        )
+        paths = write_zip_changes(Path(c.zip_out_dir), changes)
+        return "\n".join([f"wrote: {path}" for path in paths] + [f"zip rows changed: {len(changes.zip_changes_rows)}"])
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Small helpers shared by the build scripts.
+
+Kept free of imports from the other scripts so that any of them (including
+shapefile_reader.py, which build_admin_boundary_geojson.py itself imports) can use it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from pathlib import Path
+from typing import Sequence
+
+
+# Mean Earth radius (IUGG); every metric conversion in the build scripts uses it.
+EARTH_RADIUS_M = 6_371_008.8
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def point_in_ring(x: float, y: float, ring: Sequence[Sequence[float]]) -> bool:
+    """Even-odd test against a closed ring (first point repeated last)."""
+    inside = False
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+        if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+            inside = not inside
+    return inside
+
+
+def normalize_zip(value: str) -> str:
+    digits = re.sub(r"[^\d]", "", str(value or ""))
+    return digits[:7] if len(digits) >= 7 else digits
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Compute the great-circle distance from every fine area to every depot, the nearest
+depot, and the distance rank of the depot each area is assigned to.
+
+Distances are measured from the area's interior point: the label anchor from
+build_label_anchors.py when --anchors is present (pole of inaccessibility, always inside
+the polygon), otherwise computed here the same way. The haversine distances for all
+areas x depots are one vectorized NumPy expression (plain loop without NumPy).
+
+Depot locations are DEPOT_SITES (same as src/config.js).
+
+Output JSON (sidecar keyed by area_id):
+  {
+    "depots": ["SGM", "FUJ", "YOK"],
+    "areas": {
+      "KA14-...": {"distance_km": [12.3, 4.5, 20.1], "nearest": "FUJ", "rank": 2},
+      ...
+    }
+  }
+distance_km follows "depots". rank is the distance rank of the assigned depot
+(1 = nearest, 0 = unassigned), so rank > 1 flags towns served from a farther depot
+and "nearest" seeds an assignment for NO_DATA towns.
+
+--flag-csv additionally lists the areas assigned to a non-nearest depot and the
+unassigned areas, with the extra distance, for review.
+
+Typical usage:
+  python3 scripts/build_depot_distances.py \
+    --fine-polygons data/asis_fine_polygons.geojson \
+    --anchors data/asis_label_anchors.json \
+    --out data/asis_depot_distances.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from build_admin_boundary_geojson import np, load_features
+from build_common import EARTH_RADIUS_M
+from build_fine_polygons_from_asis import normalize_depot_code
+from build_label_anchors import feature_anchor
+
+
+EARTH_RADIUS_KM = EARTH_RADIUS_M / 1000
+# (code, lat, lng); keep in sync with DEPOT_SITES in src/config.js.
+DEPOT_SITES = (
+    ("SGM", 35.558763, 139.370176),
+    ("FUJ", 35.3982, 139.4699),
+    ("YOK", 35.548296, 139.648303),
+)
+
+
+def haversine_matrix(points: List[Tuple[float, float]], sites: List[Tuple[float, float]]) -> List[List[float]]:
+    """Distances in km, [point][site], for (lon, lat) points and (lat, lng) sites."""
+    if not points:
+        return []
+    if np is not None:
+        pts = np.radians(np.asarray(points, dtype=np.float64))
+        st = np.radians(np.asarray(sites, dtype=np.float64))
+        lon1, lat1 = pts[:, 0:1], pts[:, 1:2]
+        lat2, lon2 = st[:, 0], st[:, 1]
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))).tolist()
+
+    out = []
+    for lon, lat in points:
+        lon1, lat1 = math.radians(lon), math.radians(lat)
+        row = []
+        for site_lat, site_lng in sites:
+            lat2, lon2 = math.radians(site_lat), math.radians(site_lng)
+            a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+            row.append(2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a)))
+        out.append(row)
+    return out
+
+
+def load_anchor_points(path: Path) -> Dict[str, Tuple[float, float]]:
+    if not path.exists():
+        return {}
+    with path.open(encoding="utf-8") as f:
+        return anchor_points(json.load(f))
+
+
+def anchor_points(anchors: dict) -> Dict[str, Tuple[float, float]]:
+    """Interior point per area_id from a build_label_anchors result."""
+    return {area_id: (anchor[0], anchor[1]) for area_id, anchor in (anchors.get("areas") or {}).items()}
+
+
+def area_points(fine_features: List[dict], anchors: Dict[str, Tuple[float, float]], precision_m: float) -> Tuple[List[dict], List[Tuple[float, float]]]:
+    """(properties, interior point) for every fine area that has one."""
+    props_out: List[dict] = []
+    points: List[Tuple[float, float]] = []
+    for ft in fine_features:
+        props = ft.get("properties") or {}
+        area_id = str(props.get("area_id") or "").strip()
+        if not area_id:
+            continue
+        point: Optional[Tuple[float, float]] = anchors.get(area_id)
+        if point is None:
+            anchor = feature_anchor(ft.get("geometry") or {}, precision_m)
+            if anchor is None:
+                continue
+            point = (anchor[0], anchor[1])
+        props_out.append(props)
+        points.append(point)
+    return props_out, points
+
+
+def build_depot_distances(props_list: List[dict], points: List[Tuple[float, float]]) -> dict:
+    codes = [code for code, _, _ in DEPOT_SITES]
+    distances = haversine_matrix(points, [(lat, lng) for _, lat, lng in DEPOT_SITES])
+    areas: Dict[str, dict] = {}
+    for props, row in zip(props_list, distances):
+        order = sorted(range(len(codes)), key=lambda i: row[i])
+        assigned = normalize_depot_code(props.get("depot_code") or "")
+        rank = order.index(codes.index(assigned)) + 1 if assigned in codes else 0
+        areas[str(props["area_id"]).strip()] = {
+            "distance_km": [round(d, 2) for d in row],
+            "nearest": codes[order[0]],
+            "rank": rank,
+        }
+    return {"depots": codes, "areas": dict(sorted(areas.items()))}
+
+
+def write_distances(path: Path, result: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def write_flag_csv(path: Path, props_list: List[dict], result: dict) -> int:
+    codes = result["depots"]
+    rows = []
+    for props in props_list:
+        area_id = str(props["area_id"]).strip()
+        info = result["areas"][area_id]
+        if info["rank"] == 1:
+            continue
+        assigned = normalize_depot_code(props.get("depot_code") or "")
+        nearest_km = min(info["distance_km"])
+        assigned_km = info["distance_km"][codes.index(assigned)] if assigned in codes else ""
+        rows.append(
+            [
+                area_id,
+                props.get("area_name") or "",
+                props.get("municipality") or "",
+                props.get("assign_status") or "",
+                assigned,
+                assigned_km,
+                info["nearest"],
+                nearest_km,
+                round(assigned_km - nearest_km, 2) if assigned_km != "" else "",
+            ]
+        )
+    rows.sort(key=lambda row: (row[8] == "", -(row[8] or 0), row[0]))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "area_id",
+                "area_name",
+                "municipality",
+                "assign_status",
+                "depot_code",
+                "depot_km",
+                "nearest_depot_code",
+                "nearest_km",
+                "extra_km",
+            ]
+        )
+        writer.writerows(rows)
+    return len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Distance from each fine area to each depot, with nearest-depot suggestions.")
+    parser.add_argument("--fine-polygons", default="data/asis_fine_polygons.geojson", help="Fine polygons GeoJSON path.")
+    parser.add_argument("--anchors", default="data/asis_label_anchors.json", help="Label anchors JSON (interior points).")
+    parser.add_argument("--precision-m", type=float, default=10.0, help="Interior point precision when anchors are missing.")
+    parser.add_argument("--out", default="data/asis_depot_distances.json", help="Output distances JSON path.")
+    parser.add_argument("--flag-csv", default="", help="Optional CSV of areas not served by their nearest depot.")
+    args = parser.parse_args()
+
+    fine_features = load_features(Path(args.fine_polygons))
+    anchors = load_anchor_points(Path(args.anchors))
+    props_list, points = area_points(fine_features, anchors, args.precision_m)
+    result = build_depot_distances(props_list, points)
+    out_path = Path(args.out)
+    write_distances(out_path, result)
+
+    areas = result["areas"].values()
+    print(f"wrote: {out_path}")
+    print(f"areas: {len(result['areas'])} (interior points from anchors: {sum(1 for p in props_list if p['area_id'] in anchors)})")
+    print(f"assigned to nearest depot: {sum(1 for info in areas if info['rank'] == 1)}")
+    print(f"assigned to a farther depot: {sum(1 for info in areas if info['rank'] > 1)}")
+    print(f"unassigned (nearest suggested): {sum(1 for info in areas if info['rank'] == 0)}")
+    if args.flag_csv:
+        count = write_flag_csv(Path(args.flag_csv), props_list, result)
+        print(f"wrote: {args.flag_csv} ({count} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Dissolve fine town polygons into one simplified outline per depot (SGM / FUJ / YOK / unassigned).
+
+Meant for low-zoom rendering: a handful of MultiPolygons instead of thousands of towns.
+
+- Dissolve: same signed edge-vote cancellation as build_admin_boundary_geojson.py,
+  with the depot as the group id.
+- Simplification: depot borders are cut into chains between junctions and each chain
+  is simplified once (Douglas-Peucker), so neighbouring territories keep sharing
+  exactly the same border and no gaps or overlaps appear between them.
+- Incremental: the quantized edge table of the fine polygons is cached per input
+  content hash. When only assignments change (`--assignments` CSV exported from the
+  map tool), the GeoJSON is not parsed again; only the depot mapping is re-applied.
+
+Typical usage:
+  python3 scripts/build_depot_territories.py \
+    --fine-polygons data/asis_fine_polygons.geojson \
+    --assignments out/depot_assignments_admin_YYYYMMDD.csv \
+    --out data/asis_depot_territories.geojson
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import math
+from array import array
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, DefaultDict, Dict, List, Optional, Set, Tuple
+
+from build_admin_boundary_geojson import (
+    SCALE,
+    np,
+    EdgeTable,
+    assemble_polygons,
+    dissolved_edge_rows,
+    load_features,
+    normalize_polygons,
+    ring_twice_area,
+    trace_rings,
+    unpack_point,
+)
+from build_common import EARTH_RADIUS_M, file_sha256
+from build_fine_polygons_from_asis import DEPOT_NAMES, normalize_depot_code
+
+
+METERS_PER_UNIT = math.radians(1 / SCALE) * EARTH_RADIUS_M
+DEPOT_ORDER = ("SGM", "FUJ", "YOK", "")  # "" = unassigned
+UNASSIGNED_NAME = "未割当"
+
+
+def collect_area_edge_table(fine_features: List[dict]) -> Tuple[EdgeTable, List[str], List[str]]:
+    """Edge table grouped by area index; returns (table, area_ids, depot_codes) in input order."""
+    table = EdgeTable()
+    area_index: Dict[str, int] = {}
+    depot_codes: List[str] = []
+    for ft in fine_features:
+        props = ft.get("properties") or {}
+        area_id = str(props.get("area_id") or "").strip()
+        polygons = normalize_polygons(ft.get("geometry") or {})
+        if not area_id or not polygons:
+            continue
+        if area_id not in area_index:
+            area_index[area_id] = len(area_index)
+            depot_codes.append(normalize_depot_code(props.get("depot_code") or ""))
+        table.add_polygons(polygons, area_index[area_id])
+    return table, list(area_index), depot_codes
+
+
+def load_edge_cache(cache_dir: Path, fine_sha: str) -> Optional[Tuple[EdgeTable, List[str], List[str]]]:
+    meta_path = cache_dir / "edges.json"
+    bin_path = cache_dir / "edges.bin"
+    if not meta_path.exists() or not bin_path.exists():
+        return None
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    if meta.get("fine_sha256") != fine_sha:
+        return None
+
+    rows = int(meta["rows"])
+    table = EdgeTable()
+    with bin_path.open("rb") as f:
+        for column in (table.a, table.b, table.muni, table.left):
+            column.fromfile(f, rows)
+    return table, list(meta["area_ids"]), list(meta["depot_codes"])
+
+
+def save_edge_cache(cache_dir: Path, fine_sha: str, table: EdgeTable, area_ids: List[str], depot_codes: List[str]) -> None:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with (cache_dir / "edges.bin").open("wb") as f:
+        for column in (table.a, table.b, table.muni, table.left):
+            column.tofile(f)
+    meta = {"fine_sha256": fine_sha, "rows": len(table), "area_ids": area_ids, "depot_codes": depot_codes}
+    (cache_dir / "edges.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+
+def load_assignment_overrides(path: Path) -> Dict[str, str]:
+    with path.open(encoding="utf-8-sig", newline="") as f:
+        return {
+            str(row.get("area_id") or "").strip(): normalize_depot_code(row.get("depot_code") or "")
+            for row in csv.DictReader(f)
+            if str(row.get("area_id") or "").strip()
+        }
+
+
+def regroup_by_depot(area_table: EdgeTable, area_depots: List[int]) -> EdgeTable:
+    """Same edges, with the area index column replaced by the depot index."""
+    if np is not None:
+        mapping = np.asarray(area_depots, dtype=np.uint32)
+        munis = array("I")
+        munis.frombytes(mapping[np.frombuffer(area_table.muni, dtype=np.uint32)].tobytes())
+    else:
+        munis = array("I", (area_depots[index] for index in area_table.muni))
+    return EdgeTable(a=area_table.a, b=area_table.b, muni=munis, left=area_table.left)
+
+
+def border_chains(rows: List[Tuple[int, int, int]]) -> List[Tuple[List[int], Dict[int, bool]]]:
+    """
+    Split directed outline rows (group, from_key, to_key) into chains of packed points
+    between junctions. Each chain maps the groups bordering it to True when that
+    group's outline runs along the chain direction.
+    """
+    owners: DefaultDict[Tuple[int, int], Dict[int, bool]] = defaultdict(dict)
+    neighbours: DefaultDict[int, List[int]] = defaultdict(list)
+    for group, from_key, to_key in rows:
+        edge = (from_key, to_key) if from_key < to_key else (to_key, from_key)
+        if edge not in owners:
+            neighbours[edge[0]].append(edge[1])
+            neighbours[edge[1]].append(edge[0])
+        owners[edge][group] = from_key < to_key
+
+    def owner_set(u: int, v: int) -> frozenset:
+        return frozenset(owners[(u, v) if u < v else (v, u)])
+
+    def is_junction(node: int) -> bool:
+        adjacent = neighbours[node]
+        return len(adjacent) != 2 or owner_set(node, adjacent[0]) != owner_set(node, adjacent[1])
+
+    visited: Set[Tuple[int, int]] = set()
+
+    def walk(start: int, first: int) -> List[int]:
+        path = [start, first]
+        visited.add((start, first) if start < first else (first, start))
+        prev, current = start, first
+        while current != start and not is_junction(current):
+            a, b = neighbours[current]
+            nxt = b if a == prev else a
+            edge = (current, nxt) if current < nxt else (nxt, current)
+            if edge in visited:
+                break
+            visited.add(edge)
+            path.append(nxt)
+            prev, current = current, nxt
+        return path
+
+    paths: List[List[int]] = []
+    nodes = sorted(neighbours)
+    for node in nodes:
+        if is_junction(node):
+            for other in sorted(neighbours[node]):
+                if ((node, other) if node < other else (other, node)) not in visited:
+                    paths.append(walk(node, other))
+    # Whatever is left are closed loops without junctions (islands, enclaves).
+    for node in nodes:
+        for other in sorted(neighbours[node]):
+            if ((node, other) if node < other else (other, node)) not in visited:
+                paths.append(walk(node, other))
+
+    chains = []
+    for path in paths:
+        edge_owners = owners[(path[0], path[1]) if path[0] < path[1] else (path[1], path[0])]
+        along = path[0] < path[1]
+        chains.append((path, {group: forward == along for group, forward in edge_owners.items()}))
+    return chains
+
+
+def simplify_path(points: List[Tuple[int, int]], tolerance: float) -> List[Tuple[int, int]]:
+    """Douglas-Peucker on quantized points; keeps both ends and, if any, one interior point."""
+    if len(points) <= 2:
+        return points
+    kx = math.cos(math.radians(points[0][1] / SCALE))
+    xy = [(x * kx, y) for x, y in points]
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xy[first]
+        bx, by = xy[last]
+        dx, dy = bx - ax, by - ay
+        norm = math.hypot(dx, dy)
+        best_index, best_dist = -1, tolerance
+        for index in range(first + 1, last):
+            px, py = xy[index]
+            if norm:
+                dist = abs(dx * (py - ay) - dy * (px - ax)) / norm
+            else:
+                dist = math.hypot(px - ax, py - ay)
+            if dist > best_dist:
+                best_index, best_dist = index, dist
+        if best_index >= 0:
+            keep[best_index] = True
+            stack.append((first, best_index))
+            stack.append((best_index, last))
+
+    if sum(keep) == 2:
+        # Never collapse a bent chain to a straight segment: two such chains between the
+        # same junctions would fold onto each other.
+        ax, ay = xy[0]
+        keep[max(range(1, len(points) - 1), key=lambda i: math.hypot(xy[i][0] - ax, xy[i][1] - ay))] = True
+    return [pt for pt, kept in zip(points, keep) if kept]
+
+
+def simplify_chain(path: List[int], tolerance: float) -> List[Tuple[int, int]]:
+    points = [unpack_point(key) for key in path]
+    if path[0] != path[-1]:
+        return simplify_path(points, tolerance)
+    # Closed loop: split at the vertex farthest from the start so both halves have fixed ends.
+    x0, y0 = points[0]
+    far = max(range(1, len(points) - 1), key=lambda i: (points[i][0] - x0) ** 2 + (points[i][1] - y0) ** 2)
+    ring = simplify_path(points[: far + 1], tolerance)[:-1] + simplify_path(points[far:], tolerance)
+    # Loops smaller than a tolerance square (tiny islands / holes) are dropped on every side.
+    kx = math.cos(math.radians(y0 / SCALE))
+    if len(ring) < 4 or abs(ring_twice_area(ring)) * kx / 2 < tolerance * tolerance:
+        return []
+    return ring
+
+
+def depot_outline_edges(rows: List[Tuple[int, int, int]], tolerance_m: float) -> Dict[int, List[Tuple[int, int]]]:
+    """Directed outline edges per group after chain-wise simplification."""
+    return chain_outline_edges(border_chains(rows), tolerance_m)
+
+
+def chain_outline_edges(
+    chains: List[Tuple[List[int], Dict[int, bool]]],
+    tolerance_m: float,
+) -> Dict[int, List[Tuple[int, int]]]:
+    """Directed outline edges per group from border_chains() output, simplified at tolerance_m."""
+    tolerance = tolerance_m / METERS_PER_UNIT
+    edges: DefaultDict[int, List[Tuple[int, int]]] = defaultdict(list)
+    for path, groups in chains:
+        points = simplify_chain(path, tolerance) if tolerance > 0 else [unpack_point(key) for key in path]
+        if len(points) < 2:
+            continue
+        keys = [((x + (1 << 31)) << 32) | (y + (1 << 31)) for x, y in points]
+        for group, forward in groups.items():
+            if forward:
+                edges[group].extend(zip(keys, keys[1:]))
+            else:
+                edges[group].extend(zip(keys[1:], keys))
+    return edges
+
+
+def build_depot_features(
+    area_table: EdgeTable,
+    area_ids: List[str],
+    depot_codes: List[str],
+    tolerance_m: float,
+) -> List[dict]:
+    depot_index = {code: index for index, code in enumerate(DEPOT_ORDER)}
+    area_depots = [depot_index.get(code, depot_index[""]) for code in depot_codes]
+    outline = depot_outline_edges(dissolved_edge_rows(regroup_by_depot(area_table, area_depots)), tolerance_m)
+
+    area_counts = [0] * len(DEPOT_ORDER)
+    for index in area_depots:
+        area_counts[index] += 1
+
+    out: List[dict] = []
+    for index, code in enumerate(DEPOT_ORDER):
+        polygons = assemble_polygons(trace_rings(outline.get(index, [])))
+        if not polygons:
+            continue
+        geometry = (
+            {"type": "Polygon", "coordinates": polygons[0]}
+            if len(polygons) == 1
+            else {"type": "MultiPolygon", "coordinates": polygons}
+        )
+        out.append(
+            {
+                "type": "Feature",
+                "properties": {
+                    "depot_code": code,
+                    "depot_name": DEPOT_NAMES.get(code, UNASSIGNED_NAME),
+                    "area_count": area_counts[index],
+                    "source": "fine-polygon-depot-dissolved",
+                },
+                "geometry": geometry,
+            }
+        )
+    return out
+
+
+@dataclass
+class Territories:
+    features: List[dict]
+    areas: int
+    overridden: int
+    cache_hit: bool
+
+
+def build_territories(
+    fine_path: Path,
+    load_fine_features: Callable[[], List[dict]],
+    cache_dir: Path,
+    simplify_m: float = 30.0,
+    assignments_path: Optional[Path] = None,
+) -> Territories:
+    """Territory features; the fine features are only loaded when the edge cache misses."""
+    fine_sha = file_sha256(fine_path)
+    cached = load_edge_cache(cache_dir, fine_sha)
+    if cached is None:
+        area_table, area_ids, depot_codes = collect_area_edge_table(load_fine_features())
+        save_edge_cache(cache_dir, fine_sha, area_table, area_ids, depot_codes)
+    else:
+        area_table, area_ids, depot_codes = cached
+
+    overridden = 0
+    if assignments_path is not None:
+        overrides = load_assignment_overrides(assignments_path)
+        for index, area_id in enumerate(area_ids):
+            if area_id in overrides and overrides[area_id] != depot_codes[index]:
+                depot_codes[index] = overrides[area_id]
+                overridden += 1
+
+    features = build_depot_features(area_table, area_ids, depot_codes, simplify_m)
+    return Territories(features, len(area_ids), overridden, cached is not None)
+
+
+def write_territories(path: Path, features: List[dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f, ensure_ascii=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dissolve fine polygons into simplified per-depot territories.")
+    parser.add_argument("--fine-polygons", default="data/asis_fine_polygons.geojson", help="Fine polygons GeoJSON path.")
+    parser.add_argument(
+        "--assignments",
+        default="",
+        help="Optional assignment CSV (area_id, depot_code) overriding depot_code of the fine polygons.",
+    )
+    parser.add_argument("--out", default="data/asis_depot_territories.geojson", help="Output GeoJSON path.")
+    parser.add_argument("--simplify-m", type=float, default=30.0, help="Simplification tolerance in metres (0 = off).")
+    parser.add_argument("--cache-dir", default=".build_cache/depot_territories", help="Edge table cache directory.")
+    args = parser.parse_args()
+
+    fine_path = Path(args.fine_polygons)
+    result = build_territories(
+        fine_path,
+        lambda: load_features(fine_path),
+        Path(args.cache_dir),
+        args.simplify_m,
+        Path(args.assignments) if args.assignments else None,
+    )
+    out_path = Path(args.out)
+    write_territories(out_path, result.features)
+
+    print(f"wrote: {out_path}")
+    print(f"edge cache: {'hit' if result.cache_hit else 'miss'}")
+    print(f"areas: {result.areas} (overridden: {result.overridden})")
+    for ft in result.features:
+        props = ft["properties"]
+        print(f"{props['depot_code'] or '-'}: {props['area_count']} areas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Write per-feature content hashes for a GeoJSON build and a delta patch from the previous build.
+
+Output directory (default data/asis_fine_polygons.delta/):
+- manifest.json: {"version", "features": {area_id: [geometry_hash, properties_hash]}}
+- index.json:    {"version", "feature_count", "patches": [{"from", "to", "file", "bytes"}, ...]}
+- patch-<from>-<to>.json:
+    {
+      "from": "<previous version>", "to": "<current version>",
+      "added":      [feature, ...],        # new area_id
+      "changed":    [feature, ...],        # geometry changed (full feature)
+      "properties": {area_id: {...}, ...}, # attribute-only change (replaces properties)
+      "removed":    [area_id, ...]
+    }
+
+Hashes are sha256 of canonical JSON (sorted keys, no whitespace) cut to 16 hex digits,
+so they only change when the content does. The version is the hash over all
+(area_id, geometry_hash, properties_hash) rows. A client holding version X fetches
+index.json, applies the patches from X up to the current version in order, and only
+falls back to the full GeoJSON when no chain from X exists.
+
+Typical usage (after build_fine_polygons_from_asis.py):
+  python3 scripts/build_feature_delta.py \
+    --geojson data/asis_fine_polygons.geojson \
+    --out-dir data/asis_fine_polygons.delta
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from build_admin_boundary_geojson import load_features
+
+
+HASH_LENGTH = 16
+
+
+def content_hash(value: object) -> str:
+    data = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+
+
+def keyed_features(features: List[dict]) -> Dict[str, dict]:
+    """Features by area_id; repeated ids get a #n suffix so every feature keeps its own key."""
+    out: Dict[str, dict] = {}
+    for index, ft in enumerate(features):
+        area_id = str((ft.get("properties") or {}).get("area_id") or "").strip() or f"feature:{index:05d}"
+        key, n = area_id, 1
+        while key in out:
+            n += 1
+            key = f"{area_id}#{n}"
+        out[key] = ft
+    return out
+
+
+def feature_hashes(features: Dict[str, dict]) -> Dict[str, List[str]]:
+    return {
+        key: [content_hash(ft.get("geometry")), content_hash(ft.get("properties") or {})]
+        for key, ft in sorted(features.items())
+    }
+
+
+def manifest_version(hashes: Dict[str, List[str]]) -> str:
+    h = hashlib.sha256()
+    for key, (geometry_hash, properties_hash) in sorted(hashes.items()):
+        h.update(f"{key}\t{geometry_hash}\t{properties_hash}\n".encode("utf-8"))
+    return h.hexdigest()[:HASH_LENGTH]
+
+
+def build_patch(
+    previous: Dict[str, List[str]],
+    current: Dict[str, List[str]],
+    features: Dict[str, dict],
+) -> dict:
+    added: List[dict] = []
+    changed: List[dict] = []
+    properties: Dict[str, dict] = {}
+    for key, (geometry_hash, properties_hash) in current.items():
+        old = previous.get(key)
+        if old is None:
+            added.append(features[key])
+        elif old[0] != geometry_hash:
+            changed.append(features[key])
+        elif old[1] != properties_hash:
+            properties[key] = features[key].get("properties") or {}
+    removed = sorted(key for key in previous if key not in current)
+    return {"added": added, "changed": changed, "properties": properties, "removed": removed}
+
+
+def read_json(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    with path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(path: Path, value: object) -> int:
+    data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+    return len(data)
+
+
+def update_delta(geojson_features: List[dict], out_dir: Path, keep_patches: int) -> Tuple[str, Optional[dict]]:
+    """Write manifest/index (and a patch when the content changed); returns (version, patch entry)."""
+    features = keyed_features(geojson_features)
+    hashes = feature_hashes(features)
+    version = manifest_version(hashes)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / "manifest.json"
+    index_path = out_dir / "index.json"
+    previous_manifest = read_json(manifest_path) or {}
+    index = read_json(index_path) or {}
+    patches: List[dict] = list(index.get("patches") or [])
+
+    entry = None
+    previous_version = previous_manifest.get("version")
+    if previous_version and previous_version != version:
+        patch = {"from": previous_version, "to": version}
+        patch.update(build_patch(previous_manifest.get("features") or {}, hashes, features))
+        file_name = f"patch-{previous_version}-{version}.json"
+        size = write_json(out_dir / file_name, patch)
+        entry = {
+            "from": previous_version,
+            "to": version,
+            "file": file_name,
+            "bytes": size,
+            "added": len(patch["added"]),
+            "changed": len(patch["changed"]),
+            "properties": len(patch["properties"]),
+            "removed": len(patch["removed"]),
+        }
+        # A build that returns to an earlier version rewrites the same patch file; keep one entry for it.
+        patches = [p for p in patches if p.get("file") != file_name]
+        patches.append(entry)
+
+    # Drop the oldest patches beyond the limit, together with their files.
+    while len(patches) > keep_patches:
+        dropped = patches.pop(0)
+        if all(p.get("file") != dropped.get("file") for p in patches):
+            (out_dir / dropped["file"]).unlink(missing_ok=True)
+
+    write_json(manifest_path, {"version": version, "features": hashes})
+    write_json(index_path, {"version": version, "feature_count": len(hashes), "patches": patches})
+    return version, entry
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write feature hashes, a manifest and a delta patch for a GeoJSON build.")
+    parser.add_argument("--geojson", default="data/asis_fine_polygons.geojson", help="Current GeoJSON build.")
+    parser.add_argument("--out-dir", default="data/asis_fine_polygons.delta", help="Manifest / patch directory.")
+    parser.add_argument("--keep-patches", type=int, default=20, help="Number of most recent patches to keep.")
+    args = parser.parse_args()
+
+    out_dir = Path(args.out_dir)
+    version, entry = update_delta(load_features(Path(args.geojson)), out_dir, max(0, args.keep_patches))
+    print(f"wrote: {out_dir / 'manifest.json'}")
+    print(f"version: {version}")
+    if entry is None:
+        print("patch: none (no previous build or unchanged)")
+    else:
+        print(f"wrote: {out_dir / entry['file']}")
+        print(
+            f"patch: {entry['bytes']} bytes "
+            f"(added={entry['added']}, changed={entry['changed']}, "
+            f"properties={entry['properties']}, removed={entry['removed']})"
+        )
+
+
+if __name__ == "__main__":
+    main()
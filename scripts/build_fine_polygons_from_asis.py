@@ -12,28 +12,58 @@ Inputs:
 Output:
 - GeoJSON with properties:
   area_id, area_name, municipality, town_name, depot_code, depot_name, assign_status, ...
+  plus asis.csv ZIP statistics per area:
+  zip_code (comma separated), zip_count, zip_depot_counts ({depot: rows}), dispatch_area_label
+
+--coverage-mode nationwide takes any set of e-Stat KMZ wrappers (--kmz-dir, a directory
+or glob of A002005212020DDKWCxx.zip), infers the prefecture from the xx code and writes
+one GeoJSON shard per prefecture plus index.json to --shard-dir. Prefectures are built
+one per process (--jobs at a time) and written as they finish, so peak memory is about
+--jobs times that of the largest prefecture rather than the whole country.
 """
 
 from __future__ import annotations
 
 import argparse
 import csv
+import glob
 import io
 import json
+import multiprocessing
 import re
 import zipfile
 import xml.etree.ElementTree as ET
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Set, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from build_common import normalize_zip
+from property_dictionary import FINE_COLUMNS, FINE_ENCODED, write_slim_feature_collection
 
 
 KML_NS = {"k": "http://www.opengis.net/kml/2.2"}
+KML_PLACEMARK_TAG = "{http://www.opengis.net/kml/2.2}Placemark"
 DEPOT_NAMES = {
     "SGM": "相模原デポ SGM",
     "FUJ": "藤沢デポ FUJ",
     "YOK": "横浜港北デポ YOK",
 }
+# JIS prefecture code -> (name, area_id letters); area_id prefix is letters + code, e.g. KA14.
+PREFECTURES = {
+    "01": ("北海道", "HK"), "02": ("青森県", "AO"), "03": ("岩手県", "IW"), "04": ("宮城県", "MG"),
+    "05": ("秋田県", "AK"), "06": ("山形県", "YT"), "07": ("福島県", "FS"), "08": ("茨城県", "IB"),
+    "09": ("栃木県", "TG"), "10": ("群馬県", "GM"), "11": ("埼玉県", "SA"), "12": ("千葉県", "CB"),
+    "13": ("東京都", "TK"), "14": ("神奈川県", "KA"), "15": ("新潟県", "NI"), "16": ("富山県", "TY"),
+    "17": ("石川県", "IS"), "18": ("福井県", "FI"), "19": ("山梨県", "YN"), "20": ("長野県", "NN"),
+    "21": ("岐阜県", "GF"), "22": ("静岡県", "SZ"), "23": ("愛知県", "AI"), "24": ("三重県", "ME"),
+    "25": ("滋賀県", "SG"), "26": ("京都府", "KY"), "27": ("大阪府", "OS"), "28": ("兵庫県", "HG"),
+    "29": ("奈良県", "NR"), "30": ("和歌山県", "WK"), "31": ("鳥取県", "TT"), "32": ("島根県", "SM"),
+    "33": ("岡山県", "OY"), "34": ("広島県", "HS"), "35": ("山口県", "YG"), "36": ("徳島県", "TS"),
+    "37": ("香川県", "KG"), "38": ("愛媛県", "EH"), "39": ("高知県", "KC"), "40": ("福岡県", "FO"),
+    "41": ("佐賀県", "SN"), "42": ("長崎県", "NS"), "43": ("熊本県", "KM"), "44": ("大分県", "OT"),
+    "45": ("宮崎県", "MZ"), "46": ("鹿児島県", "KS"), "47": ("沖縄県", "OK"),
+}
+KMZ_WRAPPER_PATTERN = re.compile(r"DDKWC(\d{2})", re.IGNORECASE)
 
 
 @dataclass
@@ -96,9 +126,14 @@ def canonical_town_name(value: str) -> str:
 
 
 def read_csv(path: Path) -> List[dict]:
+    return list(iter_csv(path))
+
+
+def iter_csv(path: Path) -> Iterator[dict]:
+    """Rows one at a time, for single-pass readers that should not hold the whole file."""
     with path.open(encoding="utf-8-sig", newline="") as f:
-        reader = csv.DictReader(f)
-        return [dict(row) for row in reader]
+        for row in csv.DictReader(f):
+            yield dict(row)
 
 
 def pick_value(row: dict, headers: Iterable[str]) -> str:
@@ -146,10 +181,44 @@ def infer_municipality_from_asis(city: str, area_label: str, target_munis: Set[s
     return ""
 
 
-def build_town_to_depots_map(asis_path: Path, target_munis: Set[str]) -> Dict[Tuple[str, str], Set[str]]:
-    rows = read_csv(asis_path)
-    out: Dict[Tuple[str, str], Set[str]] = {}
-    for row in rows:
+@dataclass
+class ZipStats:
+    """ZIP rows of asis.csv that fall on one town (or municipality)."""
+
+    zip_codes: Set[str] = field(default_factory=set)
+    depot_rows: Dict[str, int] = field(default_factory=dict)
+    area_labels: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, zip_code: str, depot: str, area_label: str) -> None:
+        if zip_code:
+            self.zip_codes.add(zip_code)
+        self.depot_rows[depot] = self.depot_rows.get(depot, 0) + 1
+        if area_label:
+            self.area_labels[area_label] = self.area_labels.get(area_label, 0) + 1
+
+    def properties(self) -> dict:
+        # Most frequent 対応エリア, ties by name (same rule as the map tool).
+        labels = sorted(self.area_labels.items(), key=lambda item: (-item[1], item[0]))
+        return {
+            "zip_code": ",".join(sorted(self.zip_codes)),
+            "zip_count": len(self.zip_codes),
+            "zip_depot_counts": dict(sorted(self.depot_rows.items())),
+            "dispatch_area_label": labels[0][0] if labels else "",
+        }
+
+
+def build_asis_index(
+    asis_rows: Iterable[dict],
+    target_munis: Set[str],
+) -> Tuple[Dict[Tuple[str, str], Set[str]], Dict[Tuple[str, str], ZipStats], Dict[str, ZipStats]]:
+    """
+    One pass over the asis.csv rows: depots per (municipality, town), plus ZIP statistics
+    per town and per municipality (the latter for areas without town polygons).
+    """
+    town_to_depots: Dict[Tuple[str, str], Set[str]] = {}
+    town_stats: Dict[Tuple[str, str], ZipStats] = {}
+    muni_stats: Dict[str, ZipStats] = {}
+    for row in asis_rows:
         depot = normalize_depot_code(pick_value(row, ["管轄デポ", "担当デポ", "depot_code", "depot"]))
         if not depot:
             continue
@@ -163,31 +232,70 @@ def build_town_to_depots_map(asis_path: Path, target_munis: Set[str]) -> Dict[Tu
         if not municipality:
             continue
 
+        zip_code = normalize_zip(pick_value(row, ["郵便番号", "postal_code", "zip_code", "zip"]))
+        if municipality not in muni_stats:
+            muni_stats[municipality] = ZipStats()
+        muni_stats[municipality].add(zip_code, depot, area_label)
+
         town = pick_value(row, ["町", "town", "S_NAME"])
         if not town or town == "以下に掲載がない場合":
             continue
         town_key = canonical_town_name(town)
         key = (municipality, town_key)
-        if key not in out:
-            out[key] = set()
-        out[key].add(depot)
+        if key not in town_to_depots:
+            town_to_depots[key] = set()
+            town_stats[key] = ZipStats()
+        town_to_depots[key].add(depot)
+        town_stats[key].add(zip_code, depot, area_label)
 
-    return out
+    return town_to_depots, town_stats, muni_stats
+
+
+def build_town_to_depots_map(asis_path: Path, target_munis: Set[str]) -> Dict[Tuple[str, str], Set[str]]:
+    return build_asis_index(iter_csv(asis_path), target_munis)[0]
+
+
+def embed_zip_stats(
+    features: List[dict],
+    town_stats: Dict[Tuple[str, str], ZipStats],
+    muni_stats: Dict[str, ZipStats],
+) -> None:
+    """Add zip_code / zip_count / zip_depot_counts / dispatch_area_label to each feature's properties."""
+    empty = ZipStats().properties()
+    for ft in features:
+        props = ft["properties"]
+        municipality = props.get("municipality") or ""
+        town_name = props.get("town_name") or ""
+        if town_name:
+            stats = town_stats.get((municipality, canonical_town_name(town_name)))
+        else:
+            stats = muni_stats.get(municipality)
+        props.update(stats.properties() if stats else empty)
 
 
-def read_inner_kmz_kml_bytes(wrapper_zip_path: Path) -> bytes:
+def iter_kml_placemarks(wrapper_zip_path: Path) -> Iterator[ET.Element]:
+    """
+    Stream Placemark elements from the KML inside the wrapper ZIP.
+
+    Only the (compressed) inner KMZ is held in memory; the KML is parsed incrementally
+    and each Placemark is cleared once the caller is done with it, so the full element
+    tree of a prefecture is never built.
+    """
     with zipfile.ZipFile(wrapper_zip_path) as outer:
         names = outer.namelist()
         if not names:
             raise RuntimeError(f"No entries found in {wrapper_zip_path}")
-        kmz_name = names[0]
-        kmz_bytes = outer.read(kmz_name)
+        kmz_bytes = outer.read(names[0])
 
     with zipfile.ZipFile(io.BytesIO(kmz_bytes)) as kmz:
         kml_names = [name for name in kmz.namelist() if name.lower().endswith(".kml")]
         if not kml_names:
             raise RuntimeError(f"No KML found in inner KMZ: {wrapper_zip_path}")
-        return kmz.read(kml_names[0])
+        with kmz.open(kml_names[0]) as kml:
+            for _, elem in ET.iterparse(kml, events=("end",)):
+                if elem.tag == KML_PLACEMARK_TAG:
+                    yield elem
+                    elem.clear()
 
 
 def parse_coord_text(coord_text: str) -> List[List[float]]:
@@ -227,12 +335,9 @@ def collect_town_areas_from_kmz(
     area_prefix: str = "KA14",
     default_pref_name: str = "神奈川県",
 ) -> Dict[str, TownArea]:
-    kml_bytes = read_inner_kmz_kml_bytes(kmz_zip_path)
-    root = ET.fromstring(kml_bytes)
-
     grouped: Dict[str, TownArea] = {}
 
-    for pm in root.findall(".//k:Placemark", KML_NS):
+    for pm in iter_kml_placemarks(kmz_zip_path):
         attrs = {e.get("name"): (e.text or "").strip() for e in pm.findall(".//k:SimpleData", KML_NS)}
         municipality = canonical_municipality(attrs.get("CITY_NAME", ""))
         town_name = str(attrs.get("S_NAME", "")).strip()
@@ -504,73 +609,190 @@ def summarize(features: List[dict]) -> Dict[str, int]:
     return out
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Build fine-grained area polygons with existing assignment.")
-    parser.add_argument("--asis", default="asis.csv", help="Path to asis CSV.")
-    parser.add_argument(
-        "--kanagawa-kmz-zip",
-        default="/Users/tomoki/Downloads/A002005212020DDKWC14.zip",
-        help="Path to e-Stat KMZ wrapper ZIP for Kanagawa.",
-    )
-    parser.add_argument(
-        "--baseline",
-        default="data/asis_admin_assignments.csv",
-        help="Baseline admin assignment CSV for municipality fallback.",
-    )
-    parser.add_argument(
-        "--saitama-kmz-zip",
-        default="/Users/tomoki/Downloads/A002005212020DDKWC11.zip",
-        help="Path to e-Stat KMZ wrapper ZIP for Saitama.",
-    )
-    parser.add_argument(
-        "--chiba-kmz-zip",
-        default="/Users/tomoki/Downloads/A002005212020DDKWC12.zip",
-        help="Path to e-Stat KMZ wrapper ZIP for Chiba.",
-    )
-    parser.add_argument(
-        "--tokyo-town-geojson",
-        default="data/tokyo/machida_towns.geojson",
-        help="Optional Tokyo town-level input. Supports GeoJSON or e-Stat KMZ wrapper ZIP (e.g. A002005212020DDKWC13.zip).",
-    )
-    parser.add_argument(
-        "--n03-fallback",
-        default="data/n03_target_admin_areas.geojson",
-        help="N03 GeoJSON used for municipalities not covered by town polygons.",
-    )
-    parser.add_argument(
-        "--out",
-        default="data/asis_fine_polygons.geojson",
-        help="Output GeoJSON path.",
+def find_kmz_wrappers(kmz_dir: str) -> Dict[str, Path]:
+    """e-Stat KMZ wrappers by prefecture code, from a directory or a glob pattern."""
+    root = Path(kmz_dir)
+    paths = sorted(root.glob("*.zip")) if root.is_dir() else sorted(Path(p) for p in glob.glob(kmz_dir))
+    out: Dict[str, Path] = {}
+    for path in paths:
+        match = KMZ_WRAPPER_PATTERN.search(path.name)
+        if not match or match.group(1) not in PREFECTURES:
+            print(f"warn: skip {path} (no prefecture code in the file name)")
+            continue
+        pref_code = match.group(1)
+        if pref_code in out:
+            raise SystemExit(f"error: two KMZ wrappers for prefecture {pref_code}: {out[pref_code]}, {path}")
+        out[pref_code] = path
+    return out
+
+
+def baseline_pref_codes(path: Path) -> Dict[str, Set[str]]:
+    """Operational municipalities per prefecture code (baseline area_id is the N03 municipality code)."""
+    out: Dict[str, Set[str]] = {}
+    for row in read_csv(path):
+        muni = canonical_municipality(pick_value(row, ["area_name", "municipality", "name", "市区"]))
+        code = pick_value(row, ["area_id", "code"])
+        if muni and len(code) >= 2:
+            out.setdefault(code[:2], set()).add(muni)
+    return out
+
+
+@dataclass
+class PrefLookups:
+    """Depot / ZIP lookups restricted to one prefecture's operational municipalities."""
+
+    town_to_depots: Dict[Tuple[str, str], Set[str]]
+    town_stats: Dict[Tuple[str, str], ZipStats]
+    muni_stats: Dict[str, ZipStats]
+    muni_to_single_depot: Dict[str, str]
+    muni_to_depots: Dict[str, Set[str]]
+
+
+def write_feature_collection(path: Path, features: Iterable[dict]) -> None:
+    """Same bytes as json.dump of the FeatureCollection, written one feature at a time."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        f.write('{"type": "FeatureCollection", "features": [')
+        for index, ft in enumerate(features):
+            if index:
+                f.write(", ")
+            # json.dumps takes the C encoder; json.dump to a file always uses the pure-Python one.
+            f.write(json.dumps(ft, ensure_ascii=False))
+        f.write("]}")
+    tmp_path.replace(path)
+
+
+def features_bbox(features: List[dict]) -> Optional[List[float]]:
+    min_lon = min_lat = float("inf")
+    max_lon = max_lat = float("-inf")
+    for ft in features:
+        geometry = ft.get("geometry") or {}
+        polygons = geometry.get("coordinates") or []
+        if geometry.get("type") == "Polygon":
+            polygons = [polygons]
+        for poly in polygons:
+            lons = [pt[0] for pt in poly[0]]
+            lats = [pt[1] for pt in poly[0]]
+            min_lon, max_lon = min(min_lon, *lons), max(max_lon, *lons)
+            min_lat, max_lat = min(min_lat, *lats), max(max_lat, *lats)
+    if min_lon > max_lon:
+        return None
+    return [round(min_lon, 6), round(min_lat, 6), round(max_lon, 6), round(max_lat, 6)]
+
+
+def build_pref_shard(pref_code: str, kmz_zip_path: Path, shard_dir: Path, lookups: PrefLookups) -> dict:
+    """Build and write one prefecture shard; only its summary is returned, the features are dropped."""
+    pref_name, letters = PREFECTURES[pref_code]
+    area_prefix = f"{letters}{pref_code}"
+    areas = collect_town_areas_from_kmz(
+        kmz_zip_path,
+        target_munis=None,
+        area_prefix=area_prefix,
+        default_pref_name=pref_name,
     )
-    parser.add_argument(
-        "--coverage-mode",
-        choices=("operational", "full"),
-        default="operational",
-        help=(
-            "operational: 既存運用対象のみ生成（既定）。 "
-            "full: 神奈川全域 + 東京全域を生成（Tokyo町域入力が必要）。"
-        ),
+    features = build_town_features(
+        areas,
+        lookups.town_to_depots,
+        lookups.muni_to_single_depot,
+        lookups.muni_to_depots,
+        source_tag=f"e-stat-r2ka{pref_code}-kmz",
     )
-    args = parser.parse_args()
-
-    asis_path = Path(args.asis)
-    kanagawa_kmz_zip_path = Path(args.kanagawa_kmz_zip)
-    saitama_kmz_zip_path = Path(args.saitama_kmz_zip)
-    chiba_kmz_zip_path = Path(args.chiba_kmz_zip)
-    baseline_path = Path(args.baseline)
-    tokyo_town_geojson_path = Path(args.tokyo_town_geojson)
-    n03_fallback_path = Path(args.n03_fallback)
-    out_path = Path(args.out)
+    del areas
+    embed_zip_stats(features, lookups.town_stats, lookups.muni_stats)
+
+    shard_path = shard_dir / f"{area_prefix}.geojson"
+    write_feature_collection(shard_path, features)
+    stats = summarize(features)
+    return {
+        "pref_code": pref_code,
+        "pref_name": pref_name,
+        "area_prefix": area_prefix,
+        "file": shard_path.name,
+        "bytes": shard_path.stat().st_size,
+        "features": stats["total"],
+        "assigned": stats["assigned"],
+        "with_zip_stats": sum(1 for ft in features if ft["properties"]["zip_count"]),
+        "bbox": features_bbox(features),
+    }
+
+
+def _build_pref_shard_task(task: Tuple[str, Path, Path, PrefLookups]) -> dict:
+    return build_pref_shard(*task)
+
+
+def build_nationwide_shards(
+    kmz_dir: str,
+    asis_path: Path,
+    baseline_path: Path,
+    shard_dir: Path,
+    jobs: int,
+) -> List[dict]:
+    wrappers = find_kmz_wrappers(kmz_dir)
+    if not wrappers:
+        raise SystemExit(f"error: no e-Stat KMZ wrappers (A002005212020DDKWCxx.zip) found: {kmz_dir}")
 
+    muni_to_single_depot, muni_to_depots = load_baseline_assignments(baseline_path)
+    town_to_depots, town_stats, muni_stats = build_asis_index(iter_csv(asis_path), set(muni_to_depots))
+    munis_by_pref = baseline_pref_codes(baseline_path)
+
+    tasks = []
+    for pref_code, path in sorted(wrappers.items()):
+        # Municipality names repeat across prefectures (e.g. 府中市), so only this
+        # prefecture's operational municipalities may lend a depot or ZIP statistics.
+        munis = munis_by_pref.get(pref_code, set())
+        lookups = PrefLookups(
+            town_to_depots={key: value for key, value in town_to_depots.items() if key[0] in munis},
+            town_stats={key: value for key, value in town_stats.items() if key[0] in munis},
+            muni_stats={key: value for key, value in muni_stats.items() if key in munis},
+            muni_to_single_depot={key: value for key, value in muni_to_single_depot.items() if key in munis},
+            muni_to_depots={key: value for key, value in muni_to_depots.items() if key in munis},
+        )
+        tasks.append((pref_code, path, shard_dir, lookups))
+
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    shards: List[dict] = []
+    if jobs <= 1:
+        for task in tasks:
+            shards.append(_build_pref_shard_task(task))
+            print(f"shard: {shards[-1]['file']} ({shards[-1]['features']} features)")
+    else:
+        # One prefecture per worker process, so its memory is returned to the OS when it ends.
+        with multiprocessing.Pool(processes=jobs, maxtasksperchild=1) as pool:
+            for shard in pool.imap_unordered(_build_pref_shard_task, tasks):
+                shards.append(shard)
+                print(f"shard: {shard['file']} ({shard['features']} features)")
+    shards.sort(key=lambda shard: shard["pref_code"])
+
+    index = {
+        "features": sum(shard["features"] for shard in shards),
+        "shards": shards,
+    }
+    with (shard_dir / "index.json").open("w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    return shards
+
+
+def build_fine_features(
+    asis_rows: Iterable[dict],
+    baseline_path: Path,
+    kanagawa_kmz_zip_path: Path,
+    saitama_kmz_zip_path: Path,
+    chiba_kmz_zip_path: Path,
+    tokyo_town_geojson_path: Path,
+    n03_fallback_path: Path,
+    coverage_mode: str = "operational",
+) -> List[dict]:
+    """Fine polygon features of the operational / full coverage modes (what --out receives)."""
     muni_to_single_depot, muni_to_depots = load_baseline_assignments(baseline_path)
     operational_munis = set(muni_to_depots.keys())
     kanagawa_target_munis: Optional[Set[str]] = operational_munis - {"町田市"}
     tokyo_target_munis: Optional[Set[str]] = {"町田市"}
-    if args.coverage_mode == "full":
+    if coverage_mode == "full":
         kanagawa_target_munis = None
         tokyo_target_munis = None
 
-    town_to_depots = build_town_to_depots_map(asis_path, operational_munis)
+    town_to_depots, town_stats, muni_stats = build_asis_index(asis_rows, operational_munis)
     town_areas = collect_town_areas_from_kmz(kanagawa_kmz_zip_path, kanagawa_target_munis)
     kanagawa_town_features = build_town_features(town_areas, town_to_depots, muni_to_single_depot, muni_to_depots)
 
@@ -593,7 +815,7 @@ def main() -> None:
 
     saitama_town_features = []
     chiba_town_features = []
-    if args.coverage_mode == "full":
+    if coverage_mode == "full":
         saitama_town_features = load_pref_town_features_from_kmz(
             saitama_kmz_zip_path,
             target_munis=None,
@@ -622,7 +844,7 @@ def main() -> None:
     # 東京町域データが無い場合は、N03境界でフォールバックする。
     fallback_features = []
     if not tokyo_town_features:
-        if args.coverage_mode == "full":
+        if coverage_mode == "full":
             fallback_features = load_n03_fallback_features(
                 n03_fallback_path,
                 target_ids=None,
@@ -645,18 +867,121 @@ def main() -> None:
         + chiba_town_features
         + fallback_features
     )
-    out = {"type": "FeatureCollection", "features": all_features}
+    embed_zip_stats(all_features, town_stats, muni_stats)
+    return all_features
 
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    with out_path.open("w", encoding="utf-8") as f:
-        json.dump(out, f, ensure_ascii=False)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build fine-grained area polygons with existing assignment.")
+    parser.add_argument("--asis", default="asis.csv", help="Path to asis CSV.")
+    parser.add_argument(
+        "--kanagawa-kmz-zip",
+        default="/Users/tomoki/Downloads/A002005212020DDKWC14.zip",
+        help="Path to e-Stat KMZ wrapper ZIP for Kanagawa.",
+    )
+    parser.add_argument(
+        "--baseline",
+        default="data/asis_admin_assignments.csv",
+        help="Baseline admin assignment CSV for municipality fallback.",
+    )
+    parser.add_argument(
+        "--saitama-kmz-zip",
+        default="/Users/tomoki/Downloads/A002005212020DDKWC11.zip",
+        help="Path to e-Stat KMZ wrapper ZIP for Saitama.",
+    )
+    parser.add_argument(
+        "--chiba-kmz-zip",
+        default="/Users/tomoki/Downloads/A002005212020DDKWC12.zip",
+        help="Path to e-Stat KMZ wrapper ZIP for Chiba.",
+    )
+    parser.add_argument(
+        "--tokyo-town-geojson",
+        default="data/tokyo/machida_towns.geojson",
+        help="Optional Tokyo town-level input. Supports GeoJSON or e-Stat KMZ wrapper ZIP (e.g. A002005212020DDKWC13.zip).",
+    )
+    parser.add_argument(
+        "--n03-fallback",
+        default="data/n03_target_admin_areas.geojson",
+        help="N03 GeoJSON used for municipalities not covered by town polygons.",
+    )
+    parser.add_argument(
+        "--out",
+        default="data/asis_fine_polygons.geojson",
+        help="Output GeoJSON path.",
+    )
+    parser.add_argument(
+        "--coverage-mode",
+        choices=("operational", "full", "nationwide"),
+        default="operational",
+        help=(
+            "operational: 既存運用対象のみ生成（既定）。 "
+            "full: 神奈川全域 + 東京全域を生成（Tokyo町域入力が必要）。 "
+            "nationwide: --kmz-dir の全都道府県を都道府県別シャードとして --shard-dir に出力。"
+        ),
+    )
+    parser.add_argument(
+        "--kmz-dir",
+        default="/Users/tomoki/Downloads",
+        help="nationwide: directory or glob of e-Stat KMZ wrapper ZIPs (A002005212020DDKWCxx.zip).",
+    )
+    parser.add_argument(
+        "--shard-dir",
+        default="data/asis_fine_polygons.shards",
+        help="nationwide: output directory for per-prefecture GeoJSON shards and index.json.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="nationwide: prefectures built concurrently (peak memory grows with this).",
+    )
+    parser.add_argument(
+        "--slim-out",
+        default="",
+        help="Also write the browser copy with slim, dictionary-encoded properties (see property_dictionary.py).",
+    )
+    args = parser.parse_args()
+
+    if args.coverage_mode == "nationwide":
+        shard_dir = Path(args.shard_dir)
+        shards = build_nationwide_shards(
+            args.kmz_dir,
+            Path(args.asis),
+            Path(args.baseline),
+            shard_dir,
+            max(1, args.jobs),
+        )
+        print(f"wrote: {shard_dir / 'index.json'}")
+        print(f"coverage_mode: {args.coverage_mode}")
+        print(f"shards: {len(shards)}")
+        print(f"features: {sum(shard['features'] for shard in shards)}")
+        print(f"assigned: {sum(shard['assigned'] for shard in shards)}")
+        print(f"with zip stats: {sum(shard['with_zip_stats'] for shard in shards)}")
+        return
+
+    out_path = Path(args.out)
+    all_features = build_fine_features(
+        iter_csv(Path(args.asis)),
+        baseline_path=Path(args.baseline),
+        kanagawa_kmz_zip_path=Path(args.kanagawa_kmz_zip),
+        saitama_kmz_zip_path=Path(args.saitama_kmz_zip),
+        chiba_kmz_zip_path=Path(args.chiba_kmz_zip),
+        tokyo_town_geojson_path=Path(args.tokyo_town_geojson),
+        n03_fallback_path=Path(args.n03_fallback),
+        coverage_mode=args.coverage_mode,
+    )
+    write_feature_collection(out_path, all_features)
 
     stats = summarize(all_features)
     print(f"wrote: {out_path}")
+    if args.slim_out:
+        size = write_slim_feature_collection(Path(args.slim_out), all_features, FINE_COLUMNS, FINE_ENCODED)
+        print(f"wrote: {args.slim_out} ({size} bytes)")
     print(f"coverage_mode: {args.coverage_mode}")
     print(f"features: {stats['total']}")
     print(f"assigned: {stats['assigned']} (SGM={stats['SGM']}, FUJ={stats['FUJ']}, YOK={stats['YOK']})")
     print(f"unassigned: {stats['unassigned']}")
+    print(f"with zip stats: {sum(1 for ft in all_features if ft['properties']['zip_count'])}")
 
 
 if __name__ == "__main__":
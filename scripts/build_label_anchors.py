@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Compute label anchor points (pole of inaccessibility) for fine areas and municipalities.
+
+Centroids of concave towns often fall outside the polygon; the pole of inaccessibility
+is the interior point farthest from any edge, which is where a label fits best.
+It is found with the grid-refinement search used by polylabel: cover the largest
+polygon part with square cells, then repeatedly split the cells that could still hold
+a better point than the best found so far, until the gain is below `--precision-m`.
+
+Municipality anchors are computed on municipality polygons dissolved from the fine
+polygons (same dissolve as build_admin_boundary_geojson.py --geometry-mode dissolved).
+
+Output JSON (sidecar, keyed for a plain lookup on the client):
+  {
+    "areas":          {"KA14-...": [lon, lat, radius_m], ...},
+    "municipalities": {"横浜市港北区": [lon, lat, radius_m], ...}
+  }
+radius_m is the distance from the anchor to the nearest edge, i.e. how much room a label has.
+
+Typical usage:
+  python3 scripts/build_label_anchors.py \
+    --fine-polygons data/asis_fine_polygons.geojson \
+    --out data/asis_label_anchors.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from build_admin_boundary_geojson import (
+    np,
+    build_dissolved_municipality_features,
+    load_features,
+    normalize_polygons,
+)
+from build_common import EARTH_RADIUS_M
+
+
+METERS_PER_DEGREE = math.radians(1) * EARTH_RADIUS_M
+SQRT2 = math.sqrt(2)
+MANY_BLOCK_ELEMENTS = 1 << 20
+
+# Segments as (ax, ay, bx, by) in projected degrees.
+Segments = List[Tuple[float, float, float, float]]
+
+
+class PolygonDistance:
+    """Signed distance to a polygon (positive inside), vectorized over segments when NumPy is available."""
+
+    def __init__(self, segments: Segments) -> None:
+        self.segments = segments
+        if np is None:
+            self._py_segments = [
+                (ax, ay, by, bx - ax, by - ay, 1 / ((bx - ax) ** 2 + (by - ay) ** 2) if (ax, ay) != (bx, by) else 0.0)
+                for ax, ay, bx, by in segments
+            ]
+        else:
+            arr = np.asarray(segments, dtype=np.float64)
+            self.ax, self.ay, self.bx, self.by = arr[:, 0], arr[:, 1], arr[:, 2], arr[:, 3]
+            self.dx = self.bx - self.ax
+            self.dy = self.by - self.ay
+            self.len2 = self.dx * self.dx + self.dy * self.dy
+            # Degenerate segments behave like points.
+            self.safe_len2 = np.where(self.len2 > 0, self.len2, 1.0)
+            self.safe_dy = np.where(self.dy != 0, self.dy, 1.0)
+
+    def __call__(self, x: float, y: float) -> float:
+        if np is not None:
+            return self._distance_numpy(x, y)
+        return self._distance_py(x, y)
+
+    def many(self, xs: List[float], ys: List[float]) -> List[float]:
+        """Distances for several points; NumPy evaluates points x segments in one broadcast."""
+        if np is None:
+            return [self._distance_py(x, y) for x, y in zip(xs, ys)]
+        out: List[float] = []
+        # Bound the points x segments temporaries (~MANY_BLOCK_ELEMENTS floats each).
+        step = max(1, MANY_BLOCK_ELEMENTS // len(self.ax))
+        for start in range(0, len(xs), step):
+            out.extend(self._many_numpy(xs[start : start + step], ys[start : start + step]))
+        return out
+
+    def _many_numpy(self, xs: List[float], ys: List[float]) -> List[float]:
+        x = np.asarray(xs, dtype=np.float64)[:, None]
+        y = np.asarray(ys, dtype=np.float64)[:, None]
+        ax, ay = self.ax, self.ay
+        crosses = ((ay > y) != (self.by > y)) & (x < self.dx * (y - ay) / self.safe_dy + ax)
+        t = np.clip(((x - ax) * self.dx + (y - ay) * self.dy) / self.safe_len2, 0.0, 1.0)
+        px = ax + t * self.dx - x
+        py = ay + t * self.dy - y
+        distance = np.sqrt(np.min(px * px + py * py, axis=1))
+        inside = np.count_nonzero(crosses, axis=1) % 2 == 1
+        return np.where(inside, distance, -distance).tolist()
+
+    def _distance_numpy(self, x: float, y: float) -> float:
+        ax, ay = self.ax, self.ay
+        crosses = ((ay > y) != (self.by > y)) & (x < self.dx * (y - ay) / self.safe_dy + ax)
+        t = np.clip(((x - ax) * self.dx + (y - ay) * self.dy) / self.safe_len2, 0.0, 1.0)
+        px = ax + t * self.dx - x
+        py = ay + t * self.dy - y
+        distance = math.sqrt(float(np.min(px * px + py * py)))
+        return distance if int(np.count_nonzero(crosses)) % 2 else -distance
+
+    def _distance_py(self, x: float, y: float) -> float:
+        inside = False
+        best = math.inf
+        for ax, ay, by, dx, dy, inv_len2 in self._py_segments:
+            if (ay > y) != (by > y) and x < dx * (y - ay) / dy + ax:
+                inside = not inside
+            t = ((x - ax) * dx + (y - ay) * dy) * inv_len2
+            t = 0.0 if t < 0.0 else 1.0 if t > 1.0 else t
+            ex, ey = ax + t * dx - x, ay + t * dy - y
+            d2 = ex * ex + ey * ey
+            if d2 < best:
+                best = d2
+        distance = math.sqrt(best)
+        return distance if inside else -distance
+
+
+def ring_area(ring: List[List[float]]) -> float:
+    return sum(p[0] * q[1] - q[0] * p[1] for p, q in zip(ring, ring[1:])) / 2
+
+
+def largest_part(polygons: List[list]) -> Optional[list]:
+    best, best_area = None, 0.0
+    for poly in polygons:
+        if not poly or len(poly[0]) < 4:
+            continue
+        area = abs(ring_area(poly[0])) - sum(abs(ring_area(hole)) for hole in poly[1:] if len(hole) >= 4)
+        if area > best_area:
+            best, best_area = poly, area
+    return best
+
+
+def pole_of_inaccessibility(polygon: list, precision_m: float) -> Tuple[float, float, float]:
+    """Return (lon, lat, radius_m) for one GeoJSON polygon (outer ring + holes)."""
+    outer = polygon[0]
+    min_lon = min(pt[0] for pt in outer)
+    max_lon = max(pt[0] for pt in outer)
+    min_lat = min(pt[1] for pt in outer)
+    max_lat = max(pt[1] for pt in outer)
+    # Equirectangular projection around the part, so cells are square on the ground.
+    kx = math.cos(math.radians((min_lat + max_lat) / 2))
+
+    segments: Segments = []
+    for ring in polygon:
+        for p, q in zip(ring, ring[1:]):
+            segments.append((p[0] * kx, p[1], q[0] * kx, q[1]))
+    distance = PolygonDistance(segments)
+
+    min_x, max_x = min_lon * kx, max_lon * kx
+    width, height = max_x - min_x, max_lat - min_lat
+    cell_size = min(width, height)
+    if cell_size <= 0:
+        return (min_lon, min_lat, 0.0)
+    precision = precision_m / METERS_PER_DEGREE
+
+    # Heap entries: (-potential, distance, x, y, half size); potential bounds the best point in the cell.
+    heap: List[Tuple[float, float, float, float, float]] = []
+
+    def push_cells(xs: List[float], ys: List[float], half: float) -> None:
+        for x, y, d in zip(xs, ys, distance.many(xs, ys)):
+            heapq.heappush(heap, (-(d + half * SQRT2), d, x, y, half))
+
+    half = cell_size / 2
+    grid_xs: List[float] = []
+    grid_ys: List[float] = []
+    x = min_x
+    while x < max_x:
+        y = min_lat
+        while y < max_lat:
+            grid_xs.append(x + half)
+            grid_ys.append(y + half)
+            y += cell_size
+        x += cell_size
+    push_cells(grid_xs, grid_ys, half)
+
+    # Start from the area centroid (fine for convex parts), else the bbox centre.
+    twice_area = 0.0
+    cx = cy = 0.0
+    for ax, ay, bx, by in segments[: len(outer) - 1]:
+        cross = ax * by - bx * ay
+        twice_area += cross
+        cx += (ax + bx) * cross
+        cy += (ay + by) * cross
+    if twice_area:
+        best_x, best_y = cx / (3 * twice_area), cy / (3 * twice_area)
+    else:
+        best_x, best_y = segments[0][0], segments[0][1]
+    best_d = distance(best_x, best_y)
+    center_d = distance(min_x + width / 2, min_lat + height / 2)
+    if center_d > best_d:
+        best_x, best_y, best_d = min_x + width / 2, min_lat + height / 2, center_d
+
+    while heap:
+        neg_potential, d, x, y, half = heapq.heappop(heap)
+        if d > best_d:
+            best_x, best_y, best_d = x, y, d
+        if -neg_potential - best_d <= precision:
+            # The heap is ordered by potential, so no remaining cell can do better.
+            break
+        half /= 2
+        push_cells([x - half, x + half, x - half, x + half], [y - half, y - half, y + half, y + half], half)
+
+    return (best_x / kx, best_y, max(best_d, 0.0) * METERS_PER_DEGREE)
+
+
+def feature_anchor(geometry: dict, precision_m: float) -> Optional[List[float]]:
+    polygon = largest_part(normalize_polygons(geometry or {}))
+    if polygon is None:
+        return None
+    lon, lat, radius_m = pole_of_inaccessibility(polygon, precision_m)
+    return [round(lon, 6), round(lat, 6), round(radius_m, 1)]
+
+
+def build_label_anchors(fine_features: List[dict], precision_m: float) -> Dict[str, Dict[str, List[float]]]:
+    areas: Dict[str, List[float]] = {}
+    for ft in fine_features:
+        area_id = str((ft.get("properties") or {}).get("area_id") or "").strip()
+        if not area_id:
+            continue
+        anchor = feature_anchor(ft.get("geometry") or {}, precision_m)
+        if anchor is not None:
+            areas[area_id] = anchor
+
+    municipalities: Dict[str, List[float]] = {}
+    for ft in build_dissolved_municipality_features(fine_features, set()):
+        anchor = feature_anchor(ft.get("geometry") or {}, precision_m)
+        if anchor is not None:
+            municipalities[ft["properties"]["municipality"]] = anchor
+
+    return {
+        "areas": dict(sorted(areas.items())),
+        "municipalities": dict(sorted(municipalities.items())),
+    }
+
+
+def write_anchors(path: Path, anchors: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(anchors, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compute interior label anchor points for fine areas and municipalities.")
+    parser.add_argument("--fine-polygons", default="data/asis_fine_polygons.geojson", help="Fine polygons GeoJSON path.")
+    parser.add_argument("--out", default="data/asis_label_anchors.json", help="Output anchors JSON path.")
+    parser.add_argument("--precision-m", type=float, default=10.0, help="Search precision in metres.")
+    args = parser.parse_args()
+
+    anchors = build_label_anchors(load_features(Path(args.fine_polygons)), args.precision_m)
+    out_path = Path(args.out)
+    write_anchors(out_path, anchors)
+
+    print(f"wrote: {out_path}")
+    print(f"areas: {len(anchors['areas'])}")
+    print(f"municipalities: {len(anchors['municipalities'])}")
+
+
+if __name__ == "__main__":
+    main()
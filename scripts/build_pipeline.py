@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Run the data build as a DAG of stages, skipping stages whose inputs did not change.
+
+Stages:
+- fine_polygons:    asis.csv + e-Stat KMZ + baseline -> data/asis_fine_polygons.geojson
+- admin_boundaries: fine polygons (+ N03 in split mode) -> data/n03_tokyo_kanagawa_admin_areas.geojson
+- validate_fine:    fine polygons -> out/fine_polygons_validation.json
+- town_adjacency:   fine polygons -> data/asis_fine_adjacency.json
+- depot_territories: fine polygons -> data/asis_depot_territories.geojson
+- label_anchors:    fine polygons -> data/asis_label_anchors.json
+- depot_distances:  fine polygons + label anchors -> data/asis_depot_distances.json
+- zip_index:        asis.csv -> data/zip_depot_index.bin (ZIP -> depot lookup for classify_zip_depots.py)
+- zip_polygons:     asis.csv + fine polygons -> data/asis_zip_polygons.geojson (one polygon per ZIP)
+- search_index:     fine polygons -> data/asis_search_index.json (pref / municipality / town name prefix search)
+- feature_delta:    fine polygons -> data/asis_fine_polygons.delta/ (manifest + patch from the previous build)
+- zip_changes:      asis.csv + baseline + updated export -> out/*.csv (only with --updated)
+
+A stage is skipped when its command line and the content hashes of its inputs,
+outputs and code (the script and every scripts/ module it imports) match the
+previous successful run. Files are re-hashed only when their size or mtime
+changed, so a no-op rebuild only stats files. Stages without a dependency between
+them run concurrently.
+
+--fine-slim-out / --boundary-slim-out also write the browser copies with slim,
+dictionary-encoded properties (property_dictionary.py) from the same stages.
+
+--in-process runs the stages as function calls (build_api.py) instead of one script
+process each: asis.csv is parsed once and the fine polygons are handed to every
+downstream stage in memory instead of being parsed back from the file.
+
+Typical usage:
+  python3 scripts/build_pipeline.py --coverage-mode full --jobs 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import hashlib
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, fields
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Callable, Dict, List, Set, Tuple
+
+from build_api import BuildConfig, InProcessBuild, resolve_boundary_geometry_mode
+from build_common import file_sha256
+
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+MISSING = "missing"
+
+
+@dataclass
+class Stage:
+    name: str
+    script: str
+    args: List[str]
+    inputs: List[Path]
+    outputs: List[Path]
+    depends_on: Set[str] = field(default_factory=set)
+
+    def command(self) -> List[str]:
+        return [sys.executable, str(SCRIPTS_DIR / self.script), *self.args]
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str  # ran / skipped / failed / blocked
+    seconds: float = 0.0
+    message: str = ""
+
+
+class FileHashCache:
+    """sha256 per path, reused while (size, mtime_ns) is unchanged."""
+
+    def __init__(self, entries: Dict[str, dict]) -> None:
+        self.entries = entries
+
+    def digest(self, path: Path) -> str:
+        key = str(path)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self.entries.pop(key, None)
+            return MISSING
+        cached = self.entries.get(key)
+        if cached and cached.get("size") == stat.st_size and cached.get("mtime_ns") == stat.st_mtime_ns:
+            return str(cached["sha256"])
+
+        digest = file_sha256(path)
+        self.entries[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+        return digest
+
+
+@lru_cache(maxsize=None)
+def local_module_closure(script: str) -> Tuple[str, ...]:
+    """The script plus every scripts/ module it imports, directly or transitively (sorted file names)."""
+    seen: Set[str] = set()
+    todo = [script]
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        tree = ast.parse((SCRIPTS_DIR / name).read_text(encoding="utf-8"), filename=name)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                candidate = f"{module.split('.')[0]}.py"
+                if (SCRIPTS_DIR / candidate).exists():
+                    todo.append(candidate)
+    return tuple(sorted(seen))
+
+
+def stage_fingerprint(stage: Stage, hashes: FileHashCache) -> str:
+    h = hashlib.sha256()
+    h.update(json.dumps([stage.script, stage.args], ensure_ascii=False).encode("utf-8"))
+    # Shared modules (build_admin_boundary_geojson, shapefile_reader, ...) change outputs too.
+    for name in local_module_closure(stage.script):
+        h.update(f"{name}={hashes.digest(SCRIPTS_DIR / name)}".encode("utf-8"))
+    for path in stage.inputs:
+        h.update(f"{path}={hashes.digest(path)}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def outputs_fingerprint(stage: Stage, hashes: FileHashCache) -> str:
+    return ",".join(hashes.digest(path) for path in stage.outputs)
+
+
+def link_dependencies(stages: List[Stage]) -> None:
+    producers = {str(path): stage.name for stage in stages for path in stage.outputs}
+    for stage in stages:
+        for path in stage.inputs:
+            producer = producers.get(str(path))
+            if producer and producer != stage.name:
+                stage.depends_on.add(producer)
+
+
+def load_state(path: Path) -> dict:
+    if not path.exists():
+        return {"files": {}, "stages": {}}
+    with path.open(encoding="utf-8") as f:
+        data = json.load(f)
+    data.setdefault("files", {})
+    data.setdefault("stages", {})
+    return data
+
+
+def save_state(path: Path, state: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def run_stage(stage: Stage) -> StageResult:
+    started = time.perf_counter()
+    proc = subprocess.run(stage.command(), capture_output=True, text=True)
+    seconds = time.perf_counter() - started
+    if proc.returncode != 0:
+        return StageResult(stage.name, "failed", seconds, (proc.stderr or proc.stdout).strip())
+    return StageResult(stage.name, "ran", seconds, proc.stdout.strip())
+
+
+def run_stage_in_process(build: InProcessBuild, stage: Stage) -> StageResult:
+    started = time.perf_counter()
+    try:
+        message = build.run_stage(stage.name)
+    except (Exception, SystemExit) as exc:  # a failing stage must not stop the others
+        return StageResult(stage.name, "failed", time.perf_counter() - started, f"{type(exc).__name__}: {exc}")
+    return StageResult(stage.name, "ran", time.perf_counter() - started, message)
+
+
+def run_pipeline(
+    stages: List[Stage],
+    state: dict,
+    jobs: int,
+    force: bool,
+    runner: Callable[[Stage], StageResult] = run_stage,
+) -> List[StageResult]:
+    hashes = FileHashCache(state["files"])
+    link_dependencies(stages)
+    by_name = {stage.name: stage for stage in stages}
+    pending = {stage.name for stage in stages}
+    results: Dict[str, StageResult] = {}
+    running: Dict[Future, str] = {}
+    fingerprints: Dict[str, str] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            running_names = set(running.values())
+            for name in sorted(pending):
+                stage = by_name[name]
+                if any(dep in pending or dep in running_names for dep in stage.depends_on):
+                    continue
+                pending.discard(name)
+                if any(results[dep].status in ("failed", "blocked") for dep in stage.depends_on):
+                    results[name] = StageResult(name, "blocked", message="upstream stage failed")
+                    continue
+
+                started = time.perf_counter()
+                fingerprint = stage_fingerprint(stage, hashes)
+                previous = state["stages"].get(name) or {}
+                if (
+                    not force
+                    and previous.get("inputs") == fingerprint
+                    and previous.get("outputs") == outputs_fingerprint(stage, hashes)
+                    and MISSING not in previous.get("outputs", MISSING).split(",")
+                ):
+                    results[name] = StageResult(name, "skipped", time.perf_counter() - started)
+                    continue
+                fingerprints[name] = fingerprint
+                running[pool.submit(runner, stage)] = name
+                running_names.add(name)
+
+            if not running:
+                continue
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                result = future.result()
+                results[name] = result
+                if result.status == "ran":
+                    state["stages"][name] = {
+                        "inputs": fingerprints[name],
+                        "outputs": outputs_fingerprint(by_name[name], hashes),
+                        "seconds": round(result.seconds, 3),
+                    }
+                else:
+                    state["stages"].pop(name, None)
+
+    return [results[stage.name] for stage in stages]
+
+
+def build_stages(args: argparse.Namespace) -> List[Stage]:
+    asis = Path(args.asis)
+    baseline = Path(args.baseline)
+    fine_out = Path(args.fine_out)
+    boundary_out = Path(args.boundary_out)
+    boundary_mode = resolve_boundary_geometry_mode(args.boundary_geometry_mode, args.coverage_mode)
+
+    stages = [
+        Stage(
+            name="fine_polygons",
+            script="build_fine_polygons_from_asis.py",
+            args=[
+                "--asis", str(asis),
+                "--kanagawa-kmz-zip", args.kanagawa_kmz_zip,
+                "--saitama-kmz-zip", args.saitama_kmz_zip,
+                "--chiba-kmz-zip", args.chiba_kmz_zip,
+                "--tokyo-town-geojson", args.tokyo_town_geojson,
+                "--baseline", str(baseline),
+                "--n03-fallback", args.n03_fallback,
+                "--coverage-mode", args.coverage_mode,
+                "--out", str(fine_out),
+            ]
+            + (["--slim-out", args.fine_slim_out] if args.fine_slim_out else []),
+            inputs=[
+                asis,
+                Path(args.kanagawa_kmz_zip),
+                Path(args.saitama_kmz_zip),
+                Path(args.chiba_kmz_zip),
+                Path(args.tokyo_town_geojson),
+                baseline,
+                Path(args.n03_fallback),
+            ],
+            outputs=[fine_out] + ([Path(args.fine_slim_out)] if args.fine_slim_out else []),
+        ),
+        Stage(
+            name="admin_boundaries",
+            script="build_admin_boundary_geojson.py",
+            args=(
+                [
+                    "--geometry-mode", "dissolved",
+                    "--fine-polygons", str(fine_out),
+                    "--dissolve-pref-names", args.dissolve_pref_names,
+                ]
+                if boundary_mode == "dissolved"
+                else [
+                    "--tokyo", args.tokyo_n03,
+                    "--kanagawa", args.kanagawa_n03,
+                    "--fine-polygons", str(fine_out),
+                    "--extra-pref-names", args.extra_pref_names,
+                ]
+                + (["--allow-missing-prefecture"] if args.allow_missing_prefecture else [])
+            )
+            + ["--out", str(boundary_out)]
+            + (["--slim-out", args.boundary_slim_out] if args.boundary_slim_out else []),
+            inputs=(
+                [fine_out] if boundary_mode == "dissolved" else [Path(args.tokyo_n03), Path(args.kanagawa_n03), fine_out]
+            ),
+            outputs=[boundary_out] + ([Path(args.boundary_slim_out)] if args.boundary_slim_out else []),
+        ),
+        Stage(
+            name="validate_fine",
+            script="validate_fine_polygons.py",
+            args=["--fine-polygons", str(fine_out), "--report", args.validation_report],
+            inputs=[fine_out],
+            outputs=[Path(args.validation_report)],
+        ),
+        Stage(
+            name="town_adjacency",
+            script="build_town_adjacency.py",
+            args=["--fine-polygons", str(fine_out), "--out", args.adjacency_out],
+            inputs=[fine_out],
+            outputs=[Path(args.adjacency_out)],
+        ),
+        Stage(
+            name="depot_territories",
+            script="build_depot_territories.py",
+            args=["--fine-polygons", str(fine_out), "--out", args.territories_out],
+            inputs=[fine_out],
+            outputs=[Path(args.territories_out)],
+        ),
+        Stage(
+            name="label_anchors",
+            script="build_label_anchors.py",
+            args=["--fine-polygons", str(fine_out), "--out", args.anchors_out],
+            inputs=[fine_out],
+            outputs=[Path(args.anchors_out)],
+        ),
+        Stage(
+            name="depot_distances",
+            script="build_depot_distances.py",
+            args=["--fine-polygons", str(fine_out), "--anchors", args.anchors_out, "--out", args.distances_out],
+            inputs=[fine_out, Path(args.anchors_out)],
+            outputs=[Path(args.distances_out)],
+        ),
+        Stage(
+            name="zip_index",
+            script="build_zip_depot_index.py",
+            args=["--asis", str(asis), "--out", args.zip_index_out],
+            inputs=[asis],
+            outputs=[Path(args.zip_index_out)],
+        ),
+        Stage(
+            name="zip_polygons",
+            script="build_zip_polygons.py",
+            args=["--asis", str(asis), "--fine-polygons", str(fine_out), "--out", args.zip_polygons_out],
+            inputs=[asis, fine_out],
+            outputs=[Path(args.zip_polygons_out)],
+        ),
+        Stage(
+            name="search_index",
+            script="build_search_index.py",
+            args=["--fine-polygons", str(fine_out), "--out", args.search_index_out],
+            inputs=[fine_out],
+            outputs=[Path(args.search_index_out)],
+        ),
+        Stage(
+            name="feature_delta",
+            script="build_feature_delta.py",
+            args=["--geojson", str(fine_out), "--out-dir", args.delta_dir],
+            inputs=[fine_out],
+            outputs=[Path(args.delta_dir) / "manifest.json", Path(args.delta_dir) / "index.json"],
+        ),
+    ]
+
+    if args.updated:
+        out_dir = Path(args.zip_out_dir)
+        stages.append(
+            Stage(
+                name="zip_changes",
+                script="admin_to_zip_changes.py",
+                args=[
+                    "--asis", str(asis),
+                    "--baseline", str(baseline),
+                    "--updated", args.updated,
+                    "--out-dir", str(out_dir),
+                ],
+                inputs=[asis, baseline, Path(args.updated)],
+                outputs=[
+                    out_dir / "area_changes.csv",
+                    out_dir / "zip_reassignment_all.csv",
+                    out_dir / "zip_changes_only.csv",
+                ],
+            )
+        )
+
+    if args.only:
+        wanted = {name.strip() for name in args.only.split(",") if name.strip()}
+        unknown = wanted - {stage.name for stage in stages}
+        if unknown:
+            raise SystemExit(f"error: unknown stage(s): {', '.join(sorted(unknown))}")
+        stages = [stage for stage in stages if stage.name in wanted]
+    return stages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Incremental build of fine polygons, boundaries and ZIP changes.")
+    parser.add_argument("--asis", default="asis.csv", help="Path to asis CSV.")
+    parser.add_argument("--baseline", default="data/asis_admin_assignments.csv", help="Baseline admin assignment CSV.")
+    parser.add_argument("--kanagawa-kmz-zip", default="/Users/tomoki/Downloads/A002005212020DDKWC14.zip")
+    parser.add_argument("--saitama-kmz-zip", default="/Users/tomoki/Downloads/A002005212020DDKWC11.zip")
+    parser.add_argument("--chiba-kmz-zip", default="/Users/tomoki/Downloads/A002005212020DDKWC12.zip")
+    parser.add_argument("--tokyo-town-geojson", default="data/tokyo/machida_towns.geojson")
+    parser.add_argument("--n03-fallback", default="data/n03_target_admin_areas.geojson")
+    parser.add_argument("--coverage-mode", choices=("operational", "full"), default="operational")
+    parser.add_argument("--fine-out", default="data/asis_fine_polygons.geojson", help="Fine polygons output path.")
+    parser.add_argument("--tokyo-n03", default="data/n03_tokyo_kanagawa/tokyo/N03-20250101_13.shp")
+    parser.add_argument("--kanagawa-n03", default="data/n03_tokyo_kanagawa/kanagawa/N03-20250101_14.shp")
+    parser.add_argument("--extra-pref-names", default="埼玉県,千葉県")
+    parser.add_argument("--boundary-out", default="data/n03_tokyo_kanagawa_admin_areas.geojson")
+    parser.add_argument(
+        "--boundary-geometry-mode",
+        choices=("auto", "split", "dissolved"),
+        default="auto",
+        help=(
+            "admin_boundaries geometry. auto: dissolved with --coverage-mode full, split with operational "
+            "(the fine polygons then cover only the target municipalities, so N03 supplies the rest)."
+        ),
+    )
+    parser.add_argument(
+        "--dissolve-pref-names",
+        default="東京都,神奈川県,埼玉県,千葉県",
+        help="Prefectures dissolved from the fine polygons in dissolved mode.",
+    )
+    parser.add_argument(
+        "--allow-missing-prefecture",
+        action="store_true",
+        help="split mode: leave out a prefecture whose N03 input is missing instead of failing admin_boundaries.",
+    )
+    parser.add_argument(
+        "--fine-slim-out",
+        default="",
+        help="Also write slim, dictionary-encoded fine polygons for the browser (e.g. data/asis_fine_polygons.slim.geojson).",
+    )
+    parser.add_argument(
+        "--boundary-slim-out",
+        default="",
+        help="Also write slim boundaries for the browser (e.g. data/n03_tokyo_kanagawa_admin_areas.slim.geojson).",
+    )
+    parser.add_argument("--validation-report", default="out/fine_polygons_validation.json")
+    parser.add_argument("--adjacency-out", default="data/asis_fine_adjacency.json")
+    parser.add_argument("--territories-out", default="data/asis_depot_territories.geojson")
+    parser.add_argument("--anchors-out", default="data/asis_label_anchors.json")
+    parser.add_argument("--distances-out", default="data/asis_depot_distances.json")
+    parser.add_argument("--zip-index-out", default="data/zip_depot_index.bin")
+    parser.add_argument("--zip-polygons-out", default="data/asis_zip_polygons.geojson")
+    parser.add_argument("--search-index-out", default="data/asis_search_index.json")
+    parser.add_argument("--delta-dir", default="data/asis_fine_polygons.delta")
+    parser.add_argument("--updated", default="", help="Updated admin assignment CSV; enables the zip_changes stage.")
+    parser.add_argument("--zip-out-dir", default="out", help="Output directory for zip_changes.")
+    parser.add_argument("--state", default=".build_cache/pipeline_state.json", help="Hash state file.")
+    parser.add_argument("--jobs", type=int, default=2, help="Maximum stages run concurrently.")
+    parser.add_argument("--only", default="", help="Comma separated stage names to run (default: all).")
+    parser.add_argument("--force", action="store_true", help="Run every stage even if inputs are unchanged.")
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Run the stages in this process (build_api.py), passing features between them in memory.",
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    state_path = Path(args.state)
+    state = load_state(state_path)
+    runner: Callable[[Stage], StageResult] = run_stage
+    if args.in_process:
+        config = BuildConfig(**{f.name: getattr(args, f.name) for f in fields(BuildConfig) if hasattr(args, f.name)})
+        runner = partial(run_stage_in_process, InProcessBuild(config))
+    results = run_pipeline(build_stages(args), state, jobs=args.jobs, force=args.force, runner=runner)
+    save_state(state_path, state)
+
+    for result in results:
+        print(f"{result.name}: {result.status} ({result.seconds:.3f}s)")
+        if result.status == "failed" and result.message:
+            print(result.message)
+    print(f"total: {time.perf_counter() - started:.3f}s")
+    if any(result.status in ("failed", "blocked") for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
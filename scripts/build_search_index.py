@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Build a compact name search index over the fine polygons.
+
+Hierarchy: prefecture -> municipality -> town (丁目 merged into one town node).
+Nodes are stored in depth-first order and the source feature offsets (positions in
+the GeoJSON "features" array) are grouped the same way, so every node owns the
+contiguous range feature_offsets[start:end] and a parent's range encloses its
+children's. Municipality-level polygons (N03 fallback, no town_name) belong to the
+municipality node directly.
+
+Search keys: every node is reachable by its own name and by its name prefixed with
+its parents' (e.g. 鶴ケ峰, 旭区鶴ケ峰, 横浜市旭区鶴ケ峰, 鶴ケ峰2丁目). Keys are folded
+with search_key(): NFKC, no whitespace, the ヶ/ヵ -> ケ and 之 -> の folding of
+canonical_town_name(), and katakana -> hiragana. Kana-insensitive here means only
+that katakana and hiragana spellings of the same kana match; there is no reading
+data, so a kanji name is not found by its reading (つるがみね does not find 鶴ケ峰).
+Keys are sorted by UTF-16 code units, the order of JavaScript string comparison,
+so src/search.js and SearchIndex below binary-search the same arrays for a prefix.
+
+Index layout (JSON):
+  {"format": "area-search-index/1", "source_features": N, "source_sha256": ...,
+   "nodes": {"name": [...], "level": [...], "parent": [...], "start": [...], "end": [...]},
+   "feature_offsets": [...], "keys": [...], "key_nodes": [...]}
+level: 0 prefecture, 1 municipality, 2 town; parent -1 for prefectures.
+
+Typical usage:
+  python3 scripts/build_search_index.py \
+    --fine-polygons data/asis_fine_polygons.geojson \
+    --out data/asis_search_index.json \
+    --query 鶴ヶ峰 横浜市旭
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import re
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from build_admin_boundary_geojson import canonical_pref_name, load_features
+from build_common import file_sha256
+from build_fine_polygons_from_asis import PREFECTURES, canonical_town_name
+
+
+FORMAT = "area-search-index/1"
+LEVELS = ("prefecture", "municipality", "town")
+CHOME_SUFFIX = re.compile(r"(?:[0-9０-９]+|[一二三四五六七八九十]+)丁目$")
+KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(0x30A1, 0x30F7)}
+PREF_ORDER = {name: code for code, (name, _) in PREFECTURES.items()}
+WARD_PATTERN = re.compile(r"^.+?市(.+区)$")
+# Python's and JavaScript's \s differ slightly, so both sides spell the class out.
+WHITESPACE = re.compile("[\t-\r\x1c-\x20\x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000\ufeff]")
+
+
+def search_key(value: object) -> str:
+    """Folded search key; src/search.js foldSearchKey() must stay identical."""
+    out = unicodedata.normalize("NFKC", str(value or ""))
+    out = WHITESPACE.sub("", out)
+    out = out.replace("ヶ", "ケ").replace("ヵ", "ケ").replace("之", "の")
+    return out.translate(KATAKANA_TO_HIRAGANA)
+
+
+def utf16_order(key: str) -> bytes:
+    return key.encode("utf-16-be")
+
+
+def build_search_index(fine_features: List[dict], source_sha256: str = "") -> dict:
+    # pref -> municipality -> town key -> (display name, chome names, feature offsets)
+    tree: Dict[str, Dict[str, Dict[str, Tuple[str, set, List[int]]]]] = {}
+    for offset, ft in enumerate(fine_features):
+        props = ft.get("properties") or {}
+        pref = canonical_pref_name(props)
+        municipality = str(props.get("municipality") or "").strip()
+        if not municipality:
+            continue
+        town_name = str(props.get("town_name") or "").strip()
+        towns = tree.setdefault(pref, {}).setdefault(municipality, {})
+        key = canonical_town_name(town_name) if town_name else ""
+        if key not in towns:
+            towns[key] = (CHOME_SUFFIX.sub("", town_name) if town_name else "", set(), [])
+        if town_name:
+            towns[key][1].add(town_name)
+        towns[key][2].append(offset)
+
+    names: List[str] = []
+    levels: List[int] = []
+    parents: List[int] = []
+    starts: List[int] = []
+    ends: List[int] = []
+    feature_offsets: List[int] = []
+    entries: List[Tuple[str, int]] = []
+
+    def add_node(name: str, level: int, parent: int) -> int:
+        names.append(name)
+        levels.append(level)
+        parents.append(parent)
+        starts.append(len(feature_offsets))
+        ends.append(len(feature_offsets))
+        return len(names) - 1
+
+    def add_keys(node: int, *values: str) -> None:
+        for key in {search_key(value) for value in values} - {""}:
+            entries.append((key, node))
+
+    for pref in sorted(tree, key=lambda name: (PREF_ORDER.get(name, "99"), name)):
+        pref_node = add_node(pref, 0, -1)
+        add_keys(pref_node, pref)
+        for municipality in sorted(tree[pref]):
+            muni_node = add_node(municipality, 1, pref_node)
+            ward = WARD_PATTERN.match(municipality)
+            add_keys(muni_node, municipality, pref + municipality, ward.group(1) if ward else "")
+            towns = tree[pref][municipality]
+            if "" in towns:
+                feature_offsets.extend(towns[""][2])
+            for key in sorted(k for k in towns if k):
+                display, chome_names, offsets = towns[key]
+                town_node = add_node(display, 2, muni_node)
+                ward_name = ward.group(1) + display if ward else ""
+                add_keys(town_node, display, municipality + display, ward_name, *chome_names, *(municipality + name for name in chome_names))
+                feature_offsets.extend(offsets)
+                ends[town_node] = len(feature_offsets)
+            ends[muni_node] = len(feature_offsets)
+        ends[pref_node] = len(feature_offsets)
+
+    entries.sort(key=lambda entry: (utf16_order(entry[0]), entry[1]))
+    return {
+        "format": FORMAT,
+        "source_features": len(fine_features),
+        "source_sha256": source_sha256,
+        "nodes": {"name": names, "level": levels, "parent": parents, "start": starts, "end": ends},
+        "feature_offsets": feature_offsets,
+        "keys": [key for key, _ in entries],
+        "key_nodes": [node for _, node in entries],
+    }
+
+
+def write_search_index(path: Path, index: dict) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    path.write_bytes(data)
+    return len(data)
+
+
+class SearchIndex:
+    """Prefix lookups over an index written by write_search_index."""
+
+    def __init__(self, index: dict) -> None:
+        if index.get("format") != FORMAT:
+            raise SystemExit(f"error: not an area search index: {index.get('format')!r}")
+        nodes = index["nodes"]
+        self.names: List[str] = nodes["name"]
+        self.levels: List[int] = nodes["level"]
+        self.parents: List[int] = nodes["parent"]
+        self.starts: List[int] = nodes["start"]
+        self.ends: List[int] = nodes["end"]
+        self.feature_offsets: List[int] = index["feature_offsets"]
+        self.keys: List[str] = index["keys"]
+        self.key_nodes: List[int] = index["key_nodes"]
+        self._order = [utf16_order(key) for key in self.keys]
+
+    @classmethod
+    def load(cls, path: Path) -> "SearchIndex":
+        with path.open(encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def search(self, query: str, limit: int = 20) -> List[int]:
+        """Nodes with a key starting with the folded query, in key order (exact matches first)."""
+        prefix = utf16_order(search_key(query))
+        if not prefix:
+            return []
+        out: List[int] = []
+        seen = set()
+        pos = bisect.bisect_left(self._order, prefix)
+        while pos < len(self._order) and len(out) < limit and self._order[pos].startswith(prefix):
+            node = self.key_nodes[pos]
+            if node not in seen:
+                seen.add(node)
+                out.append(node)
+            pos += 1
+        return out
+
+    def path(self, node: int) -> List[str]:
+        names: List[str] = []
+        while node >= 0:
+            names.append(self.names[node])
+            node = self.parents[node]
+        return names[::-1]
+
+    def features(self, node: int) -> List[int]:
+        """Offsets into the source GeoJSON features of the node and everything below it."""
+        return self.feature_offsets[self.starts[node] : self.ends[node]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build a hierarchical prefix search index over fine polygon names.")
+    parser.add_argument("--fine-polygons", default="data/asis_fine_polygons.geojson", help="Fine polygons GeoJSON path.")
+    parser.add_argument("--out", default="data/asis_search_index.json", help="Output index path.")
+    parser.add_argument("--query", nargs="*", default=[], help="Names to look up in the written index (for checking).")
+    parser.add_argument("--limit", type=int, default=10, help="Maximum results per --query.")
+    args = parser.parse_args()
+
+    fine_path = Path(args.fine_polygons)
+    index = build_search_index(load_features(fine_path), file_sha256(fine_path))
+    out_path = Path(args.out)
+    size = write_search_index(out_path, index)
+    print(f"wrote: {out_path} ({size} bytes)")
+    counts = [index["nodes"]["level"].count(level) for level in range(len(LEVELS))]
+    print("nodes: " + ", ".join(f"{name} {count}" for name, count in zip(LEVELS, counts)))
+    print(f"keys: {len(index['keys'])}")
+
+    if args.query:
+        search_index = SearchIndex.load(out_path)
+        for query in args.query:
+            started = time.perf_counter()
+            nodes = search_index.search(query, args.limit)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            print(f"query: {query} ({len(nodes)} results, {elapsed_ms:.3f} ms)")
+            for node in nodes:
+                print(f"  {' > '.join(search_index.path(node))} ({len(search_index.features(node))} features)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Build the adjacency graph of fine town polygons (which areas share a border, and how long).
+
+Neighbours are found from the quantized shared edges exactly like the boundary build
+(build_admin_boundary_geojson.py), with each fine area_id as its own id, so two
+areas are adjacent only when they share at least one edge (corner contact does not count).
+
+Output JSON (CSR layout, nodes sorted by area_id):
+  {
+    "area_ids":  ["CB12-...", ...],          # node i
+    "offsets":   [0, 3, 7, ...],              # neighbours of i are [offsets[i], offsets[i + 1])
+    "neighbors": [5, 12, 40, ...],            # node indexes, ascending per node
+    "border_m":  [120.5, 33.0, ...]           # shared border length in metres, parallel to neighbors
+  }
+
+Typical usage:
+  python3 scripts/build_town_adjacency.py \
+    --fine-polygons data/asis_fine_polygons.geojson \
+    --out data/asis_fine_adjacency.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from build_admin_boundary_geojson import (
+    SCALE,
+    Edge,
+    EdgeTable,
+    classify_shared_boundary_edges,
+    load_features,
+    normalize_polygons,
+)
+from build_common import EARTH_RADIUS_M
+
+
+METERS_PER_UNIT = math.radians(1 / SCALE) * EARTH_RADIUS_M
+
+
+def edge_length_m(edge: Edge) -> float:
+    """Edge length with a local equirectangular projection (plenty for town-sized edges)."""
+    (ax, ay), (bx, by) = edge
+    kx = math.cos(math.radians((ay + by) / 2 / SCALE))
+    return math.hypot((bx - ax) * kx, by - ay) * METERS_PER_UNIT
+
+
+def collect_town_edge_table(fine_features: List[dict]) -> Tuple[EdgeTable, List[str]]:
+    """Edge table keyed by node id, where node ids follow the sorted area_ids."""
+    polygons_by_area: Dict[str, List[list]] = defaultdict(list)
+    for ft in fine_features:
+        area_id = str((ft.get("properties") or {}).get("area_id") or "").strip()
+        if not area_id:
+            continue
+        polygons = normalize_polygons(ft.get("geometry") or {})
+        if polygons:
+            polygons_by_area[area_id].extend(polygons)
+
+    area_ids = sorted(polygons_by_area)
+    table = EdgeTable()
+    for node, area_id in enumerate(area_ids):
+        table.add_polygons(polygons_by_area[area_id], node)
+    return table, area_ids
+
+
+def build_adjacency(table: EdgeTable, node_count: int) -> Tuple[List[int], List[int], List[float]]:
+    """Return CSR (offsets, neighbors, border_m) from the shared edges in the table."""
+    _, shared_edges = classify_shared_boundary_edges(table)
+    adjacency: List[Dict[int, float]] = [dict() for _ in range(node_count)]
+    for (low, high), edges in shared_edges.items():
+        length = sum(edge_length_m(edge) for edge in edges)
+        adjacency[low][high] = length
+        adjacency[high][low] = length
+
+    offsets = [0]
+    neighbors: List[int] = []
+    border_m: List[float] = []
+    for node_neighbors in adjacency:
+        for other in sorted(node_neighbors):
+            neighbors.append(other)
+            border_m.append(round(node_neighbors[other], 1))
+        offsets.append(len(neighbors))
+    return offsets, neighbors, border_m
+
+
+def build_town_adjacency(fine_features: List[dict]) -> dict:
+    table, area_ids = collect_town_edge_table(fine_features)
+    offsets, neighbors, border_m = build_adjacency(table, len(area_ids))
+    return {"area_ids": area_ids, "offsets": offsets, "neighbors": neighbors, "border_m": border_m}
+
+
+def write_adjacency(path: Path, adjacency: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(adjacency, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build a CSR adjacency graph of fine town polygons.")
+    parser.add_argument("--fine-polygons", default="data/asis_fine_polygons.geojson", help="Fine polygons GeoJSON path.")
+    parser.add_argument("--out", default="data/asis_fine_adjacency.json", help="Output adjacency JSON path.")
+    args = parser.parse_args()
+
+    out = build_town_adjacency(load_features(Path(args.fine_polygons)))
+    out_path = Path(args.out)
+    write_adjacency(out_path, out)
+
+    area_ids, offsets = out["area_ids"], out["offsets"]
+    isolated = sum(1 for i in range(len(area_ids)) if offsets[i] == offsets[i + 1])
+    print(f"wrote: {out_path}")
+    print(f"areas: {len(area_ids)}")
+    print(f"adjacent pairs: {len(out['neighbors']) // 2}")
+    print(f"isolated areas: {isolated}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Compile asis.csv into a memory-mappable ZIP -> depot lookup index.
+
+ZIP codes and depots are normalized exactly like admin_to_zip_changes.py
+(normalize_zip / normalize_depot_code). The index is one binary file:
+
+  b"ZIPDIDX1" | uint32 header length | header JSON (padded to 8 bytes) | sections
+
+Sections are little-endian arrays, parallel to each other and sorted by ZIP:
+  zips   uint32  7-digit ZIP as an integer (only 7-digit ZIPs are indexed)
+  depots uint8   index into header["depots"] (normalized code, "" = other / unassigned)
+  labels uint16  index into header["labels"] (raw 管轄デポ value)
+  areas  uint16  index into header["areas"] (対応エリア)
+  flags  uint8   bit 0: the ZIP appears on several rows with different depots (first row wins)
+
+ZipDepotIndex opens the file with mmap, so lookups need no parsing and several
+processes share the same pages. Lookups are binary searches (np.searchsorted over a
+whole chunk when NumPy is available, bisect otherwise).
+
+Typical usage:
+  python3 scripts/build_zip_depot_index.py --asis asis.csv --out data/zip_depot_index.bin
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from admin_to_zip_changes import normalize_depot_code, normalize_zip, pick_value, read_csv
+from build_admin_boundary_geojson import np
+from build_common import file_sha256
+
+
+MAGIC = b"ZIPDIDX1"
+FLAG_CONFLICT = 1
+SECTIONS = (("zips", "I"), ("depots", "B"), ("labels", "H"), ("areas", "H"), ("flags", "B"))
+
+
+def zip_key(value: str) -> int:
+    """Integer key of a ZIP value, or -1 when it does not normalize to 7 digits."""
+    if len(value) == 7 and value.isascii() and value.isdigit():
+        return int(value)
+    digits = normalize_zip(value)
+    return int(digits) if len(digits) == 7 else -1
+
+
+def build_zip_index(asis_rows: Iterable[dict]) -> Tuple[Dict[str, array], dict]:
+    """Return (sections, header tables) for the asis.csv rows."""
+    depots: List[str] = []
+    labels: List[str] = []
+    areas: List[str] = []
+    table_index: Dict[Tuple[int, str], int] = {}
+
+    def intern(table: List[str], table_id: int, value: str) -> int:
+        key = (table_id, value)
+        if key not in table_index:
+            table_index[key] = len(table)
+            table.append(value)
+        return table_index[key]
+
+    entries: Dict[int, List[int]] = {}
+    skipped = 0
+    for row in asis_rows:
+        key = zip_key(pick_value(row, ["郵便番号", "zip_code", "zipcode", "zip", "postal_code"]))
+        if key < 0:
+            skipped += 1
+            continue
+        label = pick_value(row, ["管轄デポ", "担当デポ", "depot_code", "depot"])
+        depot = intern(depots, 0, normalize_depot_code(label))
+        entry = entries.get(key)
+        if entry is not None:
+            if entry[0] != depot:
+                entry[3] |= FLAG_CONFLICT
+            continue
+        area = pick_value(row, ["対応エリア", "area_name", "municipality"])
+        entries[key] = [depot, intern(labels, 1, label), intern(areas, 2, area), 0]
+
+    if len(labels) > 0xFFFF or len(areas) > 0xFFFF:
+        raise SystemExit("error: too many distinct depot labels / areas for uint16 indexes")
+
+    sections = {name: array(code) for name, code in SECTIONS}
+    for key in sorted(entries):
+        depot, label, area, flags = entries[key]
+        sections["zips"].append(key)
+        sections["depots"].append(depot)
+        sections["labels"].append(label)
+        sections["areas"].append(area)
+        sections["flags"].append(flags)
+    tables = {"depots": depots, "labels": labels, "areas": areas, "skipped_rows": skipped}
+    return sections, tables
+
+
+def write_zip_index(path: Path, sections: Dict[str, array], tables: dict, source_sha256: str) -> int:
+    count = len(sections["zips"])
+    header = {"count": count, "source_sha256": source_sha256, **tables, "sections": {}}
+    # Offsets depend on the header size, which depends on the offsets: settle it in two passes.
+    for _ in range(2):
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        offset = align8(len(MAGIC) + 4 + len(header_bytes))
+        for name, code in SECTIONS:
+            header["sections"][name] = [offset, code]
+            offset = align8(offset + count * array(code).itemsize)
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with tmp_path.open("wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+        for name, _ in SECTIONS:
+            f.write(b"\0" * (header["sections"][name][0] - f.tell()))
+            data = sections[name]
+            if sys.byteorder != "little":
+                data = array(data.typecode, data)
+                data.byteswap()
+            data.tofile(f)
+        size = f.tell()
+    tmp_path.replace(path)
+    return size
+
+
+def align8(value: int) -> int:
+    return (value + 7) & ~7
+
+
+class ZipDepotIndex:
+    """Read-only, memory-mapped view of an index written by write_zip_index."""
+
+    def __init__(self, path: Path) -> None:
+        self._file = path.open("rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(MAGIC)] != MAGIC:
+            raise SystemExit(f"error: not a ZIP depot index: {path}")
+        (header_len,) = struct.unpack_from("<I", self._mm, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(bytes(self._mm[start : start + header_len]).decode("utf-8"))
+        self.count = int(self.header["count"])
+        self.depots: List[str] = self.header["depots"]
+        self.labels: List[str] = self.header["labels"]
+        self.areas: List[str] = self.header["areas"]
+
+        view = memoryview(self._mm)
+        self.sections: Dict[str, Sequence[int]] = {}
+        for name, (offset, code) in self.header["sections"].items():
+            size = array(code).itemsize
+            if np is not None:
+                dtype = {"I": "<u4", "H": "<u2", "B": "u1"}[code]
+                self.sections[name] = np.frombuffer(self._mm, dtype=dtype, count=self.count, offset=offset)
+            elif sys.byteorder == "little":
+                self.sections[name] = view[offset : offset + self.count * size].cast(code)
+            else:
+                data = array(code, view[offset : offset + self.count * size].tobytes())
+                data.byteswap()
+                self.sections[name] = data
+
+    def close(self) -> None:
+        self.sections = {}
+        self._mm.close()
+        self._file.close()
+
+    def positions(self, keys: List[int]) -> List[int]:
+        """Index position per key, -1 when the ZIP is not in the index (or the key is -1)."""
+        zips = self.sections["zips"]
+        if np is not None:
+            key_arr = np.asarray(keys, dtype=np.int64)
+            pos = np.searchsorted(zips, key_arr)
+            safe = np.minimum(pos, max(self.count - 1, 0))
+            hit = (pos < self.count) & (zips[safe] == key_arr) if self.count else np.zeros(len(keys), dtype=bool)
+            return np.where(hit, pos, -1).tolist()
+
+        out = []
+        for key in keys:
+            pos = bisect.bisect_left(zips, key)
+            out.append(pos if key >= 0 and pos < self.count and zips[pos] == key else -1)
+        return out
+
+    def record(self, pos: int) -> Tuple[str, str, str, int]:
+        """(depot code, raw depot label, area, flags) at an index position."""
+        s = self.sections
+        return (
+            self.depots[int(s["depots"][pos])],
+            self.labels[int(s["labels"][pos])],
+            self.areas[int(s["areas"][pos])],
+            int(s["flags"][pos]),
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile asis.csv into a memory-mappable ZIP -> depot index.")
+    parser.add_argument("--asis", default="asis.csv", help="Path to as-is ZIP assignment CSV.")
+    parser.add_argument("--out", default="data/zip_depot_index.bin", help="Output index path.")
+    args = parser.parse_args()
+
+    asis_path = Path(args.asis)
+    sections, tables = build_zip_index(read_csv(asis_path))
+    out_path = Path(args.out)
+    size = write_zip_index(out_path, sections, tables, file_sha256(asis_path))
+
+    conflicts = sum(1 for flags in sections["flags"] if flags & FLAG_CONFLICT)
+    print(f"wrote: {out_path} ({size} bytes)")
+    print(f"zip codes: {len(sections['zips'])}")
+    print(f"depot labels: {len(tables['labels'])}, areas: {len(tables['areas'])}")
+    print(f"rows without a 7-digit ZIP: {tables['skipped_rows']}")
+    print(f"zip codes with conflicting depots: {conflicts}")
+
+
+if __name__ == "__main__":
+    main()
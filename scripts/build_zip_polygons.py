@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Dissolve fine town polygons into one territory polygon per ZIP code.
+
+ZIP codes are joined to towns like build_fine_polygons_from_asis.py embeds ZIP
+statistics: asis.csv rows by (municipality inferred from 市区 / 対応エリア, town name
+without 丁目) onto the fine polygons' (municipality, town_name).
+
+- A "以下に掲載がない場合" row (or a row without 町) covers the towns of its
+  municipality that no other ZIP row names, plus municipality-level polygons
+  (N03 fallback areas without town_name).
+- 特定施設・基地等 rows are single facilities, not territories, and are skipped.
+- A town named by several ZIP codes belongs to each of them; shared_area_count on
+  the ZIP feature says how many of its areas overlap another ZIP.
+
+Dissolve: the quantized edges of every fine area are handed to each ZIP containing
+it and cancelled by signed edge votes (dissolved_edge_rows, as for municipal and
+depot outlines), so the cost stays linear in the number of edges and neighbouring
+ZIP territories share exactly the same border.
+
+Output is one FeatureCollection (--out) or, with --shard-dir, one file per 3-digit
+ZIP prefix plus index.json with the bbox of each shard.
+
+Typical usage:
+  python3 scripts/build_zip_polygons.py \
+    --asis asis.csv \
+    --fine-polygons data/asis_fine_polygons.geojson \
+    --out data/asis_zip_polygons.geojson
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import DefaultDict, Dict, Iterable, List, Optional, Set, Tuple
+
+from build_admin_boundary_geojson import (
+    np,
+    EdgeTable,
+    assemble_polygons,
+    dissolved_edge_rows,
+    load_features,
+    trace_rings,
+)
+from build_depot_territories import collect_area_edge_table
+from build_fine_polygons_from_asis import (
+    DEPOT_NAMES,
+    ZipStats,
+    canonical_town_name,
+    features_bbox,
+    infer_municipality_from_asis,
+    normalize_depot_code,
+    normalize_zip,
+    pick_value,
+    read_csv,
+    write_feature_collection,
+)
+
+
+REST_OF_MUNICIPALITY = "以下に掲載がない場合"
+FACILITY_LABEL = "特定施設・基地等"
+UNMATCHED_HEADERS = ["zip_code", "city", "town", "area_label", "reason"]
+
+
+@dataclass
+class ZipTerritory:
+    """asis.csv rows of one ZIP code and the fine area indexes they resolve to."""
+
+    zip_code: str
+    municipalities: Dict[str, int] = field(default_factory=dict)
+    stats: ZipStats = field(default_factory=ZipStats)
+    town_areas: Set[int] = field(default_factory=set)
+    rest_municipalities: Set[str] = field(default_factory=set)
+    areas: Set[int] = field(default_factory=set)
+
+
+@dataclass
+class ZipJoin:
+    territories: Dict[str, ZipTerritory]
+    area_zips: List[List[int]]  # per fine area: indexes into sorted(territories)
+    unmatched_rows: List[List[str]]
+    facility_rows: int
+
+
+def join_zip_areas(asis_rows: Iterable[dict], fine_features: List[dict], area_ids: List[str]) -> ZipJoin:
+    """Resolve every ZIP code of asis.csv to the fine areas (indexes into area_ids) it covers."""
+    area_index = {area_id: index for index, area_id in enumerate(area_ids)}
+    town_areas: DefaultDict[Tuple[str, str], Set[int]] = defaultdict(set)
+    muni_areas: DefaultDict[str, Set[int]] = defaultdict(set)
+    muni_level_areas: DefaultDict[str, Set[int]] = defaultdict(set)
+    area_municipality: Dict[int, str] = {}
+    for ft in fine_features:
+        props = ft.get("properties") or {}
+        index = area_index.get(str(props.get("area_id") or "").strip())
+        municipality = props.get("municipality") or ""
+        if index is None or not municipality:
+            continue
+        town_name = props.get("town_name") or ""
+        area_municipality[index] = municipality
+        muni_areas[municipality].add(index)
+        if town_name:
+            town_areas[(municipality, canonical_town_name(town_name))].add(index)
+        else:
+            muni_level_areas[municipality].add(index)
+
+    target_munis = set(muni_areas)
+    territories: Dict[str, ZipTerritory] = {}
+    unmatched_rows: List[List[str]] = []
+    facility_rows = 0
+    for row in asis_rows:
+        zip_code = normalize_zip(pick_value(row, ["郵便番号", "postal_code", "zip_code", "zip"]))
+        city = pick_value(row, ["市区", "city", "municipality"])
+        town = pick_value(row, ["町", "town", "S_NAME"])
+        area_label = pick_value(row, ["対応エリア", "area_name"])
+        if area_label == FACILITY_LABEL:
+            facility_rows += 1
+            continue
+        if len(zip_code) != 7:
+            unmatched_rows.append([zip_code, city, town, area_label, "invalid_zip"])
+            continue
+        municipality = infer_municipality_from_asis(city, area_label, target_munis)
+        if not municipality:
+            unmatched_rows.append([zip_code, city, town, area_label, "no_municipality"])
+            continue
+
+        if not town or town == REST_OF_MUNICIPALITY:
+            matched: Optional[Set[int]] = None
+        else:
+            matched = town_areas.get((municipality, canonical_town_name(town)))
+            if not matched:
+                unmatched_rows.append([zip_code, city, town, area_label, "no_town"])
+                continue
+        territory = territories.get(zip_code)
+        if territory is None:
+            territory = territories[zip_code] = ZipTerritory(zip_code)
+        territory.municipalities[municipality] = territory.municipalities.get(municipality, 0) + 1
+        territory.stats.add(zip_code, normalize_depot_code(pick_value(row, ["管轄デポ", "担当デポ", "depot_code", "depot"])), area_label)
+        if matched is None:
+            territory.rest_municipalities.add(municipality)
+        else:
+            territory.town_areas.update(matched)
+
+    named: DefaultDict[str, Set[int]] = defaultdict(set)
+    for territory in territories.values():
+        for index in territory.town_areas:
+            named[area_municipality[index]].add(index)
+    for territory in territories.values():
+        territory.areas = set(territory.town_areas)
+        for municipality in territory.rest_municipalities:
+            territory.areas.update((muni_areas[municipality] - named[municipality]) | muni_level_areas[municipality])
+
+    area_zips: List[List[int]] = [[] for _ in area_ids]
+    for zip_index, zip_code in enumerate(sorted(territories)):
+        for index in sorted(territories[zip_code].areas):
+            area_zips[index].append(zip_index)
+    return ZipJoin(territories, area_zips, unmatched_rows, facility_rows)
+
+
+def regroup_by_zip(area_table: EdgeTable, area_zips: List[List[int]]) -> EdgeTable:
+    """Copy every edge row once per ZIP containing its area, with the ZIP index as group id."""
+    if np is not None:
+        counts = np.asarray([len(zips) for zips in area_zips], dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1])) if len(counts) else counts
+        flat = np.asarray([z for zips in area_zips for z in zips], dtype=np.uint32)
+        munis = np.frombuffer(area_table.muni, dtype=np.uint32)
+        repeat = counts[munis] if len(munis) else np.zeros(0, dtype=np.int64)
+        rows = np.repeat(np.arange(len(munis)), repeat)
+        copy = np.arange(len(rows)) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+        zips = flat[starts[munis[rows]] + copy] if len(rows) else np.zeros(0, dtype=np.uint32)
+
+        table = EdgeTable()
+        table.a.frombytes(np.frombuffer(area_table.a, dtype=np.uint64)[rows].tobytes())
+        table.b.frombytes(np.frombuffer(area_table.b, dtype=np.uint64)[rows].tobytes())
+        table.muni.frombytes(zips.astype(np.uint32).tobytes())
+        table.left.frombytes(np.frombuffer(area_table.left, dtype=np.uint8)[rows].tobytes())
+        return table
+
+    table = EdgeTable()
+    for a_key, b_key, area, left in zip(area_table.a, area_table.b, area_table.muni, area_table.left):
+        for zip_index in area_zips[area]:
+            table.a.append(a_key)
+            table.b.append(b_key)
+            table.muni.append(zip_index)
+            table.left.append(left)
+    return table
+
+
+def build_zip_features(area_table: EdgeTable, area_ids: List[str], join: ZipJoin) -> List[dict]:
+    zip_codes = sorted(join.territories)
+    outline: DefaultDict[int, List[Tuple[int, int]]] = defaultdict(list)
+    for zip_index, from_key, to_key in dissolved_edge_rows(regroup_by_zip(area_table, join.area_zips)):
+        outline[zip_index].append((from_key, to_key))
+
+    out: List[dict] = []
+    for zip_index, zip_code in enumerate(zip_codes):
+        # Sorted so the rings start at the same vertex with and without NumPy.
+        polygons = assemble_polygons(trace_rings(sorted(outline.get(zip_index, []))))
+        if not polygons:
+            continue
+        territory = join.territories[zip_code]
+        depot_rows = territory.stats.depot_rows
+        depot_code = min(depot_rows, key=lambda code: (-depot_rows[code], code)) if depot_rows else ""
+        areas = sorted(territory.areas)
+        geometry = (
+            {"type": "Polygon", "coordinates": polygons[0]}
+            if len(polygons) == 1
+            else {"type": "MultiPolygon", "coordinates": polygons}
+        )
+        out.append(
+            {
+                "type": "Feature",
+                "properties": {
+                    "zip_code": zip_code,
+                    "municipality": min(territory.municipalities, key=lambda m: (-territory.municipalities[m], m)),
+                    "depot_code": depot_code,
+                    "depot_name": DEPOT_NAMES.get(depot_code, ""),
+                    "dispatch_area_label": territory.stats.properties()["dispatch_area_label"],
+                    "match": "rest_of_municipality" if territory.rest_municipalities else "town",
+                    "area_count": len(areas),
+                    "shared_area_count": sum(1 for index in areas if len(join.area_zips[index]) > 1),
+                    "area_ids": [area_ids[index] for index in areas],
+                    "source": "fine-polygon-zip-dissolved",
+                },
+                "geometry": geometry,
+            }
+        )
+    return out
+
+
+def write_zip_shards(shard_dir: Path, features: List[dict]) -> List[dict]:
+    """One FeatureCollection per 3-digit ZIP prefix, plus index.json."""
+    by_prefix: DefaultDict[str, List[dict]] = defaultdict(list)
+    for ft in features:
+        by_prefix[ft["properties"]["zip_code"][:3]].append(ft)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    shards: List[dict] = []
+    for prefix in sorted(by_prefix):
+        shard_path = shard_dir / f"{prefix}.geojson"
+        write_feature_collection(shard_path, by_prefix[prefix])
+        shards.append(
+            {
+                "zip_prefix": prefix,
+                "file": shard_path.name,
+                "bytes": shard_path.stat().st_size,
+                "features": len(by_prefix[prefix]),
+                "bbox": features_bbox(by_prefix[prefix]),
+            }
+        )
+    with (shard_dir / "index.json").open("w", encoding="utf-8") as f:
+        json.dump({"features": len(features), "shards": shards}, f, ensure_ascii=False, indent=2)
+    return shards
+
+
+def write_unmatched_csv(path: Path, rows: List[List[str]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(UNMATCHED_HEADERS)
+        writer.writerows(rows)
+
+
+def build_zip_polygons(asis_rows: Iterable[dict], fine_features: List[dict]) -> Tuple[List[dict], ZipJoin]:
+    area_table, area_ids, _ = collect_area_edge_table(fine_features)
+    join = join_zip_areas(asis_rows, fine_features, area_ids)
+    return build_zip_features(area_table, area_ids, join), join
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dissolve fine town polygons into one polygon per ZIP code.")
+    parser.add_argument("--asis", default="asis.csv", help="Path to asis CSV.")
+    parser.add_argument("--fine-polygons", default="data/asis_fine_polygons.geojson", help="Fine polygons GeoJSON path.")
+    parser.add_argument("--out", default="data/asis_zip_polygons.geojson", help="Output GeoJSON path.")
+    parser.add_argument("--shard-dir", default="", help="Write one GeoJSON per 3-digit ZIP prefix (+ index.json) here instead of --out.")
+    parser.add_argument("--unmatched-csv", default="", help="Optional CSV of asis.csv rows that matched no fine polygon.")
+    args = parser.parse_args()
+
+    features, join = build_zip_polygons(read_csv(Path(args.asis)), load_features(Path(args.fine_polygons)))
+    if args.shard_dir:
+        shards = write_zip_shards(Path(args.shard_dir), features)
+        print(f"wrote: {Path(args.shard_dir) / 'index.json'} ({len(shards)} shards)")
+    else:
+        write_feature_collection(Path(args.out), features)
+        print(f"wrote: {args.out}")
+    if args.unmatched_csv:
+        write_unmatched_csv(Path(args.unmatched_csv), join.unmatched_rows)
+        print(f"wrote: {args.unmatched_csv}")
+    print(f"zip codes: {len(features)}")
+    print(f"shared areas: {sum(1 for zips in join.area_zips if len(zips) > 1)}")
+    print(f"areas without zip: {sum(1 for zips in join.area_zips if not zips)}")
+    print(f"unmatched rows: {len(join.unmatched_rows)} (facility rows skipped: {join.facility_rows})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Map lat/lon points (e.g. telematics delivery points) to the fine area and depot they fall in.
+
+- Prefilter: a uniform grid over the fine polygons; each cell lists the areas whose
+  bounding box overlaps it (about four cells per area).
+- Exact test: even-odd ray casting over all ring segments of a candidate area (outer
+  rings, holes and MultiPolygon parts together), vectorized over every point of a grid
+  cell at once when NumPy is available.
+- Streaming: the input CSV is read in chunks; chunks are classified by --jobs worker
+  processes (each holds its own copy of the index) with a bounded number of chunks in
+  flight, and written back in input order. Memory does not depend on the input size.
+
+Appended columns:
+  area_id, area_name, municipality, depot_code, depot_name, point_match
+point_match is OK, OUTSIDE (in no fine area) or INVALID (missing / unparsable coordinates).
+The ray test is half-open, like pixel rasterization: a point exactly on a border
+belongs to the area east of it (north of it on a horizontal edge, north-east of it
+on a vertex), so a point on a shared border lands in exactly one area, and a point
+on an area's east / north outer edge with nothing beyond it is OUTSIDE. Only where
+areas overlap does the smallest area_id win. NumPy and pure Python agree exactly.
+
+Typical usage:
+  python3 scripts/classify_points.py \
+    --fine-polygons data/asis_fine_polygons.geojson \
+    --input deliveries.csv \
+    --out out/deliveries_with_area.csv \
+    --jobs 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import math
+import multiprocessing
+import os
+import sys
+import time
+from array import array
+from collections import Counter, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from admin_to_zip_changes import find_column
+from build_admin_boundary_geojson import np, load_features, normalize_polygons
+from build_fine_polygons_from_asis import DEPOT_NAMES, normalize_depot_code
+
+
+LAT_HEADERS = ["lat", "latitude", "緯度", "y"]
+LON_HEADERS = ["lon", "lng", "longitude", "経度", "x"]
+OUTPUT_COLUMNS = ["area_id", "area_name", "municipality", "depot_code", "depot_name", "point_match"]
+OUTSIDE = -1
+INVALID = -2
+CELLS_PER_AREA = 4
+SEGMENT_BLOCK = 1 << 21  # (point, segment) pairs per vectorized ray-casting block
+
+
+@dataclass
+class PolygonIndex:
+    """Uniform grid of (area, segments) entries over flat ring segments.
+
+    Each grid cell lists its candidate areas; each such entry keeps only the area's
+    segments a rightward ray from inside the cell can cross (y-span reaching the cell's
+    row, right end at or past the cell's column), so a point is tested against a handful
+    of segments instead of the whole area boundary.
+    """
+
+    records: List[Tuple[str, str, str, str]]  # (area_id, area_name, municipality, depot_code)
+    bboxes: List[Tuple[float, float, float, float]]
+    segments: List[Tuple[float, float, float, float]]  # (ax, ay, bx, by)
+    origin: Tuple[float, float]
+    cell_size: Tuple[float, float]
+    shape: Tuple[int, int]  # (nx, ny)
+    cell_offsets: List[int]  # cell -> entries (CSR)
+    entry_areas: List[int]
+    entry_offsets: List[int]  # entry -> entry_segments (CSR)
+    entry_segments: List[int]
+
+    def __post_init__(self) -> None:
+        if np is not None:
+            seg = np.asarray(self.segments, dtype=np.float64).reshape(-1, 4)
+            self._ax, self._ay, self._by = seg[:, 0], seg[:, 1], seg[:, 3]
+            self._dx = seg[:, 2] - seg[:, 0]
+            # Horizontal edges never pass the straddle test; avoid dividing by zero on them.
+            dy = seg[:, 3] - seg[:, 1]
+            self._dy = np.where(dy != 0, dy, 1.0)
+            self._bbox = np.asarray(self.bboxes, dtype=np.float64).reshape(-1, 4)
+            self._cell_offsets = np.asarray(self.cell_offsets, dtype=np.int64)
+            self._entry_areas = np.asarray(self.entry_areas, dtype=np.int64)
+            self._entry_offsets = np.asarray(self.entry_offsets, dtype=np.int64)
+            self._entry_segments = np.asarray(self.entry_segments, dtype=np.int64)
+
+    def cell_of(self, x: float, y: float) -> int:
+        nx, ny = self.shape
+        cx = grid_coord(x, self.origin[0], self.cell_size[0])
+        cy = grid_coord(y, self.origin[1], self.cell_size[1])
+        if cx < 0 or cy < 0 or cx >= nx or cy >= ny:
+            return -1
+        return cy * nx + cx
+
+    def locate(self, xs: Sequence[float], ys: Sequence[float]) -> List[int]:
+        """Area index per point, OUTSIDE or INVALID."""
+        if np is not None:
+            return self._locate_numpy(np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)).tolist()
+        return [self._locate_py(x, y) for x, y in zip(xs, ys)]
+
+    def _locate_py(self, x: float, y: float) -> int:
+        if not (math.isfinite(x) and math.isfinite(y)):
+            return INVALID
+        cell = self.cell_of(x, y)
+        if cell < 0:
+            return OUTSIDE
+        for entry in range(self.cell_offsets[cell], self.cell_offsets[cell + 1]):
+            area = self.entry_areas[entry]
+            minx, miny, maxx, maxy = self.bboxes[area]
+            if x < minx or x > maxx or y < miny or y > maxy:
+                continue
+            inside = False
+            for seg in self.entry_segments[self.entry_offsets[entry] : self.entry_offsets[entry + 1]]:
+                ax, ay, bx, by = self.segments[seg]
+                if (ay > y) != (by > y) and x < (bx - ax) * (y - ay) / (by - ay) + ax:
+                    inside = not inside
+            if inside:
+                return area
+        return OUTSIDE
+
+    def _locate_numpy(self, xs: "np.ndarray", ys: "np.ndarray") -> "np.ndarray":
+        out = np.full(len(xs), OUTSIDE, dtype=np.int64)
+        valid = np.isfinite(xs) & np.isfinite(ys)
+        out[~valid] = INVALID
+        nx, ny = self.shape
+        with np.errstate(invalid="ignore"):
+            cx = np.floor((xs - self.origin[0]) / self.cell_size[0])
+            cy = np.floor((ys - self.origin[1]) / self.cell_size[1])
+        in_grid = valid & (cx >= 0) & (cy >= 0) & (cx < nx) & (cy < ny)
+        points = np.flatnonzero(in_grid)
+        cells = (cy[points] * nx + cx[points]).astype(np.int64)
+
+        # Every (point, entry) pair of the point's grid cell, kept when the point is inside
+        # the entry area's bbox. Pairs stay ordered by point, then by area.
+        pair_point, pair_entry = expand_ranges(points, self._cell_offsets[cells], self._cell_offsets[cells + 1])
+        pair_area = self._entry_areas[pair_entry]
+        bbox = self._bbox[pair_area]
+        px, py = xs[pair_point], ys[pair_point]
+        near = (px >= bbox[:, 0]) & (py >= bbox[:, 1]) & (px <= bbox[:, 2]) & (py <= bbox[:, 3])
+        pair_point, pair_entry, pair_area = pair_point[near], pair_entry[near], pair_area[near]
+
+        # Ray casting over the entry segments of each pair, in blocks of bounded size.
+        seg_starts = self._entry_offsets[pair_entry]
+        seg_stops = self._entry_offsets[pair_entry + 1]
+        seg_ends = np.cumsum(seg_stops - seg_starts)
+        hits = []
+        start = 0
+        while start < len(pair_entry):
+            base = int(seg_ends[start - 1]) if start else 0
+            end = max(start + 1, int(np.searchsorted(seg_ends, base + SEGMENT_BLOCK, side="right")))
+            pair_ids, at = expand_ranges(np.arange(start, end), seg_starts[start:end], seg_stops[start:end])
+            seg = self._entry_segments[at]
+            x, y = xs[pair_point[pair_ids]], ys[pair_point[pair_ids]]
+            ay = self._ay[seg]
+            # Same operation order as _locate_py so that both give identical results.
+            crosses = ((ay > y) != (self._by[seg] > y)) & (x < self._dx[seg] * (y - ay) / self._dy[seg] + self._ax[seg])
+            parity = np.bincount(pair_ids - start, weights=crosses, minlength=end - start).astype(np.int64) & 1
+            hits.append(np.flatnonzero(parity) + start)
+            start = end
+
+        inside = np.concatenate(hits) if hits else np.zeros(0, dtype=np.int64)
+        # First inside pair per point = smallest area index (areas are sorted by area_id).
+        hit_points, first = np.unique(pair_point[inside], return_index=True)
+        out[hit_points] = pair_area[inside][first]
+        return out
+
+
+def grid_coord(value: float, origin: float, size: float) -> int:
+    # Same expression as the vectorized path, so points and segments agree on cells.
+    return math.floor((value - origin) / size)
+
+
+def expand_ranges(owners: "np.ndarray", starts: "np.ndarray", stops: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    """(owner, i) for every i in [start, stop) of each owner, in order."""
+    counts = stops - starts
+    firsts = np.cumsum(counts) - counts
+    index = np.repeat(starts - firsts, counts) + np.arange(int(counts.sum()))
+    return np.repeat(owners, counts), index
+
+
+def build_polygon_index(fine_features: List[dict]) -> PolygonIndex:
+    rows = []
+    for ft in fine_features:
+        props = ft.get("properties") or {}
+        area_id = str(props.get("area_id") or "").strip()
+        polygons = normalize_polygons(ft.get("geometry") or {})
+        if area_id and polygons:
+            rows.append((area_id, props, polygons))
+    rows.sort(key=lambda row: row[0])
+
+    records: List[Tuple[str, str, str, str]] = []
+    bboxes: List[Tuple[float, float, float, float]] = []
+    seg_offsets = [0]
+    segments: List[Tuple[float, float, float, float]] = []
+    for area_id, props, polygons in rows:
+        for poly in polygons:
+            for ring in poly:
+                if not ring:
+                    continue
+                if ring[0] != ring[-1]:
+                    ring = list(ring) + [ring[0]]
+                for p, q in zip(ring, ring[1:]):
+                    segments.append((float(p[0]), float(p[1]), float(q[0]), float(q[1])))
+        area_segments = segments[seg_offsets[-1] :]
+        if not area_segments:
+            continue
+        records.append(
+            (
+                area_id,
+                str(props.get("area_name") or ""),
+                str(props.get("municipality") or ""),
+                normalize_depot_code(props.get("depot_code") or ""),
+            )
+        )
+        bboxes.append(
+            (
+                min(min(s[0], s[2]) for s in area_segments),
+                min(min(s[1], s[3]) for s in area_segments),
+                max(max(s[0], s[2]) for s in area_segments),
+                max(max(s[1], s[3]) for s in area_segments),
+            )
+        )
+        seg_offsets.append(len(segments))
+
+    if not records:
+        raise SystemExit("error: no polygons in the fine polygons input")
+    x0 = min(b[0] for b in bboxes)
+    y0 = min(b[1] for b in bboxes)
+    x1 = max(b[2] for b in bboxes)
+    y1 = max(b[3] for b in bboxes)
+    # Square-ish cells, about CELLS_PER_AREA of them per area. The grid is closed on the
+    # max side (cells slightly enlarged) so that points on x1 / y1 fall in the last cell.
+    side = math.sqrt(max((x1 - x0) * (y1 - y0), 1e-12) / (CELLS_PER_AREA * len(records)))
+    nx = max(1, math.ceil((x1 - x0) / side))
+    ny = max(1, math.ceil((y1 - y0) / side))
+    cw = ((x1 - x0) / nx or 1e-9) * (1 + 1e-12)
+    ch = ((y1 - y0) / ny or 1e-9) * (1 + 1e-12)
+
+    cells: List[List[Tuple[int, List[int]]]] = [[] for _ in range(nx * ny)]
+    for area, (minx, _, _, _) in enumerate(bboxes):
+        cx0 = grid_coord(minx, x0, cw)
+        per_cell: Dict[int, List[int]] = {}
+        for seg in range(seg_offsets[area], seg_offsets[area + 1]):
+            ax, ay, bx, by = segments[seg]
+            cy0 = grid_coord(min(ay, by), y0, ch)
+            cy1 = min(ny - 1, grid_coord(max(ay, by), y0, ch))
+            cx1 = min(nx - 1, grid_coord(max(ax, bx), x0, cw))
+            for cy in range(cy0, cy1 + 1):
+                for cx in range(cx0, cx1 + 1):
+                    per_cell.setdefault(cy * nx + cx, []).append(seg)
+        for cell, segs in per_cell.items():
+            cells[cell].append((area, segs))
+
+    cell_offsets = [0]
+    entry_areas: List[int] = []
+    entry_offsets = [0]
+    entry_segments: List[int] = []
+    for entries in cells:
+        for area, segs in sorted(entries, key=lambda entry: entry[0]):
+            entry_areas.append(area)
+            entry_segments.extend(segs)
+            entry_offsets.append(len(entry_segments))
+        cell_offsets.append(len(entry_areas))
+
+    return PolygonIndex(
+        records=records,
+        bboxes=bboxes,
+        segments=segments,
+        origin=(x0, y0),
+        cell_size=(cw, ch),
+        shape=(nx, ny),
+        cell_offsets=cell_offsets,
+        entry_areas=entry_areas,
+        entry_offsets=entry_offsets,
+        entry_segments=entry_segments,
+    )
+
+
+def parse_coord(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return math.nan
+
+
+_WORKER_INDEX: Optional[PolygonIndex] = None
+
+
+def _init_worker(index: PolygonIndex) -> None:
+    global _WORKER_INDEX
+    _WORKER_INDEX = index
+
+
+def _locate_chunk(payload: bytes) -> bytes:
+    coords = array("d")
+    coords.frombytes(payload)
+    assert _WORKER_INDEX is not None
+    return array("i", _WORKER_INDEX.locate(coords[0::2], coords[1::2])).tobytes()
+
+
+def classify_stream(
+    index: PolygonIndex,
+    reader: "csv._reader",
+    writer: "csv._writer",
+    lat_column: int,
+    lon_column: int,
+    chunk_size: int,
+    jobs: int,
+) -> Counter:
+    counts: Counter = Counter()
+    outputs = []
+    for area_id, area_name, municipality, depot in index.records:
+        outputs.append([area_id, area_name, municipality, depot, DEPOT_NAMES.get(depot, ""), "OK"])
+    outside = ["", "", "", "", "", "OUTSIDE"]
+    invalid = ["", "", "", "", "", "INVALID"]
+
+    def payload(chunk: List[List[str]]) -> bytes:
+        coords = array("d")
+        for row in chunk:
+            if len(row) > max(lat_column, lon_column):
+                coords.append(parse_coord(row[lon_column]))
+                coords.append(parse_coord(row[lat_column]))
+            else:
+                coords.extend((math.nan, math.nan))
+        return coords.tobytes()
+
+    def write(chunk: List[List[str]], located: bytes) -> None:
+        areas = array("i")
+        areas.frombytes(located)
+        out_rows = []
+        for row, area in zip(chunk, areas):
+            extra = outputs[area] if area >= 0 else (outside if area == OUTSIDE else invalid)
+            counts[extra[5]] += 1
+            out_rows.append(row + extra)
+        writer.writerows(out_rows)
+
+    chunks = iter(lambda: list(itertools.islice(reader, chunk_size)), [])
+    if jobs <= 1:
+        _init_worker(index)
+        for chunk in chunks:
+            write(chunk, _locate_chunk(payload(chunk)))
+        return counts
+
+    with multiprocessing.Pool(processes=jobs, initializer=_init_worker, initargs=(index,)) as pool:
+        # Bounded window of chunks in flight, written back in input order.
+        pending: deque = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.apply_async(_locate_chunk, (payload(chunk),))))
+            if len(pending) >= 2 * jobs:
+                done_chunk, result = pending.popleft()
+                write(done_chunk, result.get())
+        while pending:
+            done_chunk, result = pending.popleft()
+            write(done_chunk, result.get())
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Append the fine area and depot containing each lat/lon point of a CSV.")
+    parser.add_argument("--fine-polygons", default="data/asis_fine_polygons.geojson", help="Fine polygons GeoJSON path.")
+    parser.add_argument("--input", required=True, help="Input CSV path ('-' for stdin).")
+    parser.add_argument("--out", default="-", help="Output CSV path ('-' for stdout).")
+    parser.add_argument("--lat-column", default="", help="Latitude column (default: lat / latitude / 緯度).")
+    parser.add_argument("--lon-column", default="", help="Longitude column (default: lon / lng / longitude / 経度).")
+    parser.add_argument("--encoding", default="utf-8-sig", help="Input encoding (e.g. cp932).")
+    parser.add_argument("--out-encoding", default="utf-8", help="Output encoding.")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="Points per chunk.")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = build_polygon_index(load_features(Path(args.fine_polygons)))
+    index_seconds = time.perf_counter() - started
+
+    src = sys.stdin if args.input == "-" else open(args.input, encoding=args.encoding, newline="")
+    dst = sys.stdout if args.out == "-" else open(args.out, "w", encoding=args.out_encoding, newline="")
+    try:
+        reader = csv.reader(src)
+        writer = csv.writer(dst)
+        header = next(reader, None)
+        if header is None:
+            raise SystemExit("error: empty input")
+        lat_column = find_column(header, args.lat_column, LAT_HEADERS)
+        lon_column = find_column(header, args.lon_column, LON_HEADERS)
+        if lat_column is None or lon_column is None:
+            raise SystemExit(f"error: no lat/lon columns in {args.input} (use --lat-column / --lon-column)")
+        writer.writerow(header + OUTPUT_COLUMNS)
+        counts = classify_stream(index, reader, writer, lat_column, lon_column, max(1, args.chunk_size), max(1, args.jobs))
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+    seconds = time.perf_counter() - started
+    total = sum(counts.values())
+    # The summary is for the operator; stdout may be the CSV itself (--out -).
+    print(f"wrote: {args.out}", file=sys.stderr)
+    print(f"areas: {len(index.records)} (index {index_seconds:.2f}s)", file=sys.stderr)
+    print(f"points: {total} in {seconds:.2f}s ({total / seconds if seconds else 0:,.0f} points/s)", file=sys.stderr)
+    for status in ("OK", "OUTSIDE", "INVALID"):
+        print(f"{status}: {counts[status]}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
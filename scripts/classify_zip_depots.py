@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tag every row of a (large) CSV with the responsible depot for its ZIP code.
+
+Reads the compiled index from build_zip_depot_index.py and streams the input in chunks:
+each chunk's ZIP column is normalized to integer keys and looked up with one binary
+search pass, then the rows are written back with these columns appended:
+
+  depot_code, depot_name, asis_depot, dispatch_area_label, zip_match
+
+zip_match is OK, CONFLICT (ZIP listed with several depots in asis.csv; first row used),
+NO_MATCH (ZIP not in asis.csv) or INVALID (not a 7-digit ZIP).
+
+Memory stays at one chunk regardless of the input size.
+
+Typical usage:
+  python3 scripts/classify_zip_depots.py \
+    --index data/zip_depot_index.bin \
+    --input shipments.csv --encoding cp932 \
+    --out out/shipments_with_depot.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from admin_to_zip_changes import find_column
+from build_fine_polygons_from_asis import DEPOT_NAMES
+from build_zip_depot_index import FLAG_CONFLICT, ZipDepotIndex, zip_key
+
+
+ZIP_HEADERS = ["郵便番号", "zip_code", "zipcode", "zip", "postal_code"]
+OUTPUT_COLUMNS = ["depot_code", "depot_name", "asis_depot", "dispatch_area_label", "zip_match"]
+
+
+def classify_stream(
+    index: ZipDepotIndex,
+    reader: "csv._reader",
+    writer: "csv._writer",
+    zip_column: int,
+    chunk_size: int,
+) -> Counter:
+    # Resolved output cells per index position, built lazily (the same ZIPs repeat a lot).
+    cache: dict = {}
+    no_match = ["", "", "", "", "NO_MATCH"]
+    invalid = ["", "", "", "", "INVALID"]
+    counts: Counter = Counter()
+    while True:
+        chunk = list(itertools.islice(reader, chunk_size))
+        if not chunk:
+            break
+        keys = [zip_key(row[zip_column]) if len(row) > zip_column else -1 for row in chunk]
+        out_rows = []
+        for row, key, pos in zip(chunk, keys, index.positions(keys)):
+            if pos < 0:
+                extra = invalid if key < 0 else no_match
+            else:
+                extra = cache.get(pos)
+                if extra is None:
+                    depot, label, area, flags = index.record(pos)
+                    match = "CONFLICT" if flags & FLAG_CONFLICT else "OK"
+                    extra = cache[pos] = [depot, DEPOT_NAMES.get(depot, ""), label, area, match]
+            counts[extra[4]] += 1
+            out_rows.append(row + extra)
+        writer.writerows(out_rows)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Append the responsible depot to each row of a CSV by ZIP code.")
+    parser.add_argument("--index", default="data/zip_depot_index.bin", help="Index built by build_zip_depot_index.py.")
+    parser.add_argument("--input", required=True, help="Input CSV path ('-' for stdin).")
+    parser.add_argument("--out", default="-", help="Output CSV path ('-' for stdout).")
+    parser.add_argument("--zip-column", default="", help="ZIP column name (default: 郵便番号 / zip_code / zip / postal_code).")
+    parser.add_argument("--encoding", default="utf-8-sig", help="Input encoding (e.g. cp932).")
+    parser.add_argument("--out-encoding", default="utf-8", help="Output encoding.")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows looked up per batch.")
+    args = parser.parse_args()
+
+    index = ZipDepotIndex(Path(args.index))
+    started = time.perf_counter()
+    src = sys.stdin if args.input == "-" else open(args.input, encoding=args.encoding, newline="")
+    dst = sys.stdout if args.out == "-" else open(args.out, "w", encoding=args.out_encoding, newline="")
+    try:
+        reader = csv.reader(src)
+        writer = csv.writer(dst)
+        header = next(reader, None)
+        if header is None:
+            raise SystemExit("error: empty input")
+        zip_column = find_column(header, args.zip_column, ZIP_HEADERS)
+        if zip_column is None:
+            raise SystemExit(f"error: no ZIP column in {args.input} (use --zip-column)")
+        writer.writerow(header + OUTPUT_COLUMNS)
+        counts = classify_stream(index, reader, writer, zip_column, max(1, args.chunk_size))
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    index.close()
+
+    seconds = time.perf_counter() - started
+    total = sum(counts.values())
+    # Progress goes to stderr so that --out - stays a clean CSV.
+    print(f"wrote: {args.out}", file=sys.stderr)
+    print(f"rows: {total} in {seconds:.2f}s ({total / seconds if seconds else 0:,.0f} rows/s)", file=sys.stderr)
+    for status in ("OK", "CONFLICT", "NO_MATCH", "INVALID"):
+        print(f"{status}: {counts[status]}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Report which municipal boundaries moved between two N03 release vintages.
+
+Both vintages are grouped by N03_007 exactly like build_admin_boundary_geojson.py
+(build_grouped_features) and their edges quantized and packed into the same
+EdgeTable. Per N03_007 code the sorted, de-duplicated edge keys are hashed; codes
+whose hashes match are unchanged and never compared edge by edge, so only the few
+moved municipalities cost more than one sort.
+
+Statuses:
+  changed  same N03_007, different edges (removed_edges / added_edges counts)
+  renamed  same N03_007 and edges, different municipality name
+  added    N03_007 only in the new vintage (related_codes: old codes sharing edges)
+  removed  N03_007 only in the old vintage (related_codes: new codes sharing edges)
+
+affected_area_ids lists the admin area_ids (= N03_007) and, with --fine-polygons,
+the fine area_ids of every affected municipality: the set that needs reprocessing.
+
+Typical usage:
+  python3 scripts/diff_n03_vintages.py \
+    --old data/n03_tokyo_kanagawa/tokyo/N03-20250101_13.shp data/n03_tokyo_kanagawa/kanagawa/N03-20250101_14.shp \
+    --new N03-20260101_13.shp N03-20260101_14.shp \
+    --report out/n03_vintage_diff.json --csv out/n03_vintage_diff.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import sys
+import time
+from array import array
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence, Set, Tuple
+
+from build_admin_boundary_geojson import (
+    EdgeTable,
+    build_grouped_features,
+    canonical_municipality,
+    canonical_pref_name,
+    iter_n03_features,
+    load_features,
+    normalize_polygons,
+    np,
+)
+
+
+STATUSES = ("changed", "renamed", "added", "removed")
+
+
+@dataclass
+class VintageEdges:
+    """Unique packed edges of one vintage, sorted by (code, a, b), with per-code CSR offsets."""
+
+    codes: List[str]
+    names: List[Tuple[str, str]]  # (pref_name, municipality) per code
+    offsets: List[int]
+    a: Sequence[int]
+    b: Sequence[int]
+    digests: List[str]
+
+    def code_index(self) -> Dict[str, int]:
+        return {code: index for index, code in enumerate(self.codes)}
+
+    def edges(self, index: int) -> Set[Tuple[int, int]]:
+        lo, hi = self.offsets[index], self.offsets[index + 1]
+        return set(zip(self.a[lo:hi], self.b[lo:hi]))
+
+    def edge_count(self, index: int) -> int:
+        return self.offsets[index + 1] - self.offsets[index]
+
+
+def load_vintage(paths: List[Path]) -> VintageEdges:
+    grouped = build_grouped_features(feature for path in paths for feature in iter_n03_features(path))
+    table = EdgeTable()
+    for muni_id, ft in enumerate(grouped):
+        table.add_polygons(normalize_polygons(ft["geometry"]), muni_id)
+    codes = [ft["properties"]["N03_007"] for ft in grouped]
+    names = [(ft["properties"]["pref_name"], ft["properties"]["municipality"]) for ft in grouped]
+
+    if np is not None:
+        muni = np.frombuffer(table.muni, dtype=np.uint32).astype(np.int64)
+        a = np.frombuffer(table.a, dtype=np.uint64)
+        b = np.frombuffer(table.b, dtype=np.uint64)
+        order = np.lexsort((b, a, muni))
+        muni, a, b = muni[order], a[order], b[order]
+        keep = np.ones(len(muni), dtype=bool)
+        keep[1:] = (muni[1:] != muni[:-1]) | (a[1:] != a[:-1]) | (b[1:] != b[:-1])
+        muni, a, b = muni[keep], a[keep], b[keep]
+        offsets = np.searchsorted(muni, np.arange(len(codes) + 1)).tolist()
+        pairs = np.column_stack((a, b)).astype("<u8")
+        digests = [edge_digest(pairs[lo:hi].tobytes()) for lo, hi in zip(offsets, offsets[1:])]
+        return VintageEdges(codes, names, offsets, a.tolist(), b.tolist(), digests)
+
+    rows = sorted(set(zip(table.muni, table.a, table.b)))
+    offsets = [0] * (len(codes) + 1)
+    for muni_id, _, _ in rows:
+        offsets[muni_id + 1] += 1
+    for index in range(len(codes)):
+        offsets[index + 1] += offsets[index]
+    a_list = [row[1] for row in rows]
+    b_list = [row[2] for row in rows]
+    digests = []
+    for lo, hi in zip(offsets, offsets[1:]):
+        pairs = array("Q", [key for edge in zip(a_list[lo:hi], b_list[lo:hi]) for key in edge])
+        if sys.byteorder != "little":
+            pairs.byteswap()
+        digests.append(edge_digest(pairs.tobytes()))
+    return VintageEdges(codes, names, offsets, a_list, b_list, digests)
+
+
+def edge_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def related_codes(
+    edges: Set[Tuple[int, int]],
+    other: VintageEdges,
+    candidates: List[int],
+) -> Dict[str, int]:
+    """Codes of the other vintage (among candidates) sharing edges, with shared edge counts."""
+    counts: Counter = Counter()
+    for index in candidates:
+        shared = len(edges & other.edges(index))
+        if shared:
+            counts[other.codes[index]] = shared
+    return dict(sorted(counts.items()))
+
+
+def diff_vintages(old: VintageEdges, new: VintageEdges) -> Tuple[List[dict], int]:
+    """(one entry per changed / renamed / added / removed code, unchanged count)."""
+    old_index = old.code_index()
+    new_index = new.code_index()
+    entries: List[dict] = []
+    unchanged = 0
+    moved_old: List[int] = []
+    moved_new: List[int] = []
+    for code in sorted(set(old_index) | set(new_index)):
+        i, j = old_index.get(code), new_index.get(code)
+        entry = {"n03_code": code}
+        if i is not None and j is not None:
+            if old.digests[i] == new.digests[j]:
+                if old.names[i] == new.names[j]:
+                    unchanged += 1
+                    continue
+                entry.update(status="renamed", removed_edges=0, added_edges=0)
+            else:
+                old_edges, new_edges = old.edges(i), new.edges(j)
+                entry.update(status="changed", removed_edges=len(old_edges - new_edges), added_edges=len(new_edges - old_edges))
+                moved_old.append(i)
+                moved_new.append(j)
+        elif i is not None:
+            entry.update(status="removed", removed_edges=old.edge_count(i), added_edges=0)
+            moved_old.append(i)
+        else:
+            entry.update(status="added", removed_edges=0, added_edges=new.edge_count(j))
+            moved_new.append(j)
+        pref_name, municipality = new.names[j] if j is not None else old.names[i]
+        entry.update(
+            pref_name=pref_name,
+            municipality=municipality,
+            old_municipality=old.names[i][1] if i is not None else "",
+            old_edges=old.edge_count(i) if i is not None else 0,
+            new_edges=new.edge_count(j) if j is not None else 0,
+            old_hash=old.digests[i] if i is not None else "",
+            new_hash=new.digests[j] if j is not None else "",
+        )
+        entries.append(entry)
+
+    # Trace mergers / splits through the edges they inherit from the other vintage.
+    for entry in entries:
+        if entry["status"] == "added":
+            edges = new.edges(new_index[entry["n03_code"]])
+            entry["related_codes"] = related_codes(edges, old, moved_old)
+        elif entry["status"] == "removed":
+            edges = old.edges(old_index[entry["n03_code"]])
+            entry["related_codes"] = related_codes(edges, new, moved_new)
+        else:
+            entry["related_codes"] = {}
+    return entries, unchanged
+
+
+def attach_fine_area_ids(entries: List[dict], fine_features: List[dict]) -> None:
+    by_municipality: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+    for ft in fine_features:
+        props = ft.get("properties") or {}
+        area_id = str(props.get("area_id") or "").strip()
+        municipality = canonical_municipality(props.get("municipality") or "")
+        if area_id and municipality:
+            by_municipality[(canonical_pref_name(props), municipality)].append(area_id)
+    for entry in entries:
+        names = {entry["municipality"], entry["old_municipality"]} - {""}
+        entry["fine_area_ids"] = sorted(
+            area_id for name in names for area_id in by_municipality.get((entry["pref_name"], name), [])
+        )
+
+
+def write_csv(path: Path, entries: List[dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    columns = [
+        "n03_code",
+        "status",
+        "pref_name",
+        "municipality",
+        "old_municipality",
+        "old_edges",
+        "new_edges",
+        "removed_edges",
+        "added_edges",
+        "related_codes",
+        "fine_area_count",
+    ]
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for entry in entries:
+            related = ";".join(f"{code}:{count}" for code, count in entry["related_codes"].items())
+            writer.writerow(
+                [entry[column] for column in columns[:9]] + [related, len(entry.get("fine_area_ids") or [])]
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Diff municipal boundaries between two N03 vintages by quantized edge hashes.")
+    parser.add_argument("--old", nargs="+", required=True, help="Old vintage N03 GeoJSON or Shapefile (.shp) paths.")
+    parser.add_argument("--new", nargs="+", required=True, help="New vintage N03 GeoJSON or Shapefile (.shp) paths.")
+    parser.add_argument("--fine-polygons", default="data/asis_fine_polygons.geojson", help="Fine polygons GeoJSON for affected fine area_ids (skipped when missing).")
+    parser.add_argument("--report", default="out/n03_vintage_diff.json", help="Output JSON report path.")
+    parser.add_argument("--csv", default="", help="Optional CSV with one row per affected municipality.")
+    parser.add_argument("--fail-on-changes", action="store_true", help="Exit with status 1 when any municipality differs.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    old = load_vintage([Path(p) for p in args.old])
+    new = load_vintage([Path(p) for p in args.new])
+    loaded = time.perf_counter()
+    entries, unchanged = diff_vintages(old, new)
+
+    fine_path = Path(args.fine_polygons)
+    if args.fine_polygons and fine_path.exists():
+        attach_fine_area_ids(entries, load_features(fine_path))
+    affected = sorted({entry["n03_code"] for entry in entries} | {a for entry in entries for a in entry.get("fine_area_ids") or []})
+    status_counts = Counter(entry["status"] for entry in entries)
+    report = {
+        "old": args.old,
+        "new": args.new,
+        "summary": {
+            "municipalities_old": len(old.codes),
+            "municipalities_new": len(new.codes),
+            "unchanged": unchanged,
+            **{status: status_counts[status] for status in STATUSES},
+        },
+        "municipalities": entries,
+        "affected_area_ids": affected,
+    }
+
+    report_path = Path(args.report)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with report_path.open("w", encoding="utf-8") as f:
+        f.write(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.csv:
+        write_csv(Path(args.csv), entries)
+
+    elapsed = time.perf_counter() - started
+    print(f"wrote: {report_path}")
+    if args.csv:
+        print(f"wrote: {args.csv}")
+    print(f"municipalities: old {len(old.codes)}, new {len(new.codes)}, unchanged {unchanged}")
+    for status in STATUSES:
+        print(f"{status}: {status_counts[status]}")
+    for entry in entries:
+        print(f"  {entry['status']}: {entry['n03_code']} {entry['municipality']} (-{entry['removed_edges']} / +{entry['added_edges']} edges)")
+    print(f"affected area_ids: {len(affected)}")
+    print(f"elapsed: {elapsed:.3f}s (load {loaded - started:.3f}s)")
+    if args.fail_on_changes and entries:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
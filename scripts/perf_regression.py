@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Performance regression check for the build scripts.
+
+Runs fixed-size workloads through the real entry points (main() of
+build_fine_polygons_from_asis / build_admin_boundary_geojson / admin_to_zip_changes)
+and compares CPU time and peak traced memory with a stored baseline JSON.
+
+Workloads use only files in this repository plus deterministic synthetic inputs
+written to a temporary directory (e-Stat style KMZ wrapper ZIPs on a jittered grid,
+an updated assignment CSV), so the check runs offline.
+
+- time: `--warmup` untimed runs, then `--repeat` timed runs -> process CPU time
+  (cpu_s, minimum over the runs) plus wall time min / median / p95
+- memory: one extra run under tracemalloc -> peak MiB
+- regression: cpu_s above baseline * (1 + --time-tolerance) and by more than
+  --min-seconds, or peak above baseline * (1 + --memory-tolerance)
+
+Only cpu_s is gated. Wall-time medians of sub-second workloads move by 40-80%
+between identical runs on a busy or single-core machine, while the minimum CPU
+time of the same runs stays within a few percent; the 50% default tolerance
+leaves room for that noise and still catches algorithmic slowdowns. Wall times
+are reported for reference only.
+
+Typical usage:
+  python3 scripts/perf_regression.py                     # compare, exit 1 on regression
+  python3 scripts/perf_regression.py --update-baseline   # record a new baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import csv
+import gc
+import io
+import json
+import math
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import admin_to_zip_changes
+import build_admin_boundary_geojson
+import build_fine_polygons_from_asis
+
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+ASIS_CSV = REPO_DIR / "asis.csv"
+BASELINE_ASSIGNMENTS_CSV = REPO_DIR / "data" / "asis_admin_assignments.csv"
+N03_FALLBACK_GEOJSON = REPO_DIR / "data" / "n03_target_admin_areas.geojson"
+KANAGAWA_N03_SHP = REPO_DIR / "data" / "n03_tokyo_kanagawa" / "kanagawa" / "N03-20250101_14.shp"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "perf_baseline.json"
+
+# Synthetic prefecture grids: (pref_name, municipalities, towns per municipality, origin lon, origin lat).
+SYNTHETIC_PREFS = [
+    ("埼玉県", 40, 30, 139.2, 35.8),
+    ("千葉県", 40, 30, 140.0, 35.4),
+]
+GRID_COLUMNS = 40
+CELL_DEG = 0.005
+CELL_SUBDIVISIONS = 8  # points per cell side, so each town ring has 4 * 8 + 1 points
+
+
+@dataclass
+class Workload:
+    name: str
+    main: Callable[[], None]
+    argv: List[str]
+
+
+def jitter(i: int, j: int) -> Tuple[float, float]:
+    """Deterministic offset per lattice point, so neighbouring cells share identical edges."""
+    h = (i * 73856093) ^ (j * 19349663)
+    step = CELL_DEG / CELL_SUBDIVISIONS
+    return ((h % 997) / 997 - 0.5) * 0.3 * step, ((h // 997 % 991) / 991 - 0.5) * 0.3 * step
+
+
+def cell_ring(col: int, row: int, lon0: float, lat0: float) -> List[Tuple[float, float]]:
+    k = CELL_SUBDIVISIONS
+    i0, j0 = col * k, row * k
+    lattice = (
+        [(i0 + t, j0) for t in range(k)]
+        + [(i0 + k, j0 + t) for t in range(k)]
+        + [(i0 + k - t, j0 + k) for t in range(k)]
+        + [(i0, j0 + k - t) for t in range(k)]
+    )
+    step = CELL_DEG / k
+    ring = []
+    for i, j in lattice:
+        dx, dy = jitter(i, j)
+        ring.append((round(lon0 + i * step + dx, 6), round(lat0 + j * step + dy, 6)))
+    ring.append(ring[0])
+    return ring
+
+
+def placemark_kml(attrs: Dict[str, str], ring: List[Tuple[float, float]]) -> str:
+    data = "".join(f'<SimpleData name="{key}">{value}</SimpleData>' for key, value in attrs.items())
+    coords = " ".join(f"{x},{y}" for x, y in ring)
+    return (
+        f"<Placemark><ExtendedData><SchemaData>{data}</SchemaData></ExtendedData>"
+        f"<Polygon><outerBoundaryIs><LinearRing><coordinates>{coords}</coordinates>"
+        "</LinearRing></outerBoundaryIs></Polygon></Placemark>"
+    )
+
+
+def write_kmz_wrapper(path: Path, pref_name: str, towns: List[Tuple[str, str]], lon0: float, lat0: float) -> None:
+    """Write an e-Stat style wrapper ZIP (ZIP -> KMZ -> KML) with one grid cell per (municipality, town)."""
+    placemarks = []
+    for index, (municipality, town) in enumerate(towns):
+        attrs = {
+            "PREF_NAME": pref_name,
+            "CITY_NAME": municipality,
+            "S_NAME": town,
+            "KEYCODE1": f"{index + 1:09d}",
+        }
+        placemarks.append(placemark_kml(attrs, cell_ring(index % GRID_COLUMNS, index // GRID_COLUMNS, lon0, lat0)))
+    kml = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<kml xmlns="http://www.opengis.net/kml/2.2"><Document>' + "".join(placemarks) + "</Document></kml>"
+    )
+
+    kmz = io.BytesIO()
+    with zipfile.ZipFile(kmz, "w", zipfile.ZIP_DEFLATED) as inner:
+        inner.writestr("doc.kml", kml)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as outer:
+        outer.writestr(path.with_suffix(".kmz").name, kmz.getvalue())
+
+
+def kanagawa_towns() -> List[Tuple[str, str]]:
+    """(municipality, town) for every operational Kanagawa town listed in asis.csv, in a stable order."""
+    _, muni_to_depots = build_fine_polygons_from_asis.load_baseline_assignments(BASELINE_ASSIGNMENTS_CSV)
+    target_munis = set(muni_to_depots) - {"町田市"}
+    town_to_depots = build_fine_polygons_from_asis.build_town_to_depots_map(ASIS_CSV, target_munis)
+    return sorted(town_to_depots)
+
+
+def write_updated_assignments(path: Path) -> None:
+    """Baseline assignments with every third area moved to the next depot."""
+    depots = ["SGM", "FUJ", "YOK"]
+    with BASELINE_ASSIGNMENTS_CSV.open(encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.DictReader(f))
+    for index, row in enumerate(rows):
+        code = str(row.get("depot_code") or "").strip()
+        if index % 3 == 0 and code in depots:
+            new_code = depots[(depots.index(code) + 1) % len(depots)]
+            row["depot_code"] = new_code
+            row["depot_name"] = admin_to_zip_changes.DEPOT_NAMES[new_code]
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def prepare_fixtures(work_dir: Path) -> List[Workload]:
+    kanagawa_zip = work_dir / "A002005212020DDKWC14.zip"
+    write_kmz_wrapper(kanagawa_zip, "神奈川県", kanagawa_towns(), 139.0, 35.1)
+
+    pref_zips = []
+    for pref_name, muni_count, towns_per_muni, lon0, lat0 in SYNTHETIC_PREFS:
+        towns = [(f"合成{pref_name[0]}{m:02d}市", f"町{t:03d}") for m in range(muni_count) for t in range(towns_per_muni)]
+        pref_zip = work_dir / f"{pref_name}.zip"
+        write_kmz_wrapper(pref_zip, pref_name, towns, lon0, lat0)
+        pref_zips.append(pref_zip)
+
+    empty_geojson = work_dir / "empty.geojson"
+    empty_geojson.write_text('{"type": "FeatureCollection", "features": []}', encoding="utf-8")
+    updated_csv = work_dir / "updated.csv"
+    write_updated_assignments(updated_csv)
+
+    fine_out = work_dir / "fine_polygons.geojson"
+    fine_argv = [
+        "--asis", str(ASIS_CSV),
+        "--baseline", str(BASELINE_ASSIGNMENTS_CSV),
+        "--kanagawa-kmz-zip", str(kanagawa_zip),
+        "--saitama-kmz-zip", str(pref_zips[0]),
+        "--chiba-kmz-zip", str(pref_zips[1]),
+        "--tokyo-town-geojson", str(work_dir / "no_tokyo_towns.geojson"),
+        "--n03-fallback", str(N03_FALLBACK_GEOJSON),
+        "--coverage-mode", "full",
+        "--out", str(fine_out),
+    ]
+    # The boundary workloads read the fine polygons, so build them once up front.
+    run_entry_point(build_fine_polygons_from_asis.main, fine_argv)
+
+    return [
+        Workload("fine_polygons", build_fine_polygons_from_asis.main, fine_argv),
+        Workload(
+            "admin_boundaries",
+            build_admin_boundary_geojson.main,
+            [
+                "--tokyo", str(empty_geojson),
+                "--kanagawa", str(KANAGAWA_N03_SHP),
+                "--fine-polygons", str(fine_out),
+                "--extra-pref-names", "埼玉県,千葉県",
+                "--out", str(work_dir / "admin_boundaries.geojson"),
+            ],
+        ),
+        Workload(
+            "admin_boundaries_dissolved",
+            build_admin_boundary_geojson.main,
+            [
+                "--geometry-mode", "dissolved",
+                "--fine-polygons", str(fine_out),
+                "--dissolve-pref-names", "東京都,神奈川県,埼玉県,千葉県",
+                "--out", str(work_dir / "admin_boundaries_dissolved.geojson"),
+            ],
+        ),
+        Workload(
+            "zip_changes",
+            admin_to_zip_changes.main,
+            [
+                "--asis", str(ASIS_CSV),
+                "--baseline", str(BASELINE_ASSIGNMENTS_CSV),
+                "--updated", str(updated_csv),
+                "--out-dir", str(work_dir / "zip_changes"),
+            ],
+        ),
+    ]
+
+
+def run_entry_point(main: Callable[[], None], argv: List[str]) -> None:
+    saved_argv = sys.argv
+    sys.argv = [main.__module__, *argv]
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            main()
+    finally:
+        sys.argv = saved_argv
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def measure(workload: Workload, warmup: int, repeat: int) -> dict:
+    for _ in range(warmup):
+        run_entry_point(workload.main, workload.argv)
+
+    seconds: List[float] = []
+    cpu_seconds: List[float] = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        run_entry_point(workload.main, workload.argv)
+        cpu_seconds.append(time.process_time() - cpu_started)
+        seconds.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run_entry_point(workload.main, workload.argv)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "cpu_s": round(min(cpu_seconds), 4),
+        "median_s": round(statistics.median(seconds), 4),
+        "p95_s": round(percentile(seconds, 0.95), 4),
+        "min_s": round(min(seconds), 4),
+        "peak_mib": round(peak / (1 << 20), 2),
+        "runs": repeat,
+    }
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "numpy": build_admin_boundary_geojson.np is not None,
+    }
+
+
+def compare(
+    baseline: dict,
+    results: Dict[str, dict],
+    time_tolerance: float,
+    memory_tolerance: float,
+    min_seconds: float,
+) -> Tuple[List[str], List[str]]:
+    """Return (report lines, regression lines)."""
+    lines = [f"{'workload':<28} {'metric':<9} {'baseline':>10} {'current':>10} {'change':>8}  status"]
+    regressions: List[str] = []
+    for name, current in results.items():
+        base = baseline.get("workloads", {}).get(name)
+        if not base:
+            lines.append(f"{name:<28} (no baseline)")
+            continue
+        checks = [
+            ("cpu_s", time_tolerance, min_seconds),
+            ("min_s", None, 0.0),
+            ("median_s", None, 0.0),
+            ("p95_s", None, 0.0),
+            ("peak_mib", memory_tolerance, 0.0),
+        ]
+        for metric, tolerance, floor in checks:
+            old, new = float(base[metric]), float(current[metric])
+            change = (new - old) / old if old else 0.0
+            status = ""
+            if tolerance is not None:
+                regressed = new > old * (1 + tolerance) and new - old > floor
+                status = "REGRESSION" if regressed else "ok"
+                if regressed:
+                    regressions.append(f"{name}: {metric} {old:g} -> {new:g} ({change:+.1%}, limit +{tolerance:.0%})")
+            lines.append(f"{name:<28} {metric:<9} {old:>10.4g} {new:>10.4g} {change:>+8.1%}  {status}")
+    return lines, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check build script speed and memory against a stored baseline.")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline JSON path.")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the current results as the baseline.")
+    parser.add_argument("--only", default="", help="Comma separated workload names (default: all).")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs before measuring.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per workload.")
+    parser.add_argument("--time-tolerance", type=float, default=0.50, help="Allowed CPU time slowdown ratio.")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10, help="Allowed peak memory growth ratio.")
+    parser.add_argument("--min-seconds", type=float, default=0.10, help="Ignore CPU time slowdowns smaller than this (seconds).")
+    parser.add_argument("--out", default="", help="Optional path to also write the current results JSON.")
+    args = parser.parse_args()
+
+    baseline_path = Path(args.baseline)
+    wanted = {name.strip() for name in args.only.split(",") if name.strip()}
+    results: Dict[str, dict] = {}
+
+    with tempfile.TemporaryDirectory(prefix="rgu-perf-") as tmp:
+        workloads = prepare_fixtures(Path(tmp))
+        unknown = wanted - {workload.name for workload in workloads}
+        if unknown:
+            raise SystemExit(f"error: unknown workload(s): {', '.join(sorted(unknown))}")
+        for workload in workloads:
+            if wanted and workload.name not in wanted:
+                continue
+            results[workload.name] = measure(workload, args.warmup, args.repeat)
+            stats = results[workload.name]
+            print(f"{workload.name}: cpu {stats['cpu_s']:.3f}s, median {stats['median_s']:.3f}s, p95 {stats['p95_s']:.3f}s, peak {stats['peak_mib']:.1f}MiB")
+
+    current = {"environment": environment(), "workloads": results}
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(current, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"wrote: {out_path}")
+
+    if args.update_baseline:
+        merged: dict = {"environment": current["environment"], "workloads": {}}
+        if baseline_path.exists() and wanted:
+            merged["workloads"].update(json.loads(baseline_path.read_text(encoding="utf-8")).get("workloads", {}))
+        merged["workloads"].update(results)
+        baseline_path.write_text(json.dumps(merged, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"wrote: {baseline_path}")
+        return
+
+    if not baseline_path.exists():
+        raise SystemExit(f"error: baseline not found: {baseline_path} (run with --update-baseline first)")
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    if baseline.get("environment") != current["environment"]:
+        print(f"note: baseline environment {baseline.get('environment')} differs from {current['environment']}")
+
+    lines, regressions = compare(baseline, results, args.time_tolerance, args.memory_tolerance, args.min_seconds)
+    print()
+    print("\n".join(lines))
+    if regressions:
+        print()
+        for line in regressions:
+            print(f"regression: {line}")
+        sys.exit(1)
+    print()
+    print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Slim, dictionary-encoded feature properties for the GeoJSON files the browser loads.
+
+Every fine polygon repeats pref_name / municipality / depot strings, and every
+boundary feature repeats N03_001-N03_005. The slim form keeps only the properties
+the client reads (src/utils.js getters), replaces the repeated string columns with
+integer indexes into one shared string table, and omits values equal to the most
+common value of their column. The file stays a GeoJSON FeatureCollection with one
+extra top-level member:
+
+  "property_dictionary": {
+    "format": "property-dictionary/1",
+    "columns": [...],   # decoded property order
+    "encoded": [...],   # columns stored as indexes into "strings"
+    "strings": [...],
+    "defaults": {column: value}  # decoded value used when a feature omits the column
+  }
+
+src/utils.js decodePropertyDictionary() turns it back into plain properties on load;
+every decoded string is the same table entry, so features share them in memory.
+decode_feature_collection() below is the Python equivalent.
+
+Typical usage (existing outputs; the builders also take --slim-out):
+  python3 scripts/property_dictionary.py --preset fine \
+    data/asis_fine_polygons.geojson data/asis_fine_polygons.slim.geojson
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+FORMAT = "property-dictionary/1"
+
+# Fine polygons: town_code / source / assign_status are never read by the client,
+# depot_name is DEPOT_NAMES[depot_code].
+FINE_COLUMNS = (
+    "area_id",
+    "area_name",
+    "municipality",
+    "town_name",
+    "pref_name",
+    "depot_code",
+    "zip_code",
+    "zip_count",
+    "zip_depot_counts",
+    "dispatch_area_label",
+)
+FINE_ENCODED = ("municipality", "pref_name", "depot_code", "dispatch_area_label")
+
+# Municipality boundaries: N03_007 equals area_id, pref_name equals N03_001, and the
+# once-mode part_neighbors* / N03_002 / N03_003 are not read by the client.
+BOUNDARY_COLUMNS = ("area_id", "area_name", "municipality", "N03_001", "N03_004", "N03_005")
+BOUNDARY_ENCODED = ("area_name", "municipality", "N03_001", "N03_004", "N03_005")
+
+PRESETS: Dict[str, Tuple[Sequence[str], Sequence[str]]] = {
+    "fine": (FINE_COLUMNS, FINE_ENCODED),
+    "boundary": (BOUNDARY_COLUMNS, BOUNDARY_ENCODED),
+}
+
+
+def _value_key(value: object) -> Tuple[str, object]:
+    if isinstance(value, (dict, list)):
+        return ("json", json.dumps(value, ensure_ascii=False, sort_keys=True))
+    return (type(value).__name__, value)
+
+
+def encode_properties(
+    features: Sequence[dict], columns: Sequence[str], encoded: Sequence[str]
+) -> Tuple[dict, List[dict]]:
+    """(property_dictionary, features with slim properties); geometries are shared, not copied."""
+    rows = [[(ft.get("properties") or {}).get(column) for column in columns] for ft in features]
+    keys = [[_value_key(value) for value in row] for row in rows]
+
+    defaults: Dict[str, object] = {}
+    default_keys: List[object] = []
+    for index, column in enumerate(columns):
+        counts = Counter(row_keys[index] for row_keys in keys).most_common(1)
+        # A value seen once gains nothing as a default (area_id, area_name, ...).
+        default_key = counts[0][0] if counts and counts[0][1] > 1 else None
+        default_keys.append(default_key)
+        if default_key is not None:
+            defaults[column] = next(row[index] for row, row_keys in zip(rows, keys) if row_keys[index] == default_key)
+
+    encoded_set = set(encoded)
+    strings: List[str] = []
+    string_index: Dict[str, int] = {}
+    out: List[dict] = []
+    for ft, row, row_keys in zip(features, rows, keys):
+        props: Dict[str, object] = {}
+        for column, value, key, default_key in zip(columns, row, row_keys, default_keys):
+            if key == default_key:
+                continue
+            if column in encoded_set and value is not None:
+                if not isinstance(value, str):
+                    raise SystemExit(f"error: {column} must be a string to be dictionary-encoded: {value!r}")
+                if value not in string_index:
+                    string_index[value] = len(strings)
+                    strings.append(value)
+                value = string_index[value]
+            props[column] = value
+        out.append({"type": "Feature", "properties": props, "geometry": ft.get("geometry")})
+
+    dictionary = {
+        "format": FORMAT,
+        "columns": list(columns),
+        "encoded": [column for column in columns if column in encoded_set],
+        "strings": strings,
+        "defaults": defaults,
+    }
+    return dictionary, out
+
+
+def decode_feature_collection(data: dict) -> List[dict]:
+    """Features with plain properties; collections without a dictionary pass through."""
+    dictionary = data.get("property_dictionary")
+    features = data.get("features") or []
+    if not dictionary:
+        return features
+    if dictionary.get("format") != FORMAT:
+        raise SystemExit(f"error: unsupported property dictionary: {dictionary.get('format')!r}")
+    columns = dictionary["columns"]
+    encoded = set(dictionary["encoded"])
+    strings = dictionary["strings"]
+    defaults = dictionary["defaults"]
+    out: List[dict] = []
+    for ft in features:
+        slim = ft.get("properties") or {}
+        props: Dict[str, object] = {}
+        for column in columns:
+            if column in slim:
+                value = slim[column]
+                props[column] = strings[value] if column in encoded and isinstance(value, int) else value
+            elif column in defaults:
+                props[column] = copy.deepcopy(defaults[column])
+        out.append({**ft, "properties": props})
+    return out
+
+
+def write_slim_feature_collection(
+    path: Path, features: Iterable[dict], columns: Sequence[str], encoded: Sequence[str]
+) -> int:
+    """Write the slim collection with compact separators; returns the file size in bytes."""
+    dictionary, slim = encode_properties(list(features), columns, encoded)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        f.write('{"type":"FeatureCollection","property_dictionary":')
+        f.write(json.dumps(dictionary, ensure_ascii=False, separators=(",", ":")))
+        f.write(',"features":[')
+        for index, ft in enumerate(slim):
+            if index:
+                f.write(",")
+            f.write(json.dumps(ft, ensure_ascii=False, separators=(",", ":")))
+        f.write("]}")
+    tmp_path.replace(path)
+    return path.stat().st_size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write a slim, dictionary-encoded copy of a GeoJSON build output.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), required=True, help="fine: asis fine polygons. boundary: admin boundaries.")
+    parser.add_argument("src", help="Input GeoJSON path.")
+    parser.add_argument("out", help="Output slim GeoJSON path.")
+    args = parser.parse_args()
+
+    src_path = Path(args.src)
+    with src_path.open(encoding="utf-8") as f:
+        features = decode_feature_collection(json.load(f))
+    columns, encoded = PRESETS[args.preset]
+    size = write_slim_feature_collection(Path(args.out), features, columns, encoded)
+    print(f"wrote: {args.out} ({size} bytes, source {src_path.stat().st_size} bytes)")
+    print(f"features: {len(features)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Propose town-level depot reassignments that balance ZIP count (or asis rows) across
+depots without splitting any depot's territory.
+
+- Units: fine polygons grouped by (municipality, town name without 丁目), the key the
+  ZIP statistics are embedded with, so a town and its 丁目 polygons always move together.
+  Towns whose polygons currently disagree on the depot, and unassigned towns, stay fixed.
+- Graph: the town adjacency from build_town_adjacency.py (read from --adjacency when
+  present, otherwise computed from the fine polygons).
+- Cost: sum over depots of ((load - target) / target)^2, plus --border-weight times the
+  border length between different depots relative to the initial one.
+- Search: greedy local search over boundary towns. A move only goes to a depot the town
+  already touches, and only when the town's neighbours in its old depot stay connected
+  without it (breadth-first search that stops once they are all reached), so no depot
+  territory is ever split. The cost change of a move is O(1): loads are kept per depot
+  and border length per (town, depot), updated along the moved town's edges.
+
+Output: assignment CSV in the map tool export format (area_id, area_name, municipality,
+depot_code, depot_name) with one row per fine polygon whose depot differs from the
+fine polygons (moved towns, plus --assignments edits), for admin_to_zip_changes.py or
+build_depot_territories.py --assignments. With no moves it has only the header.
+
+Typical usage:
+  python3 scripts/rebalance_depots.py \
+    --fine-polygons data/asis_fine_polygons.geojson \
+    --adjacency data/asis_fine_adjacency.json \
+    --balance zip_count \
+    --out out/depot_assignments_rebalanced.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from build_admin_boundary_geojson import load_features
+from build_depot_territories import load_assignment_overrides
+from build_fine_polygons_from_asis import DEPOT_NAMES, canonical_town_name, normalize_depot_code
+from build_town_adjacency import build_adjacency, collect_town_edge_table
+
+
+@dataclass
+class Town:
+    key: Tuple[str, str]
+    area_ids: List[str]
+    weight: float
+    depot: str
+    movable: bool
+    neighbors: Dict[int, float] = field(default_factory=dict)  # town index -> border metres
+
+
+def town_weight(props: dict, balance: str) -> float:
+    if balance == "zip_rows":
+        counts = props.get("zip_depot_counts") or {}
+        return float(sum(int(v) for v in counts.values()))
+    return float(props.get("zip_count") or 0)
+
+
+def load_adjacency(path: Path, fine_features: List[dict]) -> Tuple[List[str], List[int], List[int], List[float]]:
+    if path.exists():
+        with path.open(encoding="utf-8") as f:
+            data = json.load(f)
+        return data["area_ids"], data["offsets"], data["neighbors"], data["border_m"]
+    print(f"warn: {path} not found; computing adjacency from the fine polygons")
+    table, area_ids = collect_town_edge_table(fine_features)
+    offsets, neighbors, border_m = build_adjacency(table, len(area_ids))
+    return area_ids, offsets, neighbors, border_m
+
+
+def build_towns(
+    fine_features: List[dict],
+    adjacency: Tuple[List[str], List[int], List[int], List[float]],
+    overrides: Dict[str, str],
+    balance: str,
+    depots: List[str],
+) -> Tuple[List[Town], Dict[str, int]]:
+    """Group fine polygons into towns; returns (towns, area_id -> town index)."""
+    groups: Dict[Tuple[str, str], List[dict]] = {}
+    for ft in fine_features:
+        props = ft.get("properties") or {}
+        area_id = str(props.get("area_id") or "").strip()
+        if not area_id:
+            continue
+        municipality = str(props.get("municipality") or "").strip()
+        town_name = str(props.get("town_name") or "").strip()
+        # Polygons without a town name (N03 fallback) carry municipality-level stats; keep them apart.
+        key = (municipality, canonical_town_name(town_name)) if town_name else (municipality, "#" + area_id)
+        groups.setdefault(key, []).append(props)
+
+    towns: List[Town] = []
+    town_of: Dict[str, int] = {}
+    for key in sorted(groups):
+        members = groups[key]
+        area_ids = [str(props["area_id"]).strip() for props in members]
+        codes = Counter(
+            overrides.get(area_id, normalize_depot_code(props.get("depot_code") or ""))
+            for area_id, props in zip(area_ids, members)
+        )
+        # Split towns stay where they are; their load counts for the majority depot.
+        depot = max(sorted(codes), key=lambda code: codes[code])
+        for area_id in area_ids:
+            town_of[area_id] = len(towns)
+        towns.append(
+            Town(
+                key=key,
+                area_ids=area_ids,
+                # Towns share ZIP statistics across their polygons: count them once.
+                weight=town_weight(members[0], balance),
+                depot=depot,
+                movable=len(codes) == 1 and depot in depots,
+            )
+        )
+
+    area_ids, offsets, neighbors, border_m = adjacency
+    for node, area_id in enumerate(area_ids):
+        u = town_of.get(area_id)
+        if u is None:
+            continue
+        for i in range(offsets[node], offsets[node + 1]):
+            v = town_of.get(area_ids[neighbors[i]])
+            if v is None or v == u:
+                continue
+            towns[u].neighbors[v] = towns[u].neighbors.get(v, 0.0) + border_m[i]
+    return towns, town_of
+
+
+class Rebalancer:
+    """Greedy local search with O(1) cost deltas (loads per depot, border per town and depot)."""
+
+    def __init__(self, towns: List[Town], depots: List[str], border_weight: float) -> None:
+        self.towns = towns
+        self.depots = depots
+        self.depot_index = {code: i for i, code in enumerate(depots)}
+        self.assign = [self.depot_index.get(town.depot, -1) for town in towns]
+        self.loads = [0.0] * len(depots)
+        for town, d in zip(towns, self.assign):
+            if d >= 0:
+                self.loads[d] += town.weight
+        self.target = sum(self.loads) / len(depots) if depots else 0.0
+        # border[u][d]: border length between town u and its neighbours in depot d.
+        self.border = [[0.0] * len(depots) for _ in towns]
+        for u, town in enumerate(towns):
+            for v, length in town.neighbors.items():
+                if self.assign[v] >= 0:
+                    self.border[u][self.assign[v]] += length
+        self.initial_cut = self.cut_length() or 1.0
+        self.border_weight = border_weight
+        self.moves = 0
+
+    def cut_length(self) -> float:
+        total = 0.0
+        for u, town in enumerate(self.towns):
+            for v, length in town.neighbors.items():
+                if u < v and self.assign[u] != self.assign[v]:
+                    total += length
+        return total
+
+    def cost(self) -> float:
+        imbalance = sum(((load - self.target) / self.target) ** 2 for load in self.loads) if self.target else 0.0
+        return imbalance + self.border_weight * self.cut_length() / self.initial_cut
+
+    def move_delta(self, u: int, b: int) -> float:
+        a = self.assign[u]
+        w = self.towns[u].weight
+        t2 = self.target * self.target
+        imbalance = (2 * w * (self.loads[b] - self.loads[a]) + 2 * w * w) / t2
+        # Border to a becomes cut, border to b stops being cut.
+        cut = self.border[u][a] - self.border[u][b]
+        return imbalance + self.border_weight * cut / self.initial_cut
+
+    def stays_connected(self, u: int) -> bool:
+        """True when u's neighbours in its depot are still connected to each other without u."""
+        a = self.assign[u]
+        targets = {v for v in self.towns[u].neighbors if self.assign[v] == a}
+        if len(targets) <= 1:
+            return len(targets) == 1 or self.loads_count(a) > 1
+        start = next(iter(targets))
+        seen = {u, start}
+        remaining = len(targets) - 1
+        queue = deque([start])
+        while queue:
+            x = queue.popleft()
+            for y in self.towns[x].neighbors:
+                if y in seen or self.assign[y] != a:
+                    continue
+                seen.add(y)
+                if y in targets:
+                    remaining -= 1
+                    if remaining == 0:
+                        return True
+                queue.append(y)
+        return False
+
+    def loads_count(self, d: int) -> int:
+        return sum(1 for x in self.assign if x == d)
+
+    def apply(self, u: int, b: int) -> None:
+        a = self.assign[u]
+        w = self.towns[u].weight
+        self.loads[a] -= w
+        self.loads[b] += w
+        self.assign[u] = b
+        for v, length in self.towns[u].neighbors.items():
+            self.border[v][a] -= length
+            self.border[v][b] += length
+        self.moves += 1
+
+    def run(self, max_moves: int, seconds: float, seed: int) -> None:
+        if self.target <= 0:
+            return
+        rng = random.Random(seed)
+        deadline = time.perf_counter() + seconds
+        order = [u for u, town in enumerate(self.towns) if town.movable]
+        improved = True
+        while improved and self.moves < max_moves and time.perf_counter() < deadline:
+            improved = False
+            rng.shuffle(order)
+            for u in order:
+                a = self.assign[u]
+                best_b, best_delta = -1, -1e-12
+                for b in range(len(self.depots)):
+                    if b == a or self.border[u][b] <= 0:
+                        continue
+                    delta = self.move_delta(u, b)
+                    if delta < best_delta:
+                        best_b, best_delta = b, delta
+                if best_b < 0 or not self.stays_connected(u):
+                    continue
+                self.apply(u, best_b)
+                improved = True
+                if self.moves >= max_moves or time.perf_counter() >= deadline:
+                    break
+
+
+def write_assignments_csv(path: Path, fine_features: List[dict], overrides: Dict[str, str]) -> int:
+    """Write the polygons whose depot differs from the fine polygons; returns the row count."""
+    rows = []
+    for ft in fine_features:
+        props = ft.get("properties") or {}
+        area_id = str(props.get("area_id") or "").strip()
+        if not area_id or area_id not in overrides:
+            continue
+        code = overrides[area_id]
+        if code == normalize_depot_code(props.get("depot_code") or ""):
+            # Unchanged towns would make admin_to_zip_changes move the asis rows of
+            # mixed-depot towns onto the polygon's depot.
+            continue
+        municipality = str(props.get("municipality") or "")
+        area_name = str(props.get("area_name") or "")
+        rows.append([area_id, area_name, municipality, code, DEPOT_NAMES.get(code, "")])
+    rows.sort(key=lambda row: (row[2], row[1], row[0]))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["area_id", "area_name", "municipality", "depot_code", "depot_name"])
+        writer.writerows(rows)
+    return len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Balance depot loads with contiguous town-level reassignments.")
+    parser.add_argument("--fine-polygons", default="data/asis_fine_polygons.geojson", help="Fine polygons GeoJSON (with ZIP stats).")
+    parser.add_argument("--adjacency", default="data/asis_fine_adjacency.json", help="Town adjacency JSON (build_town_adjacency.py).")
+    parser.add_argument("--assignments", default="", help="Optional starting assignment CSV exported from the map tool.")
+    parser.add_argument("--balance", choices=("zip_count", "zip_rows"), default="zip_count", help="Load measure to balance.")
+    parser.add_argument("--depots", default="SGM,FUJ,YOK", help="Comma separated depots taking part in the balance.")
+    parser.add_argument("--border-weight", type=float, default=0.05, help="Weight of the inter-depot border length term.")
+    parser.add_argument("--max-moves", type=int, default=500, help="Maximum number of town moves.")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Search time budget.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the visiting order.")
+    parser.add_argument("--out", default="out/depot_assignments_rebalanced.csv", help="Output assignment CSV.")
+    parser.add_argument("--moves-out", default="", help="Optional CSV listing the moved towns.")
+    args = parser.parse_args()
+
+    depots = [normalize_depot_code(code) for code in args.depots.split(",") if normalize_depot_code(code)]
+    if len(depots) < 2:
+        raise SystemExit("error: --depots needs at least two depots")
+
+    fine_features = load_features(Path(args.fine_polygons))
+    overrides = load_assignment_overrides(Path(args.assignments)) if args.assignments else {}
+    adjacency = load_adjacency(Path(args.adjacency), fine_features)
+    towns, _ = build_towns(fine_features, adjacency, overrides, args.balance, depots)
+
+    started = time.perf_counter()
+    search = Rebalancer(towns, depots, args.border_weight)
+    loads_before = list(search.loads)
+    cut_before = search.cut_length()
+    search.run(args.max_moves, args.seconds, args.seed)
+    seconds = time.perf_counter() - started
+
+    moves: List[List[str]] = []
+    new_codes: Dict[str, str] = dict(overrides)
+    for town, d in zip(towns, search.assign):
+        if d < 0 or depots[d] == town.depot:
+            continue
+        for area_id in town.area_ids:
+            new_codes[area_id] = depots[d]
+        moves.append([town.key[0], town.key[1], ",".join(town.area_ids), town.depot, depots[d], f"{town.weight:g}"])
+    written = write_assignments_csv(Path(args.out), fine_features, new_codes)
+
+    if args.moves_out:
+        moves_path = Path(args.moves_out)
+        moves_path.parent.mkdir(parents=True, exist_ok=True)
+        with moves_path.open("w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["municipality", "town", "area_ids", "before_depot_code", "after_depot_code", args.balance])
+            writer.writerows(sorted(moves))
+        print(f"wrote: {moves_path}")
+
+    print(f"wrote: {args.out} ({written} changed polygons)")
+    print(f"towns: {len(towns)} (movable: {sum(1 for town in towns if town.movable)})")
+    print(f"moved towns: {len(moves)} in {seconds:.2f}s")
+    for code, before, after in zip(depots, loads_before, search.loads):
+        print(f"{code}: {args.balance} {before:g} -> {after:g} (target {search.target:.1f})")
+    print(f"inter-depot border: {cut_before / 1000:.1f}km -> {search.cut_length() / 1000:.1f}km")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""
+Local bbox / zoom query server for the fine polygons and municipal boundaries.
+
+A stand-in for a static tile pyramid (development, on-prem): the map asks only for
+what it shows and gets GeoJSON simplified for the zoom level.
+
+  GET /features?bbox=minLon,minLat,maxLon,maxLat&zoom=Z[&layers=fine,admin]
+      FeatureCollection of the features intersecting bbox, clipped to it (plus a few
+      pixels), simplified to --tolerance-px at zoom Z and rounded to a quarter pixel.
+      Fine polygon properties omit the depot fields; those come from /depots.
+  GET /depots[?since=VERSION]
+      {"version", "areas": {area_id: {depot_code, depot_name, assign_status}}}.
+      With a still known previous version only the changed areas are returned
+      ({"version", "since", "changed"}). --assignments (the CSV exported from the
+      map tool) is re-read when it changes, so assignment edits never invalidate
+      cached geometry.
+
+Both endpoints send an ETag (304 on If-None-Match) and gzip when the client accepts it.
+
+- Index: a uniform grid over the per-feature bounding boxes, built at startup.
+- Simplification: polygons of both layers are cut into shared border chains once
+  (same as build_depot_territories.py) and each chain is simplified per zoom level,
+  so neighbouring towns keep sharing the same border at every zoom. Levels are built
+  on first use and kept; from --full-zoom on the geometry is not simplified.
+- Responses are cached per (layers, zoom, bbox rounded to the output precision).
+
+Typical usage:
+  python3 scripts/serve_features.py \
+    --fine-polygons data/asis_fine_polygons.geojson \
+    --boundaries data/n03_tokyo_kanagawa_admin_areas.geojson \
+    --assignments out/depot_assignments_admin_YYYYMMDD.csv --port 8765
+  curl 'http://127.0.0.1:8765/features?bbox=139.45,35.30,139.55,35.40&zoom=13'
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import DefaultDict, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from build_admin_boundary_geojson import (
+    SCALE,
+    EdgeTable,
+    Point,
+    assemble_polygons,
+    dissolved_edge_rows,
+    load_features,
+    normalize_polygons,
+    quantize_point,
+    trace_rings,
+)
+from build_depot_territories import (
+    METERS_PER_UNIT,
+    border_chains,
+    chain_outline_edges,
+    load_assignment_overrides,
+    simplify_path,
+)
+from build_fine_polygons_from_asis import DEPOT_NAMES, normalize_depot_code
+
+
+BBox = Tuple[float, float, float, float]
+TILE_SIZE = 256
+EQUATOR_M = 40_075_016.686
+MAX_ZOOM = 22
+CLIP_BUFFER_PX = 4
+GZIP_MIN_BYTES = 1024
+DEPOT_FIELDS = ("depot_code", "depot_name", "assign_status")
+DEPOT_HISTORY = 16
+
+
+def degrees_per_pixel(zoom: int) -> float:
+    return 360.0 / (TILE_SIZE * (1 << zoom))
+
+
+def meters_per_pixel(zoom: int, lat: float) -> float:
+    return EQUATOR_M * math.cos(math.radians(lat)) / (TILE_SIZE * (1 << zoom))
+
+
+def coordinate_decimals(zoom: int) -> int:
+    """Decimal places that resolve a quarter pixel at zoom (capped at the source precision)."""
+    return max(0, min(6, math.ceil(-math.log10(degrees_per_pixel(zoom) / 4))))
+
+
+def coordinates_bbox(points: Iterable[List[float]]) -> Optional[BBox]:
+    xs: List[float] = []
+    ys: List[float] = []
+    for x, y in points:
+        xs.append(x)
+        ys.append(y)
+    if not xs:
+        return None
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def union_bbox(a: Optional[BBox], b: Optional[BBox]) -> Optional[BBox]:
+    if a is None or b is None:
+        return a or b
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def intersects(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def contains(outer: BBox, inner: BBox) -> bool:
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+
+
+class GridIndex:
+    """Uniform grid over bounding boxes; about one box per cell on average."""
+
+    def __init__(self, bboxes: List[BBox]) -> None:
+        self.bboxes = bboxes
+        self.cells: DefaultDict[Tuple[int, int], List[int]] = defaultdict(list)
+        self.extent: Optional[BBox] = None
+        for bbox in bboxes:
+            self.extent = union_bbox(self.extent, bbox)
+        if self.extent is None:
+            return
+        side = max(self.extent[2] - self.extent[0], self.extent[3] - self.extent[1]) or 1.0
+        self.origin = (self.extent[0], self.extent[1])
+        self.size = side / max(1, math.ceil(math.sqrt(len(bboxes))))
+        for index, bbox in enumerate(bboxes):
+            for cell in self._cells(bbox):
+                self.cells[cell].append(index)
+
+    def _cells(self, bbox: BBox) -> Iterable[Tuple[int, int]]:
+        ox, oy = self.origin
+        x0, x1 = math.floor((bbox[0] - ox) / self.size), math.floor((bbox[2] - ox) / self.size)
+        y0, y1 = math.floor((bbox[1] - oy) / self.size), math.floor((bbox[3] - oy) / self.size)
+        return ((cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1))
+
+    def query(self, bbox: BBox) -> List[int]:
+        if self.extent is None or not intersects(bbox, self.extent):
+            return []
+        # Clamp to the data extent so a world-sized bbox does not enumerate empty cells.
+        extent = self.extent
+        bbox = (max(bbox[0], extent[0]), max(bbox[1], extent[1]), min(bbox[2], extent[2]), min(bbox[3], extent[3]))
+        found = {index for cell in self._cells(bbox) for index in self.cells.get(cell, ())}
+        return sorted(index for index in found if intersects(self.bboxes[index], bbox))
+
+
+@dataclass
+class Layer:
+    """Polygons grouped by area_id (simplified along shared chains) plus free-standing lines."""
+
+    name: str
+    properties: List[dict]
+    bboxes: List[BBox]
+    index: GridIndex
+    chains: List[Tuple[List[int], Dict[int, bool]]]
+    polygon_count: int  # properties[:polygon_count] are polygon areas, the rest lines
+    lines: List[List[List[Point]]]
+    center_lat: float
+
+    def geometries(self, tolerance_m: float) -> List[Optional[dict]]:
+        outline = chain_outline_edges(self.chains, tolerance_m)
+        out: List[Optional[dict]] = []
+        for index in range(self.polygon_count):
+            polygons = assemble_polygons(trace_rings(outline.get(index, [])))
+            out.append({"type": "MultiPolygon", "coordinates": polygons} if polygons else None)
+        tolerance = tolerance_m / METERS_PER_UNIT
+        for parts in self.lines:
+            lines = [simplify_path(points, tolerance) if tolerance > 0 else points for points in parts]
+            out.append(
+                {"type": "MultiLineString", "coordinates": [[[x / SCALE, y / SCALE] for x, y in line] for line in lines]}
+            )
+        return out
+
+
+def build_layer(name: str, features: List[dict], drop_fields: Tuple[str, ...] = ()) -> Layer:
+    table = EdgeTable()
+    area_index: Dict[str, int] = {}
+    properties: List[dict] = []
+    bboxes: List[BBox] = []
+    line_features: List[Tuple[dict, List[List[Point]], BBox]] = []
+    for ft in features:
+        props = ft.get("properties") or {}
+        geometry = ft.get("geometry") or {}
+        if geometry.get("type") in ("LineString", "MultiLineString"):
+            lines = [geometry["coordinates"]] if geometry["type"] == "LineString" else geometry["coordinates"]
+            lines = [line for line in lines if len(line) >= 2]
+            bbox = coordinates_bbox(pt for line in lines for pt in line)
+            if bbox is not None:
+                line_features.append((props, [[quantize_point(pt) for pt in line] for line in lines], bbox))
+            continue
+        area_id = str(props.get("area_id") or "").strip()
+        polygons = normalize_polygons(geometry)
+        bbox = coordinates_bbox(pt for polygon in polygons for ring in polygon for pt in ring)
+        if not area_id or bbox is None:
+            continue
+        if area_id not in area_index:
+            area_index[area_id] = len(properties)
+            properties.append({key: value for key, value in props.items() if key not in drop_fields})
+            bboxes.append(bbox)
+        index = area_index[area_id]
+        table.add_polygons(polygons, index)
+        bboxes[index] = union_bbox(bboxes[index], bbox)
+
+    polygon_count = len(properties)
+    for props, _, bbox in line_features:
+        properties.append(dict(props))
+        bboxes.append(bbox)
+    center_lat = (min(b[1] for b in bboxes) + max(b[3] for b in bboxes)) / 2 if bboxes else 35.0
+    return Layer(
+        name=name,
+        properties=properties,
+        bboxes=bboxes,
+        index=GridIndex(bboxes),
+        chains=border_chains(dissolved_edge_rows(table)),
+        polygon_count=polygon_count,
+        lines=[parts for _, parts, _ in line_features],
+        center_lat=center_lat,
+    )
+
+
+def clip_ring(ring: List[List[float]], bbox: BBox) -> List[List[float]]:
+    """Sutherland-Hodgman against an axis-aligned box; returns an open point list."""
+    points = ring[:-1] if len(ring) > 1 and ring[0] == ring[-1] else ring
+    for axis, bound, keep_below in ((0, bbox[0], False), (0, bbox[2], True), (1, bbox[1], False), (1, bbox[3], True)):
+        if not points:
+            break
+        out: List[List[float]] = []
+        prev = points[-1]
+        prev_in = prev[axis] <= bound if keep_below else prev[axis] >= bound
+        for point in points:
+            inside = point[axis] <= bound if keep_below else point[axis] >= bound
+            if inside != prev_in:
+                t = (bound - prev[axis]) / (point[axis] - prev[axis])
+                crossing = [prev[0] + t * (point[0] - prev[0]), prev[1] + t * (point[1] - prev[1])]
+                crossing[axis] = bound
+                out.append(crossing)
+            if inside:
+                out.append(point)
+            prev, prev_in = point, inside
+        points = out
+    return points
+
+
+def clip_line(line: List[List[float]], bbox: BBox) -> List[List[List[float]]]:
+    """Liang-Barsky per segment; consecutive visible segments are joined into parts."""
+    parts: List[List[List[float]]] = []
+    current: List[List[float]] = []
+    for (x0, y0), (x1, y1) in zip(line, line[1:]):
+        dx, dy = x1 - x0, y1 - y0
+        t0, t1 = 0.0, 1.0
+        visible = True
+        for p, q in ((-dx, x0 - bbox[0]), (dx, bbox[2] - x0), (-dy, y0 - bbox[1]), (dy, bbox[3] - y0)):
+            if p == 0:
+                if q < 0:
+                    visible = False
+                    break
+                continue
+            t = q / p
+            if p < 0:
+                t0 = max(t0, t)
+            else:
+                t1 = min(t1, t)
+            if t0 > t1:
+                visible = False
+                break
+        if not visible:
+            if len(current) >= 2:
+                parts.append(current)
+            current = []
+            continue
+        start = [x0 + t0 * dx, y0 + t0 * dy]
+        end = [x0 + t1 * dx, y0 + t1 * dy]
+        if not current or current[-1] != start:
+            if len(current) >= 2:
+                parts.append(current)
+            current = [start]
+        current.append(end)
+    if len(current) >= 2:
+        parts.append(current)
+    return parts
+
+
+def round_points(points: List[List[float]], decimals: int) -> List[List[float]]:
+    out: List[List[float]] = []
+    for x, y in points:
+        point = [round(x, decimals), round(y, decimals)]
+        if not out or out[-1] != point:
+            out.append(point)
+    return out
+
+
+def output_geometry(geometry: dict, bbox: BBox, clip: bool, decimals: int) -> Optional[dict]:
+    if geometry["type"] == "MultiLineString":
+        lines = geometry["coordinates"]
+        if clip:
+            lines = [part for line in lines for part in clip_line(line, bbox)]
+        lines = [line for line in (round_points(line, decimals) for line in lines) if len(line) >= 2]
+        return {"type": "MultiLineString", "coordinates": lines} if lines else None
+
+    polygons = []
+    for polygon in geometry["coordinates"]:
+        rings = []
+        for ring in polygon:
+            points = round_points(clip_ring(ring, bbox) if clip else ring[:-1], decimals)
+            if len(points) > 1 and points[0] == points[-1]:
+                points.pop()
+            if len(points) >= 3:
+                rings.append(points + [points[0]])
+            elif not rings:
+                break  # shell vanished: drop its holes as well
+        if rings:
+            polygons.append(rings)
+    if not polygons:
+        return None
+    if len(polygons) == 1:
+        return {"type": "Polygon", "coordinates": polygons[0]}
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+class FeatureStore:
+    """Layers plus lazily built per-zoom geometry and a small response cache."""
+
+    def __init__(self, layers: List[Layer], tolerance_px: float, full_zoom: int, cache_size: int) -> None:
+        self.layers = {layer.name: layer for layer in layers}
+        self.tolerance_px = tolerance_px
+        self.full_zoom = full_zoom
+        self.cache_size = cache_size
+        self._levels: Dict[Tuple[str, int], List[Optional[dict]]] = {}
+        self._responses: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._level_locks: DefaultDict[Tuple[str, int], threading.Lock] = defaultdict(threading.Lock)
+
+    def level(self, layer: Layer, zoom: int) -> List[Optional[dict]]:
+        key = (layer.name, min(zoom, self.full_zoom))
+        with self._lock:
+            level_lock = self._level_locks[key]
+        with level_lock:
+            if key not in self._levels:
+                tolerance_m = 0.0 if key[1] >= self.full_zoom else self.tolerance_px * meters_per_pixel(key[1], layer.center_lat)
+                self._levels[key] = layer.geometries(tolerance_m)
+            return self._levels[key]
+
+    def features(self, bbox: BBox, zoom: int, layer_names: Tuple[str, ...]) -> bytes:
+        decimals = coordinate_decimals(zoom)
+        bbox = tuple(round(v, decimals) for v in bbox)  # type: ignore[assignment]
+        key = (layer_names, zoom, bbox)
+        with self._lock:
+            if key in self._responses:
+                self._responses.move_to_end(key)
+                return self._responses[key]
+
+        buffer = CLIP_BUFFER_PX * degrees_per_pixel(zoom)
+        clip_box = (bbox[0] - buffer, bbox[1] - buffer, bbox[2] + buffer, bbox[3] + buffer)
+        out: List[dict] = []
+        for name in layer_names:
+            layer = self.layers[name]
+            candidates = layer.index.query(bbox)
+            if not candidates:
+                continue
+            geometries = self.level(layer, zoom)
+            for index in candidates:
+                geometry = geometries[index]
+                if geometry is None:
+                    continue
+                geometry = output_geometry(geometry, clip_box, not contains(clip_box, layer.bboxes[index]), decimals)
+                if geometry is None:
+                    continue
+                props = layer.properties[index]
+                out.append(
+                    {
+                        "type": "Feature",
+                        "id": f"{name}:{props.get('area_id') or index}",
+                        "properties": {**props, "layer": name},
+                        "geometry": geometry,
+                    }
+                )
+        body = json.dumps({"type": "FeatureCollection", "features": out}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self._responses[key] = body
+            while len(self._responses) > self.cache_size:
+                self._responses.popitem(last=False)
+        return body
+
+
+class DepotAttributes:
+    """Per-area depot fields, re-read from the assignment CSV whenever it changes."""
+
+    def __init__(self, fine_features: List[dict], assignments_path: Optional[Path]) -> None:
+        self.base: Dict[str, dict] = {}
+        for ft in fine_features:
+            props = ft.get("properties") or {}
+            area_id = str(props.get("area_id") or "").strip()
+            if area_id and area_id not in self.base:
+                self.base[area_id] = {field: props.get(field, "") for field in DEPOT_FIELDS}
+        self.assignments_path = assignments_path
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._history: "OrderedDict[str, Dict[str, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refresh()
+
+    def _refresh(self) -> None:
+        stamp = None
+        if self.assignments_path is not None and self.assignments_path.exists():
+            stat = self.assignments_path.stat()
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        if self._history and stamp == self._stamp:
+            return
+        self._stamp = stamp
+        areas = {area_id: dict(attrs) for area_id, attrs in self.base.items()}
+        if stamp is not None:
+            for area_id, code in load_assignment_overrides(self.assignments_path).items():
+                attrs = areas.get(area_id)
+                if attrs is not None and normalize_depot_code(attrs.get("depot_code") or "") != code:
+                    attrs.update(depot_code=code, depot_name=DEPOT_NAMES.get(code, ""), assign_status="OVERRIDE")
+        digest = hashlib.blake2b(json.dumps(areas, ensure_ascii=False, sort_keys=True).encode("utf-8"), digest_size=8)
+        version = digest.hexdigest()
+        self._history.pop(version, None)
+        self._history[version] = areas
+        while len(self._history) > DEPOT_HISTORY:
+            self._history.popitem(last=False)
+
+    def payload(self, since: str) -> bytes:
+        with self._lock:
+            self._refresh()
+            version, areas = next(reversed(self._history.items()))
+            previous = self._history.get(since) if since else None
+        if previous is not None:
+            changed = {area_id: attrs for area_id, attrs in areas.items() if previous.get(area_id) != attrs}
+            value: dict = {"version": version, "since": since, "changed": changed}
+        else:
+            value = {"version": version, "areas": areas}
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def parse_bbox(value: str) -> BBox:
+    parts = [float(v) for v in value.split(",")]
+    if len(parts) != 4 or not all(math.isfinite(v) for v in parts):
+        raise ValueError("bbox must be minLon,minLat,maxLon,maxLat")
+    min_x, min_y, max_x, max_y = parts
+    if min_x > max_x or min_y > max_y:
+        raise ValueError("bbox min must not exceed max")
+    return min_x, min_y, max_x, max_y
+
+
+def parse_zoom(value: str) -> int:
+    zoom = float(value)
+    if not math.isfinite(zoom):
+        raise ValueError("zoom must be a finite number")
+    return max(0, min(MAX_ZOOM, int(zoom)))
+
+
+class FeatureServer(ThreadingHTTPServer):
+    daemon_threads = True
+    verbose = False
+
+    def handle_error(self, request: object, client_address: object) -> None:
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return  # client went away (closed a keep-alive connection or aborted a download)
+        super().handle_error(request, client_address)
+
+
+def make_handler(store: FeatureStore, depots: DepotAttributes) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:  # noqa: N802 (http.server naming)
+            url = urlsplit(self.path)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                if url.path == "/features":
+                    if "bbox" not in query:
+                        raise ValueError("bbox is required")
+                    zoom = parse_zoom(query.get("zoom", "0"))
+                    names = tuple(n.strip() for n in query.get("layers", ",".join(store.layers)).split(",") if n.strip())
+                    unknown = [n for n in names if n not in store.layers]
+                    if unknown:
+                        raise ValueError(f"unknown layers: {','.join(unknown)}")
+                    body = store.features(parse_bbox(query["bbox"]), zoom, names)
+                elif url.path == "/depots":
+                    body = depots.payload(query.get("since", ""))
+                else:
+                    self.send_json(404, {"error": f"not found: {url.path}"})
+                    return
+            except (ValueError, OverflowError) as exc:
+                self.send_json(400, {"error": str(exc)})
+                return
+            self.send_body(body)
+
+        def send_body(self, body: bytes) -> None:
+            etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+            use_gzip = len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", "")
+            if use_gzip:
+                etag = etag[:-1] + '-gz"'
+            if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+                self.send_response(304)
+                self.send_common_headers(etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if use_gzip:
+                body = gzip.compress(body, compresslevel=6)
+            self.send_response(200)
+            self.send_common_headers(etag)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            if use_gzip:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_common_headers(self, etag: str) -> None:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Access-Control-Expose-Headers", "ETag")
+
+        def send_json(self, status: int, value: dict) -> None:
+            body = json.dumps(value, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+            if self.server.verbose:  # type: ignore[attr-defined] (FeatureServer)
+                super().log_message(format, *args)
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve bbox / zoom queries over fine polygons and municipal boundaries.")
+    parser.add_argument("--fine-polygons", default="data/asis_fine_polygons.geojson", help="Fine polygons GeoJSON path.")
+    parser.add_argument(
+        "--boundaries",
+        default="data/n03_tokyo_kanagawa_admin_areas.geojson",
+        help="Municipal boundary GeoJSON path (layer 'admin'; skipped when missing).",
+    )
+    parser.add_argument("--assignments", default="", help="Optional assignment CSV (area_id, depot_code) overriding depots; re-read on change.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tolerance-px", type=float, default=0.5, help="Simplification tolerance in screen pixels.")
+    parser.add_argument("--full-zoom", type=int, default=16, help="Zoom from which geometry is served unsimplified.")
+    parser.add_argument("--cache-size", type=int, default=256, help="Number of cached /features responses.")
+    parser.add_argument("--verbose", action="store_true", help="Log every request.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    fine_features = load_features(Path(args.fine_polygons))
+    layers = [build_layer("fine", fine_features, DEPOT_FIELDS)]
+    boundaries_path = Path(args.boundaries)
+    if args.boundaries and boundaries_path.exists():
+        layers.append(build_layer("admin", load_features(boundaries_path)))
+    store = FeatureStore(layers, args.tolerance_px, args.full_zoom, max(0, args.cache_size))
+    depots = DepotAttributes(fine_features, Path(args.assignments) if args.assignments else None)
+    del fine_features
+
+    server = FeatureServer((args.host, args.port), make_handler(store, depots))
+    server.verbose = args.verbose
+    for layer in layers:
+        print(f"layer {layer.name}: {len(layer.properties)} features")
+    print(f"loaded in {time.perf_counter() - started:.3f}s")
+    print(f"serving: http://{args.host}:{server.server_address[1]}/features?bbox=minLon,minLat,maxLon,maxLat&zoom=Z", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Read ESRI Shapefiles (.shp / .shx / .dbf / .cpg) without third-party packages.
+
+Used to load the official N03 distribution (e.g. N03-20250101_14.shp) directly,
+without converting it to GeoJSON first.
+
+- .shp and .dbf are memory-mapped; records are decoded on demand.
+- .shx record offsets give random access to any shape.
+- .dbf text is decoded with the code page named in .cpg (CP932 when absent,
+  which is what older N03 releases ship as Shift_JIS).
+
+Typical usage:
+  python3 scripts/shapefile_reader.py data/n03_tokyo_kanagawa/kanagawa/N03-20250101_14.shp --limit 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import codecs
+import json
+import mmap
+import struct
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from build_common import point_in_ring
+
+
+NULL_SHAPE = 0
+POLYGON_SHAPES = {5, 15, 25}  # Polygon, PolygonZ, PolygonM share the 2D prefix layout.
+DEFAULT_DBF_ENCODING = "cp932"
+
+
+def resolve_cpg_encoding(cpg_path: Path) -> str:
+    if not cpg_path.exists():
+        return DEFAULT_DBF_ENCODING
+    raw = cpg_path.read_text(encoding="ascii", errors="ignore").strip()
+    if not raw:
+        return DEFAULT_DBF_ENCODING
+    if raw.isdigit():
+        raw = f"cp{raw}"
+    try:
+        name = codecs.lookup(raw).name
+    except LookupError:
+        return DEFAULT_DBF_ENCODING
+    # CP932 is a superset of Shift_JIS and covers the vendor characters found in place names.
+    if name in {"shift_jis", "cp932"}:
+        return "cp932"
+    return name
+
+
+def ring_signed_area(ring: List[List[float]]) -> float:
+    return sum(p[0] * q[1] - q[0] * p[1] for p, q in zip(ring, ring[1:])) / 2
+
+
+def rings_to_geometry(rings: List[List[List[float]]]) -> Optional[dict]:
+    """
+    Turn shapefile rings (outer CW, holes CCW) into a GeoJSON Polygon / MultiPolygon
+    with RFC 7946 orientation (outer CCW, holes CW).
+    """
+    polygons: List[List[List[List[float]]]] = []
+    holes: List[List[List[float]]] = []
+    for ring in rings:
+        if len(ring) < 4:
+            continue
+        if ring_signed_area(ring) <= 0:
+            polygons.append([ring[::-1]])
+        else:
+            holes.append(ring[::-1])
+
+    # Nested shells (an island inside a lake inside a shell) both contain the hole's
+    # vertex; the hole belongs to the innermost, i.e. smallest, one.
+    shell_areas = [abs(ring_signed_area(poly[0])) for poly in polygons]
+    for hole in holes:
+        x, y = hole[0]
+        owner = None
+        for index, poly in enumerate(polygons):
+            if point_in_ring(x, y, poly[0]) and (owner is None or shell_areas[index] < shell_areas[owner]):
+                owner = index
+        if owner is None:
+            # Orphan hole: keep it as an outer ring rather than dropping area.
+            polygons.append([hole[::-1]])
+            shell_areas.append(abs(ring_signed_area(hole)))
+        else:
+            polygons[owner].append(hole)
+
+    if not polygons:
+        return None
+    if len(polygons) == 1:
+        return {"type": "Polygon", "coordinates": polygons[0]}
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+class ShapefileReader:
+    """Lazy random-access reader for polygon shapefiles and their DBF attributes."""
+
+    def __init__(self, shp_path: Path) -> None:
+        self.shp_path = Path(shp_path)
+        base = self.shp_path.with_suffix("")
+        self.encoding = resolve_cpg_encoding(base.with_suffix(".cpg"))
+
+        shx_bytes = base.with_suffix(".shx").read_bytes()
+        # Big-endian (offset, content_length) pairs in 16-bit words after the 100-byte header.
+        index = struct.unpack_from(f">{(len(shx_bytes) - 100) // 4}i", shx_bytes, 100)
+        self._offsets = array("q", (offset * 2 for offset in index[0::2]))
+
+        self._shp_file = self.shp_path.open("rb")
+        self._shp = mmap.mmap(self._shp_file.fileno(), 0, access=mmap.ACCESS_READ)
+        file_code = struct.unpack_from(">i", self._shp, 0)[0]
+        if file_code != 9994:
+            raise RuntimeError(f"Not a shapefile: {self.shp_path}")
+        self.shape_type = struct.unpack_from("<i", self._shp, 32)[0]
+
+        self._dbf_file = base.with_suffix(".dbf").open("rb")
+        self._dbf = mmap.mmap(self._dbf_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._num_records, self._header_length, self._record_length = struct.unpack_from("<IHH", self._dbf, 4)
+        self.fields = self._read_dbf_fields()
+
+    def _read_dbf_fields(self) -> List[tuple]:
+        fields = []
+        offset = 1  # deletion flag
+        pos = 32
+        while pos < self._header_length and self._dbf[pos] != 0x0D:
+            raw_name = self._dbf[pos : pos + 11].split(b"\x00", 1)[0]
+            field_type = chr(self._dbf[pos + 11])
+            length = self._dbf[pos + 16]
+            decimals = self._dbf[pos + 17]
+            fields.append((raw_name.decode("ascii", errors="replace"), field_type, offset, length, decimals))
+            offset += length
+            pos += 32
+        return fields
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __enter__(self) -> "ShapefileReader":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._shp.close()
+        self._shp_file.close()
+        self._dbf.close()
+        self._dbf_file.close()
+
+    def shape(self, index: int) -> Optional[dict]:
+        content = self._offsets[index] + 8  # skip record header
+        shape_type = struct.unpack_from("<i", self._shp, content)[0]
+        if shape_type == NULL_SHAPE:
+            return None
+        if shape_type not in POLYGON_SHAPES:
+            raise RuntimeError(f"Unsupported shape type {shape_type} in {self.shp_path}")
+
+        num_parts, num_points = struct.unpack_from("<2i", self._shp, content + 36)
+        parts_pos = content + 44
+        points_pos = parts_pos + 4 * num_parts
+        parts = list(struct.unpack_from(f"<{num_parts}i", self._shp, parts_pos)) + [num_points]
+        flat = struct.unpack_from(f"<{2 * num_points}d", self._shp, points_pos)
+
+        rings = []
+        for start, end in zip(parts, parts[1:]):
+            rings.append([[flat[2 * i], flat[2 * i + 1]] for i in range(start, end)])
+        return rings_to_geometry(rings)
+
+    def record(self, index: int) -> Dict[str, object]:
+        pos = self._header_length + index * self._record_length
+        raw = self._dbf[pos : pos + self._record_length]
+        out: Dict[str, object] = {}
+        for name, field_type, offset, length, decimals in self.fields:
+            value = raw[offset : offset + length]
+            if field_type in ("C", "D"):
+                text = value.decode(self.encoding, errors="replace").strip()
+                out[name] = text or None
+            elif field_type in ("N", "F"):
+                text = value.decode("ascii", errors="ignore").strip()
+                if not text or set(text) <= {"*"}:
+                    out[name] = None
+                elif decimals == 0 and "." not in text:
+                    out[name] = int(text)
+                else:
+                    out[name] = float(text)
+            elif field_type == "L":
+                flag = value[:1].upper()
+                out[name] = True if flag in (b"T", b"Y") else False if flag in (b"F", b"N") else None
+            else:
+                out[name] = value.decode(self.encoding, errors="replace").strip() or None
+        return out
+
+    def is_deleted(self, index: int) -> bool:
+        return self._dbf[self._header_length + index * self._record_length] == 0x2A
+
+    def feature(self, index: int) -> dict:
+        return {"type": "Feature", "properties": self.record(index), "geometry": self.shape(index)}
+
+    def iter_features(self) -> Iterator[dict]:
+        for index in range(len(self)):
+            if index < self._num_records and self.is_deleted(index):
+                continue
+            yield self.feature(index)
+
+
+def iter_shapefile_features(shp_path: Path) -> Iterator[dict]:
+    """Yield GeoJSON-like features one at a time; the files stay mapped until exhausted."""
+    with ShapefileReader(shp_path) as reader:
+        yield from reader.iter_features()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dump shapefile features as GeoJSON.")
+    parser.add_argument("shp", help="Path to .shp (matching .shx/.dbf/.cpg alongside).")
+    parser.add_argument("--out", default="", help="Output GeoJSON path (omit to print a summary).")
+    parser.add_argument("--limit", type=int, default=0, help="Only read the first N records.")
+    args = parser.parse_args()
+
+    with ShapefileReader(Path(args.shp)) as reader:
+        count = len(reader) if args.limit <= 0 else min(args.limit, len(reader))
+        if not args.out:
+            print(f"records: {len(reader)}")
+            print(f"encoding: {reader.encoding}")
+            print(f"fields: {', '.join(name for name, *_ in reader.fields)}")
+            for index in range(count):
+                print(json.dumps(reader.record(index), ensure_ascii=False))
+            return
+
+        features = [reader.feature(index) for index in range(count) if not reader.is_deleted(index)]
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f, ensure_ascii=False)
+    print(f"wrote: {out_path}")
+    print(f"features: {len(features)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+Validate fine town polygons for overlaps, gaps, slivers and broken rings.
+
+Checks (all on the same 1e-6 degree quantization as build_admin_boundary_geojson.py):
+- unclosed_ring / short_ring: ring does not end on its start point / has < 4 points.
+- self_intersection: two non-adjacent segments of one feature cross.
+- overlap: segments of two features cross, an edge is used by two features on the
+  same side (shared-edge hashing), or one feature lies inside another.
+- sliver: polygon part with a tiny area or a very low thinness ratio (4*pi*A / P^2).
+- gap: hole in the dissolved coverage of all features (may also be a lake / bay).
+
+Segment pairs are only compared inside a uniform grid, and feature pairs only when
+their bounding boxes meet, so the cost stays near-linear in the number of segments.
+
+Typical usage:
+  python3 scripts/validate_fine_polygons.py \
+    --fine-polygons data/asis_fine_polygons.geojson \
+    --report out/fine_polygons_validation.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+import time
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from typing import DefaultDict, Dict, List, Optional, Set, Tuple
+
+from build_admin_boundary_geojson import (
+    SCALE,
+    np,
+    EdgeTable,
+    dequantize_point,
+    dissolved_edge_rows,
+    load_features,
+    normalize_polygons,
+    point_in_ring,
+    ring_twice_area,
+    trace_rings,
+    unpack_point,
+)
+from build_common import EARTH_RADIUS_M
+
+
+Point = Tuple[int, int]
+
+
+def ring_area_m2(ring: List[Point]) -> float:
+    """Approximate ring area (always >= 0) with a local equirectangular projection."""
+    if len(ring) < 4:
+        return 0.0
+    lat = math.radians(ring[0][1] / SCALE)
+    unit = math.radians(1 / SCALE) * EARTH_RADIUS_M
+    return abs(ring_twice_area(ring)) / 2 * unit * unit * math.cos(lat)
+
+
+def ring_perimeter_m(ring: List[Point]) -> float:
+    if len(ring) < 2:
+        return 0.0
+    lat = math.radians(ring[0][1] / SCALE)
+    unit = math.radians(1 / SCALE) * EARTH_RADIUS_M
+    kx = unit * math.cos(lat)
+    return sum(math.hypot((q[0] - p[0]) * kx, (q[1] - p[1]) * unit) for p, q in zip(ring, ring[1:]))
+
+
+def orientation(ax: int, ay: int, bx: int, by: int, cx: int, cy: int) -> int:
+    value = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    return (value > 0) - (value < 0)
+
+
+def crossing_point(seg_a: Tuple[int, int, int, int], seg_b: Tuple[int, int, int, int]) -> Optional[List[float]]:
+    """Return the crossing point when the segments properly cross (touching does not count)."""
+    ax, ay, bx, by = seg_a
+    cx, cy, dx, dy = seg_b
+    o1 = orientation(ax, ay, bx, by, cx, cy)
+    o2 = orientation(ax, ay, bx, by, dx, dy)
+    o3 = orientation(cx, cy, dx, dy, ax, ay)
+    o4 = orientation(cx, cy, dx, dy, bx, by)
+    if o1 * o2 >= 0 or o3 * o4 >= 0:
+        return None
+    denom = (bx - ax) * (dy - cy) - (by - ay) * (dx - cx)
+    t = ((cx - ax) * (dy - cy) - (cy - ay) * (dx - cx)) / denom
+    return [(ax + t * (bx - ax)) / SCALE, (ay + t * (by - ay)) / SCALE]
+
+
+def ring_bbox(ring: List[Point]) -> Tuple[int, int, int, int]:
+    xs = [pt[0] for pt in ring]
+    ys = [pt[1] for pt in ring]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+class FineFeature:
+    __slots__ = ("index", "area_id", "parts", "part_bboxes", "bbox", "_vertices")
+
+    def __init__(self, index: int, area_id: str, parts: List[List[List[Point]]]) -> None:
+        self.index = index
+        self.area_id = area_id
+        self.parts = parts
+        self.part_bboxes = [ring_bbox(part[0]) for part in parts]
+        self.bbox = (
+            min(b[0] for b in self.part_bboxes),
+            min(b[1] for b in self.part_bboxes),
+            max(b[2] for b in self.part_bboxes),
+            max(b[3] for b in self.part_bboxes),
+        )
+        self._vertices: Optional[Set[Point]] = None
+
+    @property
+    def vertices(self) -> Set[Point]:
+        if self._vertices is None:
+            self._vertices = {pt for part in self.parts for ring in part for pt in ring}
+        return self._vertices
+
+    def contains(self, x: float, y: float) -> bool:
+        for part, (min_x, min_y, max_x, max_y) in zip(self.parts, self.part_bboxes):
+            if not (min_x < x < max_x and min_y < y < max_y):
+                continue
+            if point_in_ring(x, y, part[0]) and not any(point_in_ring(x, y, hole) for hole in part[1:]):
+                return True
+        return False
+
+
+def quantize_ring(ring: list) -> List[Point]:
+    return [
+        (int(round(float(coord[0]) * SCALE)), int(round(float(coord[1]) * SCALE)))
+        for coord in ring
+        if isinstance(coord, (list, tuple)) and len(coord) >= 2
+    ]
+
+
+def _crossing_pairs_py(
+    segments: List[Tuple[int, int, int, int]],
+    owners: List[Tuple[int, int, int, int]],
+    cell: int,
+) -> List[Tuple[int, int]]:
+    grid: DefaultDict[Tuple[int, int], List[int]] = defaultdict(list)
+    for index, (x1, y1, x2, y2) in enumerate(segments):
+        for gx in range(min(x1, x2) // cell, max(x1, x2) // cell + 1):
+            for gy in range(min(y1, y2) // cell, max(y1, y2) // cell + 1):
+                grid[(gx, gy)].append(index)
+
+    out: List[Tuple[int, int]] = []
+    for (gx, gy), members in grid.items():
+        if len(members) < 2:
+            continue
+        for i_pos, i in enumerate(members):
+            ax, ay, bx, by = segments[i]
+            min_ix, min_iy = min(ax, bx), min(ay, by)
+            fi, ri, pi, ni = owners[i]
+            for j in members[i_pos + 1 :]:
+                cx, cy, dx, dy = segments[j]
+                # Test each pair only in the cell holding the corner of the bbox overlap.
+                if max(min_ix, min(cx, dx)) // cell != gx or max(min_iy, min(cy, dy)) // cell != gy:
+                    continue
+                fj, rj, pj, _ = owners[j]
+                if ri == rj and (abs(pi - pj) == 1 or abs(pi - pj) == ni - 1):
+                    continue
+                o1 = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+                o2 = (bx - ax) * (dy - ay) - (by - ay) * (dx - ax)
+                if (o1 > 0 and o2 > 0) or (o1 < 0 and o2 < 0) or o1 == 0 or o2 == 0:
+                    continue
+                o3 = (dx - cx) * (ay - cy) - (dy - cy) * (ax - cx)
+                o4 = (dx - cx) * (by - cy) - (dy - cy) * (bx - cx)
+                if (o3 > 0) != (o4 > 0) and o3 != 0 and o4 != 0:
+                    out.append((i, j))
+    return out
+
+
+def _crossing_pairs_numpy(
+    segments: List[Tuple[int, int, int, int]],
+    owners: List[Tuple[int, int, int, int]],
+    cell: int,
+    pair_batch: int = 4_000_000,
+) -> List[Tuple[int, int]]:
+    seg = np.asarray(segments, dtype=np.int64)
+    own = np.asarray(owners, dtype=np.int64)
+    x1, y1, x2, y2 = seg[:, 0], seg[:, 1], seg[:, 2], seg[:, 3]
+    min_x, max_x = np.minimum(x1, x2), np.maximum(x1, x2)
+    min_y, max_y = np.minimum(y1, y2), np.maximum(y1, y2)
+
+    # Expand every segment into the grid cells its bbox covers.
+    gx0, gx1 = min_x // cell, max_x // cell
+    gy0, gy1 = min_y // cell, max_y // cell
+    width = gx1 - gx0 + 1
+    counts = width * (gy1 - gy0 + 1)
+    members = np.repeat(np.arange(len(seg)), counts)
+    local = np.arange(len(members)) - np.repeat(np.cumsum(counts) - counts, counts)
+    cell_x = gx0[members] + local % width[members]
+    cell_y = gy0[members] + local // width[members]
+    cell_key = (cell_x - cell_x.min()) * (int(cell_y.max() - cell_y.min()) + 1) + (cell_y - cell_y.min())
+
+    order = np.argsort(cell_key, kind="stable")
+    members, cell_key, cell_x, cell_y = members[order], cell_key[order], cell_x[order], cell_y[order]
+    starts = np.flatnonzero(np.r_[True, cell_key[1:] != cell_key[:-1]])
+    ends = np.r_[starts[1:], len(members)]
+
+    # Each member pairs with the members after it in the same cell.
+    group_end = np.repeat(ends, ends - starts)
+    partners = group_end - np.arange(len(members)) - 1
+    pair_offsets = np.cumsum(partners)
+
+    out: List[Tuple[int, int]] = []
+    lo = 0
+    while lo < len(members):
+        budget = (pair_offsets[lo - 1] if lo else 0) + pair_batch
+        hi = max(lo + 1, int(np.searchsorted(pair_offsets, budget, side="right")))
+        counts_batch = partners[lo:hi]
+        first = np.repeat(np.arange(lo, hi), counts_batch)
+        if len(first):
+            step = np.arange(len(first)) - np.repeat(np.cumsum(counts_batch) - counts_batch, counts_batch)
+            second = first + 1 + step
+            i, j = members[first], members[second]
+
+            keep = (np.maximum(min_x[i], min_x[j]) // cell == cell_x[first]) & (
+                np.maximum(min_y[i], min_y[j]) // cell == cell_y[first]
+            )
+            gap = np.abs(own[i, 2] - own[j, 2])
+            keep &= ~((own[i, 1] == own[j, 1]) & ((gap == 1) | (gap == own[i, 3] - 1)))
+            i, j = i[keep], j[keep]
+
+            ax, ay, bx, by = x1[i], y1[i], x2[i], y2[i]
+            cx, cy, dx, dy = x1[j], y1[j], x2[j], y2[j]
+            o1 = np.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+            o2 = np.sign((bx - ax) * (dy - ay) - (by - ay) * (dx - ax))
+            o3 = np.sign((dx - cx) * (ay - cy) - (dy - cy) * (ax - cx))
+            o4 = np.sign((dx - cx) * (by - cy) - (dy - cy) * (bx - cx))
+            hit = (o1 * o2 < 0) & (o3 * o4 < 0)
+            out.extend(zip(i[hit].tolist(), j[hit].tolist()))
+        lo = hi
+    return out
+
+
+class Validator:
+    def __init__(self, sliver_area_m2: float, sliver_thinness: float) -> None:
+        self.sliver_area_m2 = sliver_area_m2
+        self.sliver_thinness = sliver_thinness
+        self.features: List[FineFeature] = []
+        self.issues: List[dict] = []
+        self.reported_pairs: Set[Tuple[str, int, int]] = set()
+        self.segment_count = 0
+        self.ring_count = 0
+
+    def issue(self, kind: str, area_ids: List[str], location: List[float], **extra: object) -> None:
+        self.issues.append({"type": kind, "area_ids": area_ids, "location": location, **extra})
+
+    def pair_issue(self, kind: str, a: int, b: int, location: List[float], **extra: object) -> None:
+        key = (kind, min(a, b), max(a, b))
+        if key in self.reported_pairs:
+            return
+        self.reported_pairs.add(key)
+        ids = sorted({self.features[a].area_id, self.features[b].area_id})
+        self.issue(kind, ids, location, **extra)
+
+    def load(self, raw_features: List[dict]) -> None:
+        for raw in raw_features:
+            props = raw.get("properties") or {}
+            area_id = str(props.get("area_id") or "").strip() or f"#{len(self.features)}"
+            parts: List[List[List[Point]]] = []
+            for poly in normalize_polygons(raw.get("geometry") or {}):
+                rings: List[List[Point]] = []
+                for ring_index, ring in enumerate(poly if isinstance(poly, list) else []):
+                    points = quantize_ring(ring if isinstance(ring, list) else [])
+                    self.ring_count += 1
+                    if len(points) < 4:
+                        self.issue("short_ring", [area_id], dequantize_point(points[0]) if points else [], ring=ring_index)
+                        continue
+                    if points[0] != points[-1]:
+                        self.issue("unclosed_ring", [area_id], dequantize_point(points[0]), ring=ring_index)
+                        points.append(points[0])
+                    rings.append(points)
+                if rings:
+                    parts.append(rings)
+            if not parts:
+                self.issue("empty_geometry", [area_id], [])
+                continue
+            self.features.append(FineFeature(len(self.features), area_id, parts))
+
+    def check_slivers(self) -> None:
+        for feature in self.features:
+            for part in feature.parts:
+                shell = part[0]
+                area = ring_area_m2(shell) - sum(ring_area_m2(hole) for hole in part[1:])
+                perimeter = ring_perimeter_m(shell)
+                thinness = 4 * math.pi * area / (perimeter * perimeter) if perimeter else 0.0
+                if area < self.sliver_area_m2 or thinness < self.sliver_thinness:
+                    self.issue(
+                        "sliver",
+                        [feature.area_id],
+                        dequantize_point(shell[0]),
+                        area_m2=round(area, 3),
+                        thinness=round(thinness, 6),
+                    )
+
+    def check_segments(self) -> None:
+        """Grid-bucketed crossing tests between all segments."""
+        segments: List[Tuple[int, int, int, int]] = []
+        owners: List[Tuple[int, int, int, int]] = []  # (feature, ring serial, position, ring length)
+        ring_serial = 0
+        for feature in self.features:
+            for part in feature.parts:
+                for ring in part:
+                    ring_length = len(ring) - 1
+                    for pos, (p, q) in enumerate(zip(ring, ring[1:])):
+                        if p != q:
+                            segments.append((p[0], p[1], q[0], q[1]))
+                            owners.append((feature.index, ring_serial, pos, ring_length))
+                    ring_serial += 1
+        self.segment_count = len(segments)
+        if not segments:
+            return
+
+        lengths = sorted(max(abs(seg[2] - seg[0]), abs(seg[3] - seg[1])) for seg in segments)
+        cell = max(1, 2 * lengths[len(lengths) // 2])
+        if np is not None:
+            crossings = _crossing_pairs_numpy(segments, owners, cell)
+        else:
+            crossings = _crossing_pairs_py(segments, owners, cell)
+
+        for i, j in crossings:
+            point = crossing_point(segments[i], segments[j])
+            if point is None:
+                continue
+            fi, fj = owners[i][0], owners[j][0]
+            if fi == fj:
+                self.pair_issue("self_intersection", fi, fj, point)
+            else:
+                self.pair_issue("overlap", fi, fj, point, reason="crossing")
+
+    def check_shared_edges(self) -> EdgeTable:
+        """Hash edges; two features using an edge on the same side overlap along it."""
+        table = EdgeTable()
+        for feature in self.features:
+            table.add_polygons(
+                [[[dequantize_point(pt) for pt in ring] for ring in part] for part in feature.parts],
+                feature.index,
+            )
+
+        first_use: Dict[int, Tuple[int, int]] = {}
+        for a_key, b_key, owner, left in zip(table.a, table.b, table.muni, table.left):
+            edge_key = (a_key << 64) | b_key
+            seen = first_use.get(edge_key)
+            if seen is None:
+                first_use[edge_key] = (owner, left)
+                continue
+            other, other_left = seen
+            if other == owner:
+                continue
+            if other_left == left:
+                location = dequantize_point(unpack_point(a_key))
+                self.pair_issue("overlap", other, owner, location, reason="same_side_edge")
+        return table
+
+    def check_containment(self) -> None:
+        """Polygon parts with meeting bboxes: does a part of one feature lie inside another's part?"""
+        parts = [(feature, index) for feature in self.features for index in range(len(feature.parts))]
+        if not parts:
+            return
+        bboxes = [b for f in self.features for b in f.part_bboxes]
+        spans = sorted(max(b[2] - b[0], b[3] - b[1]) for b in bboxes)
+        extent = (max(b[2] for b in bboxes) - min(b[0] for b in bboxes)) * (
+            max(b[3] for b in bboxes) - min(b[1] for b in bboxes)
+        )
+        # Median part size, but never finer than one cell per part on average over the extent.
+        cell = max(1, spans[len(spans) // 2], int(math.sqrt(extent / len(bboxes))))
+        grid: DefaultDict[Tuple[int, int], List[int]] = defaultdict(list)
+        for serial, (feature, index) in enumerate(parts):
+            min_x, min_y, max_x, max_y = feature.part_bboxes[index]
+            for gx in range(min_x // cell, max_x // cell + 1):
+                for gy in range(min_y // cell, max_y // cell + 1):
+                    grid[(gx, gy)].append(serial)
+
+        tested: Set[Tuple[int, int]] = set()
+        for members in grid.values():
+            for i_pos, i in enumerate(members):
+                for j in members[i_pos + 1 :]:
+                    (fa, ia), (fb, ib) = parts[i], parts[j]
+                    if fa is fb or (i, j) in tested:
+                        continue
+                    tested.add((i, j))
+                    if ("overlap", min(fa.index, fb.index), max(fa.index, fb.index)) in self.reported_pairs:
+                        continue
+                    a, b = fa.part_bboxes[ia], fb.part_bboxes[ib]
+                    if a[0] >= b[2] or b[0] >= a[2] or a[1] >= b[3] or b[1] >= a[3]:
+                        continue
+                    for inner, inner_part, outer, outer_part in ((fa, ia, fb, ib), (fb, ib, fa, ia)):
+                        location = self._part_inside(inner, inner_part, outer, outer_part)
+                        if location is not None:
+                            self.pair_issue("overlap", inner.index, outer.index, location, reason="contained")
+                            break
+
+    @staticmethod
+    def _part_inside(
+        inner: FineFeature, inner_part: int, outer: FineFeature, outer_part: int, samples: int = 3
+    ) -> Optional[List[float]]:
+        """
+        With no crossings, an inner part overlaps an outer part iff its free vertices lie inside it.
+        Several vertices are sampled so one sitting on the outer boundary cannot decide alone.
+        """
+        rings = outer.parts[outer_part]
+        min_x, min_y, max_x, max_y = outer.part_bboxes[outer_part]
+        outer_vertices = outer.vertices
+        shell = inner.parts[inner_part][0]
+        inside: List[Point] = []
+        for x, y in shell[:-1]:
+            if (x, y) in outer_vertices:
+                continue
+            if not (min_x < x < max_x and min_y < y < max_y):
+                return None
+            if not point_in_ring(x, y, rings[0]) or any(point_in_ring(x, y, hole) for hole in rings[1:]):
+                return None
+            inside.append((x, y))
+            if len(inside) >= samples:
+                break
+        return dequantize_point(inside[0]) if inside else None
+
+    def check_gaps(self, table: EdgeTable) -> None:
+        """Holes of the dissolved coverage: edges whose owners do not cancel out."""
+        coverage = EdgeTable(a=table.a, b=table.b, muni=array("I", [0]) * len(table), left=table.left)
+        outline = [(from_key, to_key) for _, from_key, to_key in dissolved_edge_rows(coverage)]
+        for ring in trace_rings(outline):
+            if ring_twice_area(ring) < 0:
+                self.issue("gap", [], dequantize_point(ring[0]), area_m2=round(ring_area_m2(ring), 3))
+
+    def run(self) -> None:
+        self.check_slivers()
+        self.check_segments()
+        table = self.check_shared_edges()
+        self.check_containment()
+        self.check_gaps(table)
+
+
+def validate_features(
+    features: List[dict],
+    input_label: str,
+    sliver_area_m2: float = 10.0,
+    sliver_thinness: float = 0.005,
+    started: Optional[float] = None,
+) -> dict:
+    """Validation report of fine polygon features (elapsed time counted from started)."""
+    started = time.perf_counter() if started is None else started
+    validator = Validator(sliver_area_m2, sliver_thinness)
+    validator.load(features)
+    validator.run()
+    elapsed = time.perf_counter() - started
+
+    summary: Dict[str, int] = defaultdict(int)
+    for item in validator.issues:
+        summary[item["type"]] += 1
+    return {
+        "input": input_label,
+        "features": len(validator.features),
+        "rings": validator.ring_count,
+        "segments": validator.segment_count,
+        "elapsed_seconds": round(elapsed, 3),
+        "summary": dict(sorted(summary.items())),
+        "issues": validator.issues,
+    }
+
+
+def write_report(path: Path, report: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validate fine polygons for overlaps, gaps, slivers and broken rings.")
+    parser.add_argument("--fine-polygons", default="data/asis_fine_polygons.geojson", help="Fine polygons GeoJSON path.")
+    parser.add_argument("--report", default="out/fine_polygons_validation.json", help="Output JSON report path.")
+    parser.add_argument("--sliver-area-m2", type=float, default=10.0, help="Parts smaller than this are slivers.")
+    parser.add_argument("--sliver-thinness", type=float, default=0.005, help="Parts with 4*pi*A/P^2 below this are slivers.")
+    parser.add_argument("--fail-on-issues", action="store_true", help="Exit with status 1 when any issue is found.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    fine_polygons_path = Path(args.fine_polygons)
+    report = validate_features(
+        load_features(fine_polygons_path),
+        str(fine_polygons_path),
+        args.sliver_area_m2,
+        args.sliver_thinness,
+        started=started,
+    )
+    report_path = Path(args.report)
+    write_report(report_path, report)
+
+    print(f"wrote: {report_path}")
+    print(f"features: {report['features']}")
+    print(f"segments: {report['segments']}")
+    for kind, count in report["summary"].items():
+        print(f"{kind}: {count}")
+    print(f"elapsed: {report['elapsed_seconds']:.3f}s")
+    if args.fail_on_issues and report["issues"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
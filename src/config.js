@@ -164,5 +164,9 @@ export const MUNICIPALITY_KEYS = ["municipality", "city", "ward", "自治体", "
 
 export const MOBILE_BREAKPOINT_PX = 1180;
 export const FULL_ADMIN_BOUNDARY_GEOJSON = "./data/n03_tokyo_kanagawa_admin_areas.geojson";
+export const FULL_ADMIN_BOUNDARY_SLIM_GEOJSON = "./data/n03_tokyo_kanagawa_admin_areas.slim.geojson";
+export const FINE_POLYGONS_GEOJSON = "./data/asis_fine_polygons.geojson";
+export const FINE_POLYGONS_SLIM_GEOJSON = "./data/asis_fine_polygons.slim.geojson";
 export const OPERATIONAL_ADMIN_BOUNDARY_GEOJSON = "./data/n03_target_admin_areas.geojson";
+export const SEARCH_INDEX_JSON = "./data/asis_search_index.json";
 export const DEFAULT_VISIBLE_PREFECTURES = new Set(["神奈川県", "東京都"]);
@@ -0,0 +1,80 @@
+// Prefix search over data/asis_search_index.json (scripts/build_search_index.py).
+// foldSearchKey must stay identical to search_key() in the build script: the index
+// keys are folded and sorted there, and looked up here by binary search.
+
+const WHITESPACE = /[\t-\r\x1c-\x20\x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000\ufeff]/g;
+const KATAKANA = /[\u30a1-\u30f6]/g;
+
+export const SEARCH_INDEX_FORMAT = "area-search-index/1";
+export const SEARCH_LEVELS = ["prefecture", "municipality", "town"];
+
+export function foldSearchKey(value) {
+  let out = String(value || "").normalize("NFKC");
+  out = out.replace(WHITESPACE, "");
+  out = out.replace(/ヶ/g, "ケ").replace(/ヵ/g, "ケ").replace(/之/g, "の");
+  return out.replace(KATAKANA, (ch) => String.fromCharCode(ch.charCodeAt(0) - 0x60));
+}
+
+export function createSearchIndex(data) {
+  if (!data || data.format !== SEARCH_INDEX_FORMAT) {
+    throw new Error(`not an area search index: ${data && data.format}`);
+  }
+  const { name: names, level: levels, parent: parents, start: starts, end: ends } = data.nodes;
+  const keys = data.keys;
+  const keyNodes = data.key_nodes;
+  const featureOffsets = data.feature_offsets;
+
+  function lowerBound(prefix) {
+    let lo = 0;
+    let hi = keys.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >>> 1;
+      if (keys[mid] < prefix) {
+        lo = mid + 1;
+      } else {
+        hi = mid;
+      }
+    }
+    return lo;
+  }
+
+  function search(query, limit = 20) {
+    const prefix = foldSearchKey(query);
+    if (!prefix) {
+      return [];
+    }
+    const out = [];
+    const seen = new Set();
+    for (let pos = lowerBound(prefix); pos < keys.length && out.length < limit; pos += 1) {
+      if (!keys[pos].startsWith(prefix)) {
+        break;
+      }
+      const node = keyNodes[pos];
+      if (!seen.has(node)) {
+        seen.add(node);
+        out.push(node);
+      }
+    }
+    return out;
+  }
+
+  function path(node) {
+    const out = [];
+    for (let cur = node; cur >= 0; cur = parents[cur]) {
+      out.push(names[cur]);
+    }
+    return out.reverse();
+  }
+
+  function features(node) {
+    return featureOffsets.slice(starts[node], ends[node]);
+  }
+
+  return {
+    search,
+    path,
+    features,
+    name: (node) => names[node],
+    level: (node) => SEARCH_LEVELS[levels[node]],
+  };
+}
@@ -105,6 +105,33 @@ export function collectPostalCodes(raw) {
   return [];
 }
 
+// Expands the slim properties written by scripts/property_dictionary.py in place.
+// Decoded strings come from the shared table, so features hold references to one
+// copy instead of a parsed string each. Plain FeatureCollections pass through.
+export function decodePropertyDictionary(data) {
+  const dictionary = data?.property_dictionary;
+  if (!dictionary || !Array.isArray(data.features)) {
+    return data;
+  }
+  const { columns, strings, defaults } = dictionary;
+  const encoded = new Set(dictionary.encoded || []);
+  data.features.forEach((feature) => {
+    const slim = feature?.properties || {};
+    const props = {};
+    columns.forEach((column) => {
+      if (Object.prototype.hasOwnProperty.call(slim, column)) {
+        const value = slim[column];
+        props[column] = encoded.has(column) && typeof value === "number" ? strings[value] : value;
+      } else if (Object.prototype.hasOwnProperty.call(defaults, column)) {
+        props[column] = defaults[column];
+      }
+    });
+    feature.properties = props;
+  });
+  delete data.property_dictionary;
+  return data;
+}
+
 export function getAreaId(props) {
   for (const key of AREA_ID_KEYS) {
     if (props[key] === null || props[key] === undefined) {